@@ -1,21 +1,22 @@
-import requests
-from bs4 import BeautifulSoup
 import csv
 import os
 
+from common.http_client import http_get
+from common.html_parser import make_soup
+
 # Base URL
 base_url = "https://publiclibraries.com"
 
 def scrape_state_links():
     url = f"{base_url}/state/"
-    response = requests.get(url)
+    response = http_get(url)
     
     # Check if the request was successful
     if response.status_code != 200:
         print(f"Failed to retrieve the page. Status code: {response.status_code}")
         return []
 
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = make_soup(response.content)
 
     # Locate the state links section
     state_links_section = soup.find("div", class_="entry-content")
@@ -40,12 +41,12 @@ def scrape_state_links():
     return state_links
 
 def scrape_libraries_for_state(state_name, state_url):
-    response = requests.get(state_url)
+    response = http_get(state_url)
     if response.status_code != 200:
         print(f"Failed to retrieve data for {state_name}. Status code: {response.status_code}")
         return
 
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = make_soup(response.content)
 
     # Find the table with library data
     table = soup.find("table")
@@ -1,9 +1,8 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import os
-import json
+
+from common.http_client import http_get
+from common.html_parser import make_soup
 
 # Base URL
 base_url = "https://publiclibraries.com"
@@ -13,13 +12,13 @@ base_url = "https://publiclibraries.com"
 
 def scrape_state_links():
     url = f"{base_url}/state/"
-    response = requests.get(url)
+    response = http_get(url)
 
     if response.status_code != 200:
         st.error(f"Failed to retrieve the state links. Status code: {response.status_code}")
         return []
 
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = make_soup(response.content)
     state_links_section = soup.find("div", class_="entry-content")
     if not state_links_section:
         st.error("Unable to find the state links section.")
@@ -36,12 +35,12 @@ def scrape_state_links():
     return state_links
 
 def scrape_libraries_for_state(state_url):
-    response = requests.get(state_url)
+    response = http_get(state_url)
     if response.status_code != 200:
         st.error(f"Failed to retrieve library data. Status code: {response.status_code}")
         return pd.DataFrame()
 
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = make_soup(response.content)
     table = soup.find("table")
     if not table:
         st.warning("No library data found.")
@@ -1,13 +1,15 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 from urllib.parse import urljoin
 
+from common.rate_limit import get_rate_limiter
+from common.http_client import http_get
+from common.html_parser import make_soup
+
 def scrape_data(url):
     data = []
     while url:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        response = http_get(url)
+        soup = make_soup(response.text)
 
         result_containers = soup.find_all('div', class_='result_hit_header')
         for container in result_containers:
@@ -50,6 +52,7 @@ def main():
     # Save DataFrame to CSV file
     df.to_csv('task1.csv', index=False)
     print("Scraping completed and data saved to task4.csv")
+    print(get_rate_limiter().format_metrics())
 
 if __name__ == '__main__':
     main()
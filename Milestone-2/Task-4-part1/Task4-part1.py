@@ -1,7 +1,13 @@
 import requests
-from bs4 import BeautifulSoup
 import os
 import re
+import sys
+import argparse
+
+from common.rate_limit import get_rate_limiter
+from common.http_client import http_get
+from common.html_parser import make_soup
+from common.category_index import INDEX_PATH, CategoryIndex, count_results
 
 def ensure_directory_exists(directory):
     """Ensures the directory exists by creating it if necessary."""
@@ -13,52 +19,82 @@ def clean_directory_name(directory_name):
     # Remove invalid characters and strip spaces
     return re.sub(r'[<>:"/\\|?*]', '', directory_name).strip()
 
-def explore_and_scrape(link, destination_folder):
-    """Explores the given link and scrapes available categories."""
+def explore_and_scrape(link, destination_folder, index=None, depth=0, name=None, create_folders=True):
+    """
+    Explores the given link and scrapes available categories. When `index` is given, every page
+    visited is also recorded in it (see common.category_index).
+    """
+    # Without folders to create, a category reached through a second parent is only indexed once
+    if index is not None and not create_folders and link in index.nodes:
+        return
     try:
         # Fetch the webpage content
-        response = requests.get(link)
+        response = http_get(link)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = make_soup(response.text)
 
         # Find all category containers (li or div elements)
         containers = soup.find_all(['li', 'div'], class_='category-block')
 
         # Stop if no containers are found
         if not containers:
+            if index is not None:
+                index.add_node(link, name, depth, [], count_results(soup))
             print(f"No categories found at {link}")
             return
 
+        children = []
         for container in containers:
             anchor = container.find('a')
             if anchor:
                 # Extract category name and its link
                 category_name = anchor.text.strip()
                 category_link = anchor['href']
-
-                # Clean the category name for directory usage
-                valid_name = clean_directory_name(category_name)
-
-                # Build the destination folder path
-                subfolder = os.path.join(destination_folder, valid_name)
-                ensure_directory_exists(subfolder)
+                card = container.select_one('.card-body')
+                label = card.text.strip() if card else None
 
                 # Form the full URL for the next category
                 next_url = requests.compat.urljoin(link, category_link)
+                children.append({'name': category_name, 'label': label, 'url': next_url})
+        if index is not None:
+            index.add_node(link, name, depth, children)
 
-                # Recursively explore the next category
-                explore_and_scrape(next_url, subfolder)
+        for child in children:
+            subfolder = destination_folder
+            if create_folders:
+                # Clean the category name for directory usage and build the destination folder path
+                subfolder = os.path.join(destination_folder, clean_directory_name(child['name']))
+                ensure_directory_exists(subfolder)
+
+            # Recursively explore the next category
+            explore_and_scrape(child['url'], subfolder, index, depth + 1, child['name'], create_folders)
     except requests.RequestException as err:
         print(f"Failed to fetch {link}: {err}")
 
 # Main execution starts here
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explore the Wigan directory categories.")
+    parser.add_argument("--index", default=INDEX_PATH,
+                        help="Where to write the category-tree index used by the Streamlit dropdowns")
+    parser.add_argument("--index-only", action="store_true",
+                        help="Only rebuild the index, without creating the Wigan_Exploration folders")
+    args = parser.parse_args()
+
     # Base link to start from
     start_url = "https://directory.wigan.gov.uk/kb5/wigan/fsd/home.page"
 
     # Root folder for storing results
     root_folder = "Wigan_Exploration"
-    ensure_directory_exists(root_folder)
+    if not args.index_only:
+        ensure_directory_exists(root_folder)
 
     # Begin scraping from the base URL
-    explore_and_scrape(start_url, root_folder)
+    index = CategoryIndex(start_url)
+    explore_and_scrape(start_url, root_folder, index, create_folders=not args.index_only)
+    print(get_rate_limiter().format_metrics())
+
+    # Keep the previous index when the start page itself could not be fetched
+    if start_url not in index.nodes:
+        sys.exit(1)
+    index.save(args.index)
+    print(f"Indexed {len(index.nodes)} categories into {args.index}")
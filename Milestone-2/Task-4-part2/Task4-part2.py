@@ -1,9 +1,24 @@
 import os
 import re
-import csv
+import argparse
 import requests
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import sync_playwright, Error as PlaywrightError
+
+from common.lean_fetch import (LeanFetchStats, enable_lean_fetch_playwright,
+                               collect_playwright_page_stats, format_page_report)
+
+from common.wigan_listings import LISTING_SCHEMA, parse_category_links
+from common.html_parser import parse_html
+from common.rate_limit import paced, get_rate_limiter
+from common.http_client import http_get
+from common.listing_search import get_listing_index
+from wigan_crawler import crawl_wigan_directory, parse_result_page, write_category_csv, DEFAULT_WORKERS
+from crawl_state import CategoryFrontier, CrawlJournal, FingerprintStore, fingerprint_first_page
+
+# Block images, fonts, media, CSS and analytics while scraping listings
+LEAN_FETCH = True
+# Page loads served by one browser context before it is closed and replaced
+PAGES_PER_CONTEXT = 100
 
 # -------------------- Helper Functions --------------------
 
@@ -22,8 +37,8 @@ def clean_string(s):
 
 # -------------------- Playwright Scraping Logic --------------------
 
-def extract_data_from_page(browser_page, page_index):
-    """Scrapes data from a single page."""
+def extract_data_from_page(browser_page, page_index, batched=True):
+    """Scrapes data from a single page, in one browser round trip unless `batched` is False."""
     print(f"Scraping page {page_index}...")
 
     try:
@@ -32,50 +47,142 @@ def extract_data_from_page(browser_page, page_index):
         print(f"Error waiting for selector: {error}")
         return []
 
-    result_items = browser_page.query_selector_all('.result_hit')
-
-    scraped_data = []
-    for item in result_items:
-        title_element = item.query_selector('h3 a')
-        title_value = clean_string(title_element.inner_text() if title_element else "N/A")
-
-        schedule_element = item.query_selector('.clearfix.mt-1.mb-3.font-weight-bold')
-        schedule_value = clean_string(schedule_element.inner_text() if schedule_element else "N/A")
-
-        description_element = item.query_selector('.result-hit-body .mb-2')
-        description_value = clean_string(description_element.inner_text() if description_element else "N/A")
-
-        location_elements = item.query_selector_all('.comma_split_line')
-        location_value = clean_string(", ".join([clean_string(loc.inner_text()) for loc in location_elements]) if location_elements else "N/A")
-
-        phone_element = item.query_selector('.fa-phone + .comma_split_line, .fa-phone + a')
-        phone_value = clean_string(phone_element.inner_text() if phone_element else "N/A")
-
-        email_element = item.query_selector('.fa-envelope + a')
-        email_value = clean_string(email_element.inner_text() if email_element else "N/A")
-
-        website_element = item.query_selector('.fa-globe + a')
-        website_value = clean_string(website_element.get_attribute('href') if website_element else "N/A")
-
-        scraped_data.append([title_value, schedule_value, description_value, location_value, phone_value, email_value, website_value])
+    if batched:
+        scraped_data = LISTING_SCHEMA.extract_rows_playwright(browser_page)
+    else:
+        scraped_data = LISTING_SCHEMA.extract_rows_per_element(browser_page)
 
     print(f"Total listings scraped on page {page_index}: {len(scraped_data)}")
     return scraped_data
 
-def scrape_all_pages_in_category(start_url, output_folder):
-    """Scrapes all pages within a single category and writes to a CSV file."""
+class CrawlBrowser:
+    """
+    One Chromium instance shared by every category scrape in a crawl. Pages are reused,
+    their contexts are recycled after PAGES_PER_CONTEXT loads, and a crashed browser
+    is relaunched on the next acquire.
+    """
+
+    def __init__(self, headless=True, pages_per_context=PAGES_PER_CONTEXT):
+        self.headless = headless
+        self.pages_per_context = pages_per_context
+        self.lean_stats = LeanFetchStats()
+        self.playwright = None
+        self.browser = None
+        self.idle_pages = []
+        self.page_loads = {}  # context -> page loads served
+
+    def __enter__(self):
+        self.playwright = sync_playwright().start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _ensure_browser(self):
+        if self.browser is not None and self.browser.is_connected():
+            return
+        if self.browser is not None:
+            print("Browser crashed or disconnected, relaunching...")
+        self.idle_pages = []
+        self.page_loads = {}
+        self.browser = self.playwright.chromium.launch(headless=self.headless)
+
+    def acquire_page(self):
+        """Returns an idle page, opening a fresh context if none is available."""
+        self._ensure_browser()
+        while self.idle_pages:
+            page = self.idle_pages.pop()
+            if not page.is_closed():
+                return page
+        context = self.browser.new_context()
+        if LEAN_FETCH:
+            # Stylesheets stay on: the listings are read with innerText, which depends on CSS layout
+            enable_lean_fetch_playwright(context, self.lean_stats, block_css=False)
+        self.page_loads[context] = 0
+        return context.new_page()
+
+    def release_page(self, page, page_loads=1, broken=False):
+        """Returns a page for reuse, closing its context when it is broken or has served enough pages."""
+        context = page.context
+        self.page_loads[context] = self.page_loads.get(context, 0) + page_loads
+        if broken or self.page_loads[context] >= self.pages_per_context:
+            self.page_loads.pop(context, None)
+            try:
+                context.close()
+            except PlaywrightError:
+                pass
+            return
+        self.idle_pages.append(page)
+
+    def close(self):
+        if self.browser is not None:
+            try:
+                self.browser.close()
+            except PlaywrightError:
+                pass
+        if self.playwright is not None:
+            self.playwright.stop()
+        self.browser = None
+        self.playwright = None
+
+
+def goto_paced(browser_page, url):
+    """Loads a URL once the shared limiter gives the host a slot, reporting the status back to it."""
+    with paced(url) as outcome:
+        response = browser_page.goto(url, wait_until="domcontentloaded")
+        if response:
+            outcome['status'] = response.status
+            outcome['headers'] = response.headers
+
+
+def load_page_with_recovery(crawl_browser, browser_page, url):
+    """Loads a URL, swapping in a fresh page (and browser if needed) after a crash.
+    If the retry fails too, the error carries the page still to be released as `error.page` (None if no
+    fresh page could be opened); the page passed in has already been released by then."""
+    try:
+        goto_paced(browser_page, url)
+        return browser_page
+    except PlaywrightError as error:
+        print(f"Page failed while loading {url} ({error}), retrying on a fresh page...")
+        crawl_browser.release_page(browser_page, broken=True)
+    browser_page = None
+    try:
+        browser_page = crawl_browser.acquire_page()
+        goto_paced(browser_page, url)
+    except PlaywrightError as error:
+        error.page = browser_page
+        raise
+    return browser_page
+
+
+def scrape_all_pages_in_category(start_url, output_folder, crawl_browser=None, journal=None):
+    """Scrapes all pages within a single category and writes to a CSV file.
+    With a CrawlJournal, every page is journaled and a half-scraped category continues where it stopped.
+    Returns False if the browser failed before the last page was reached."""
+    if crawl_browser is None:
+        with CrawlBrowser() as own_browser:
+            return scrape_all_pages_in_category(start_url, output_folder, own_browser, journal)
+
+    category_url = start_url
     complete_data = []
-
-    with sync_playwright() as playwright:
-        browser_instance = playwright.chromium.launch(headless=True)
-        browser_page = browser_instance.new_page()
-
-        page_index = 1
-        while True:
+    page_index = 1
+    resumed_pages = 0
+    resume = journal.resume_point(category_url) if journal else None
+    if resume:
+        complete_data, start_url, resumed_pages = resume
+        page_index = resumed_pages + 1
+        print(f"Resuming {category_url} after page {resumed_pages}")
+
+    browser_page = crawl_browser.acquire_page()
+    broken = False
+    try:
+        while start_url:
             print(f"Scraping page {page_index}: {start_url}")
-            browser_page.goto(start_url, wait_until="domcontentloaded")
+            browser_page = load_page_with_recovery(crawl_browser, browser_page, start_url)
 
             page_content = extract_data_from_page(browser_page, page_index)
+            if LEAN_FETCH:
+                print(format_page_report(collect_playwright_page_stats(browser_page, crawl_browser.lean_stats)))
             if not page_content:
                 break  # Stop if no data found (end of pagination)
 
@@ -83,56 +190,95 @@ def scrape_all_pages_in_category(start_url, output_folder):
 
             # Check if there is a "Next" button to continue pagination
             next_page_button = browser_page.query_selector('ol.pagination .page-item:not(.d-none) .page-link.btn[title="Go to Next Page"]')
+            next_page_url = None
             if next_page_button:
-                next_page_url = next_page_button.get_attribute('href')
-                start_url = requests.compat.urljoin(start_url, next_page_url)  # Update URL for the next page
+                next_page_url = requests.compat.urljoin(start_url, next_page_button.get_attribute('href'))
+            if journal:
+                journal.record_page(category_url, page_content, next_page_url)
+            if next_page_url:
+                start_url = next_page_url  # Update URL for the next page
                 page_index += 1
-                browser_page.wait_for_timeout(1000)  # Wait for 1 second before loading the next page
             else:
                 break
-
-        browser_instance.close()
-
-    # Write the scraped data to a CSV file
-    csv_output_file = os.path.join(output_folder, "data.csv")
-    with open(csv_output_file, mode='w', newline='', encoding='utf-8') as csv_file:
-        csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(['Title', 'Schedule', 'Description', 'Location', 'Phone', 'Email', 'Website'])
-
-        # Clean data before writing to the CSV
-        for row in complete_data:
-            cleaned_row = [clean_string(item) for item in row]
-            csv_writer.writerow(cleaned_row)
-
-    print(f"Data successfully written to {csv_output_file}")
+    except PlaywrightError as error:
+        broken = True
+        # A failed retry hands back the page that replaced ours, which is the one still to release
+        browser_page = getattr(error, 'page', browser_page)
+        print(f"Stopped scraping {start_url}: {error}")
+    finally:
+        if browser_page is not None:
+            crawl_browser.release_page(browser_page, page_loads=page_index - resumed_pages, broken=broken)
+
+    # Write the scraped data to a CSV file, skipping the write if the listings did not change
+    csv_output_file, written = write_category_csv(output_folder, complete_data)
+    if written:
+        print(f"Data successfully written to {csv_output_file}")
+    else:
+        print(f"No changes in {csv_output_file}")
+    if journal and not broken:
+        journal.record_category(category_url, csv_output_file)
+    return not broken
 
 # -------------------- Category Exploration Logic --------------------
 
-def explore_and_scrape_categories(category_link, output_folder):
-    """Explores the given link and scrapes available categories."""
+def explore_and_scrape_categories(category_link, output_folder, crawl_browser=None, fingerprints=None, frontier=None,
+                                  journal=None):
+    """Explores the given link and scrapes available categories.
+    With a FingerprintStore, leaf categories unchanged since the last crawl are skipped.
+    With a CategoryFrontier, a category already reached through another parent is not fetched again.
+    With a CrawlJournal, pages explored and categories finished by an earlier run are not fetched again."""
+    if frontier and not frontier.claim(category_link, output_folder):
+        print(f"Already crawled under another parent, linking {output_folder}")
+        return
+    if journal and journal.is_completed(category_link):
+        print(f"Already scraped in an earlier run, skipping {category_link}")
+        return
+    child_categories = journal.children_of(category_link) if journal else None
     try:
-        response = requests.get(category_link)
-        response.raise_for_status()
-        html_content = BeautifulSoup(response.text, 'html.parser')
-
-        category_elements = html_content.find_all(['li', 'div'], class_='category-block')
-        if not category_elements:
-            print(f"No categories found at {category_link}, scraping this page directly...")
-            scrape_all_pages_in_category(category_link, output_folder)
-            return
-
-        for category in category_elements:
-            category_anchor = category.find('a')
-            if category_anchor:
-                category_name = clean_string(category_anchor.text)
-                category_url = category_anchor['href']
-
-                sanitized_name = sanitize_directory_name(category_name)
-                subfolder_path = os.path.join(output_folder, sanitized_name)
-                create_directory_if_not_exists(subfolder_path)
-
-                next_category_url = requests.compat.urljoin(category_link, category_url)
-                explore_and_scrape_categories(next_category_url, subfolder_path)
+        if child_categories is None:
+            headers = fingerprints.conditional_headers(category_link, output_folder) if fingerprints else {}
+            response = http_get(category_link, headers=headers)
+            if response.status_code == 304:
+                if fingerprints and fingerprints.is_unchanged(category_link, output_folder, not_modified=True):
+                    print(f"Unchanged since last crawl (304), skipping {category_link}")
+                    return
+                # The output the validators stood for is gone; a 304 has no body, so fetch the page in full
+                if fingerprints:
+                    fingerprints.forget(category_link)
+                response = http_get(category_link)
+                if response.status_code == 304:
+                    raise requests.HTTPError("304 Not Modified to an unconditional request", response=response)
+            response.raise_for_status()
+            category_elements = parse_category_links(parse_html(response.text))
+            if not category_elements:
+                fingerprint = None
+                if fingerprints:
+                    fingerprint = fingerprint_first_page(*parse_result_page(response.text, category_link))
+                    if fingerprints.is_unchanged(category_link, output_folder, fingerprint,
+                                                headers=response.headers):
+                        print(f"Unchanged since last crawl, skipping {category_link}")
+                        return
+                print(f"No categories found at {category_link}, scraping this page directly...")
+                completed = scrape_all_pages_in_category(category_link, output_folder, crawl_browser, journal)
+                if fingerprints and completed:
+                    fingerprints.record(category_link, fingerprint, response.headers)
+                return
+
+            child_categories = []
+            for anchor_text, category_url in category_elements:
+                if category_url:
+                    category_name = clean_string(anchor_text)
+                    child_categories.append((category_name, requests.compat.urljoin(category_link, category_url)))
+            if journal:
+                journal.record_children(category_link, child_categories)
+
+        for category_name, next_category_url in child_categories:
+            sanitized_name = sanitize_directory_name(category_name)
+            subfolder_path = os.path.join(output_folder, sanitized_name)
+            create_directory_if_not_exists(subfolder_path)
+
+            explore_and_scrape_categories(next_category_url, subfolder_path, crawl_browser, fingerprints, frontier,
+                                          journal)
 
     except requests.RequestException as request_error:
         print(f"Failed to fetch {category_link}: {request_error}")
@@ -140,8 +286,55 @@ def explore_and_scrape_categories(category_link, output_folder):
 # -------------------- Main Execution --------------------
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the Wigan directory into Wigan_Exploration/**/data.csv")
+    parser.add_argument("--engine", choices=["playwright", "async"], default="playwright",
+                        help="'async' crawls categories and results over plain HTTP with a pool of asyncio workers")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent requests for the async engine")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-scrape categories whose first results page or validators changed since the last crawl")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted crawl from Wigan_Exploration/.crawl_journal.jsonl")
+    parser.add_argument("--compact", action="store_true",
+                        help="Afterwards, merge Wigan_Exploration into the Parquet dataset read by wigan_dataset.py")
+    args = parser.parse_args()
+
     initial_url = "https://directory.wigan.gov.uk/kb5/wigan/fsd/home.page"
     main_output_folder = "Wigan_Exploration"
     create_directory_if_not_exists(main_output_folder)
 
-    explore_and_scrape_categories(initial_url, main_output_folder)
+    fingerprints = FingerprintStore(main_output_folder) if args.incremental else None
+    # Every crawl is journaled so that it can be resumed with --resume
+    journal = CrawlJournal(main_output_folder, resume=args.resume)
+
+    if args.engine == "async":
+        try:
+            crawl_wigan_directory(initial_url, main_output_folder, workers=args.workers, fingerprints=fingerprints,
+                                  journal=journal)
+        finally:
+            journal.close()
+    else:
+        frontier = CategoryFrontier(main_output_folder)
+        # A single browser serves every category in the crawl
+        try:
+            with CrawlBrowser() as crawl_browser:
+                explore_and_scrape_categories(initial_url, main_output_folder, crawl_browser, fingerprints, frontier,
+                                              journal)
+            frontier.link_duplicates()
+            print(frontier.summary())
+        finally:
+            journal.close()
+            print(get_rate_limiter().format_metrics())
+            # Keep what was learned even if the crawl is interrupted
+            if fingerprints:
+                fingerprints.save()
+                print(fingerprints.summary())
+
+    # Only the data.csv files written or changed by this crawl are re-indexed for search
+    indexed, removed = get_listing_index().update()
+    print(f"Search index: {indexed} files indexed, {removed} removed")
+
+    if args.compact:
+        # Imported here so that crawling alone does not need pyarrow
+        from wigan_dataset import compact_exploration, DATASET_FOLDER
+        rows = compact_exploration(main_output_folder, DATASET_FOLDER)
+        print(f"Compacted {rows} listings into {DATASET_FOLDER}")
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import argparse
+import importlib.util
+from playwright.sync_api import sync_playwright
+from synthetic_listings import synthetic_results_page
+
+# Task4-part2.py cannot be imported by name because of the dash
+spec = importlib.util.spec_from_file_location("task4_part2", os.path.join(os.path.dirname(__file__), "Task4-part2.py"))
+task4_part2 = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(task4_part2)
+
+# -------------------- Benchmark --------------------
+
+def load_html(path, synthetic_hits):
+    """Returns the saved page, or a synthetic results page if it has no .result_hit items."""
+    with open(path, encoding='utf-8') as html_file:
+        html = html_file.read()
+    if 'result_hit' in html:
+        return html, False
+    return synthetic_results_page(synthetic_hits), True
+
+def time_extraction(page, batched, repeats):
+    """Returns (best seconds per page, rows) for one extraction path."""
+    best = float('inf')
+    rows = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rows = task4_part2.extract_data_from_page(page, 1, batched=batched)
+        best = min(best, time.perf_counter() - started)
+    return best, rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-element vs batched extraction of a saved Wigan results page.")
+    parser.add_argument("--html", default=os.path.join(os.path.dirname(__file__), "test.html"))
+    parser.add_argument("--synthetic-hits", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    html, synthetic = load_html(args.html, args.synthetic_hits)
+    if synthetic:
+        print(f"{args.html} has no listings, using a synthetic page with {args.synthetic_hits} listings")
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(html)
+        per_element_time, per_element_rows = time_extraction(page, False, args.repeats)
+        batched_time, batched_rows = time_extraction(page, True, args.repeats)
+        browser.close()
+
+    if per_element_rows != batched_rows:
+        print("Warning: the two paths returned different rows")
+        for old_row, new_row in zip(per_element_rows, batched_rows):
+            if old_row != new_row:
+                print(f"  per-element: {old_row}\n  batched:     {new_row}")
+                break
+
+    print(f"Listings per page: {len(batched_rows)}")
+    print(f"Per-element: {per_element_time * 1000:.1f} ms/page")
+    print(f"Batched:     {batched_time * 1000:.1f} ms/page")
+    print(f"Speed-up:    {per_element_time / max(batched_time, 1e-9):.1f}x")
+    return 0 if per_element_rows == batched_rows else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+import tracemalloc
+import multiprocessing
+
+from common.html_parser import BACKENDS, available_backends, parse_html
+from common.wigan_listings import LISTING_SCHEMA, parse_category_links
+from synthetic_listings import synthetic_results_page
+
+# -------------------- Pages --------------------
+
+def load_pages(patterns, synthetic_pages, hits_per_page):
+    """Saved pages matching the glob patterns, or synthetic results pages if none contain listings."""
+    pages = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            with open(path, encoding='utf-8', errors='replace') as html_file:
+                pages.append(html_file.read())
+    if any('result_hit' in page or 'category-block' in page for page in pages):
+        return pages, False
+    page = synthetic_results_page(hits_per_page, padding=" Lorem ipsum dolor sit amet." * 20)
+    return [page] * synthetic_pages, True
+
+def extract(document):
+    return LISTING_SCHEMA.extract_rows(document), parse_category_links(document)
+
+# -------------------- Measurements --------------------
+
+def time_backend(backend, pages, repeats):
+    """Median seconds per page for parsing and for extraction, plus the extracted results."""
+    parse_times, extract_times, results = [], [], []
+    for _ in range(repeats):
+        results = []
+        for page in pages:
+            started = time.perf_counter()
+            document = parse_html(page, backend)
+            parsed = time.perf_counter()
+            results.append(extract(document))
+            parse_times.append(parsed - started)
+            extract_times.append(time.perf_counter() - parsed)
+    return statistics.median(parse_times), statistics.median(extract_times), results
+
+def resident_bytes():
+    """Current resident set size from /proc (Linux), which also covers memory held by C parsers; else None."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def memory_worker(backend, pages):
+    """Runs in a fresh process: MB per page held by the parsed trees."""
+    parse_html(pages[0], backend)  # Load the backend before the baseline is taken
+    tracemalloc.start()
+    baseline = resident_bytes()
+    documents = [parse_html(page, backend) for page in pages]
+    current = resident_bytes()
+    if baseline is not None and current is not None:
+        grown = current - baseline
+    else:  # Only Python allocations are visible here
+        grown = tracemalloc.get_traced_memory()[0]
+    del documents
+    return grown / (1024 * 1024) / max(len(pages), 1)
+
+def measure_memory(backend, pages):
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(memory_worker, (backend, pages))
+
+# -------------------- Report --------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse time, memory and correctness of each HTML parser backend.")
+    parser.add_argument("pages", nargs="*", help="Glob patterns of saved pages, e.g. 'saved_pages/**/*.html'")
+    parser.add_argument("--synthetic-pages", type=int, default=20)
+    parser.add_argument("--hits-per-page", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    pages, synthetic = load_pages(args.pages, args.synthetic_pages, args.hits_per_page)
+    if synthetic:
+        print(f"No saved pages with listings given, using {len(pages)} synthetic pages "
+              f"with {args.hits_per_page} listings each")
+    unavailable = [backend for backend in BACKENDS if backend not in available_backends()]
+    if unavailable:
+        print(f"Not installed, skipped: {', '.join(unavailable)}")
+
+    reference = None
+    print(f"{'backend':<12} {'parse ms/page':>14} {'extract ms/page':>16} {'MB/page':>9}  same results")
+    for backend in available_backends():
+        parse_time, extract_time, results = time_backend(backend, pages, args.repeats)
+        if reference is None:
+            reference = results  # html.parser is the reference the others must match
+        megabytes = measure_memory(backend, pages)
+        matches = "yes" if results == reference else "NO"
+        print(f"{backend:<12} {parse_time * 1000:>14.2f} {extract_time * 1000:>16.2f} {megabytes:>9.2f}  {matches}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+FINGERPRINTS_FILE = ".crawl_fingerprints.json"
+MANIFEST_FILE = ".crawl_manifest.json"
+JOURNAL_FILE = ".crawl_journal.jsonl"
+# The journal is fsync'd after this many events or seconds, whichever comes first
+JOURNAL_FSYNC_EVERY = 50
+JOURNAL_FSYNC_SECONDS = 5
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# -------------------- Category Fingerprints --------------------
+
+def fingerprint_first_page(rows, next_url):
+    """Hashes the listings on a category's first results page together with its next-page link."""
+    payload = json.dumps([rows, next_url], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class FingerprintStore:
+    """
+    Remembers, per leaf category URL, the ETag/Last-Modified validators and a fingerprint of the
+    first results page from the last crawl, so an incremental crawl can skip unchanged categories.
+    Stored as JSON next to the crawl output.
+    """
+
+    def __init__(self, output_folder):
+        self.path = os.path.join(output_folder, FINGERPRINTS_FILE)
+        self.checked = 0
+        self.unchanged = 0
+        self.rescraped = 0
+        try:
+            with open(self.path, encoding='utf-8') as store_file:
+                self.entries = json.load(store_file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def conditional_headers(self, url, output_folder):
+        """If-None-Match/If-Modified-Since headers for a known leaf category whose CSV exists, else {}."""
+        entry = self.entries.get(url, {})
+        headers = {}
+        if not os.path.exists(os.path.join(output_folder, "data.csv")):
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, url, output_folder, fingerprint=None, not_modified=False, headers=None):
+        """True if the category's CSV exists and the server or the fingerprint says nothing changed.
+        Fresh validators in `headers` are kept so the next crawl can get a 304 instead."""
+        self.checked += 1
+        entry = self.entries.get(url)
+        unchanged = (entry is not None
+                     and os.path.exists(os.path.join(output_folder, "data.csv"))
+                     and (not_modified or fingerprint == entry.get('fingerprint')))
+        if unchanged:
+            self.unchanged += 1
+            if headers:
+                entry['etag'] = headers.get('ETag', entry.get('etag'))
+                entry['last_modified'] = headers.get('Last-Modified', entry.get('last_modified'))
+        return unchanged
+
+    def record(self, url, fingerprint, headers=None):
+        """Stores the state of a category after it was scraped successfully."""
+        headers = headers or {}
+        self.entries[url] = {
+            'fingerprint': fingerprint,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'scraped_at': time.time(),
+        }
+        self.rescraped += 1
+
+    def forget(self, url):
+        """Drops a category's validators and fingerprint, e.g. when its output went missing."""
+        self.entries.pop(url, None)
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as store_file:
+            json.dump(self.entries, store_file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def summary(self):
+        return (f"Incremental crawl: {self.checked} categories checked, {self.unchanged} unchanged, "
+                f"{self.rescraped} re-scraped")
+
+
+# -------------------- Frontier Deduplication --------------------
+
+def normalize_url(url):
+    """Canonical form of a category URL: lower-case scheme and host, no default port, session id,
+    fragment or empty parameters, and query parameters in sorted order."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc += f":{parts.port}"
+    path = re.sub(r';jsessionid=[^/?#]*', '', parts.path, flags=re.I) or '/'
+    query = urlencode(sorted(parse_qsl(parts.query)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def link_or_copy(source, destination):
+    """Hard-links source to destination, copying where hard links are not supported."""
+    if os.path.exists(destination):
+        if os.path.samefile(source, destination):
+            return
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+class CategoryFrontier:
+    """
+    Tracks which category URLs have been claimed so a category reachable from several parents is
+    fetched and scraped once. The other folder paths are recorded in a manifest and, at the end of
+    the crawl, receive hard links to the data.csv files of the folder that was actually scraped.
+    """
+
+    def __init__(self, output_folder):
+        self.output_folder = output_folder
+        self.owners = {}  # normalized url -> folder that scrapes it
+        self.aliases = {}  # duplicate folder -> (url, folder that scrapes it)
+
+    def claim(self, url, folder):
+        """True the first time a category URL is seen; later sightings are recorded as aliases."""
+        key = normalize_url(url)
+        owner = self.owners.setdefault(key, folder)
+        if owner == folder:
+            return True
+        self.aliases[folder] = (url, owner)
+        return False
+
+    def _relative(self, folder):
+        return os.path.relpath(folder, self.output_folder)
+
+    def link_duplicates(self):
+        """Links each duplicate folder to its scraped twin and writes the manifest. Returns files linked."""
+        linked = 0
+        for folder, (_, owner) in self.aliases.items():
+            # A folder nested inside its own twin would otherwise be linked into itself
+            if os.path.commonpath([os.path.abspath(folder), os.path.abspath(owner)]) == os.path.abspath(owner):
+                continue
+            csv_files = [os.path.join(root, name) for root, _, names in os.walk(owner)
+                         for name in names if name == "data.csv"]
+            for source in csv_files:
+                destination = os.path.join(folder, os.path.relpath(source, owner))
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                link_or_copy(source, destination)
+                linked += 1
+
+        manifest = {self._relative(folder): {'url': url, 'same_as': self._relative(owner)}
+                    for folder, (url, owner) in sorted(self.aliases.items())}
+        manifest_path = os.path.join(self.output_folder, MANIFEST_FILE)
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(temp_path, manifest_path)
+        return linked
+
+    def summary(self):
+        return (f"Deduplicated frontier: {len(self.owners)} unique categories, "
+                f"{len(self.aliases)} duplicate paths linked instead of re-scraped")
+
+
+# -------------------- Crawl Journal --------------------
+
+class CrawlJournal:
+    """
+    Append-only JSON-lines record of crawl progress: the child categories of each explored page,
+    each results page scraped (with its rows) and each category whose data.csv was written.
+    Writes are flushed every event and fsync'd in batches. Opened with resume=True, the existing
+    journal is replayed so finished work is skipped and half-scraped categories continue from
+    their next page; otherwise a fresh journal is started.
+    """
+
+    def __init__(self, output_folder, resume=False, fsync_every=JOURNAL_FSYNC_EVERY,
+                 fsync_seconds=JOURNAL_FSYNC_SECONDS):
+        self.path = os.path.join(output_folder, JOURNAL_FILE)
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self.children = {}  # normalized url -> [(name, url), ...]
+        self.pages = {}  # normalized category url -> [(rows, next_url), ...] in page order
+        self.completed = {}  # normalized category url -> csv path
+        if resume:
+            self._replay()
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self._file.tell() and not self._ends_with_newline():
+            self._file.write("\n")  # Keep new events off the line cut short by the crash
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _replay(self):
+        try:
+            with open(self.path, encoding='utf-8') as journal_file:
+                for line in journal_file:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by the crash
+                    self._apply(event)
+        except OSError:
+            pass
+        print(f"Resuming from {self.path}: {len(self.completed)} categories done, "
+              f"{len(self.pages)} in progress")
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as journal_file:
+            journal_file.seek(-1, os.SEEK_END)
+            return journal_file.read(1) == b"\n"
+
+    def _apply(self, event):
+        key = normalize_url(event['url'])
+        if event['type'] == 'children':
+            self.children[key] = [tuple(child) for child in event['children']]
+        elif event['type'] == 'page':
+            self.pages.setdefault(key, []).append((event['rows'], event['next_url']))
+        elif event['type'] == 'category':
+            self.completed[key] = event['csv']
+            self.pages.pop(key, None)
+
+    def _append(self, event):
+        self._apply(event)
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_seconds:
+            self.sync()
+
+    def record_children(self, url, children):
+        self._append({'type': 'children', 'url': url, 'children': [list(child) for child in children]})
+
+    def record_page(self, category_url, rows, next_url):
+        self._append({'type': 'page', 'url': category_url, 'rows': rows, 'next_url': next_url})
+
+    def record_category(self, category_url, csv_path):
+        self._append({'type': 'category', 'url': category_url, 'csv': csv_path})
+
+    def is_completed(self, url):
+        return normalize_url(url) in self.completed
+
+    def children_of(self, url):
+        """The child categories recorded for an explored page, or None if it was never explored."""
+        return self.children.get(normalize_url(url))
+
+    def resume_point(self, category_url):
+        """(rows so far, next page url or None, pages done) for a half-scraped category, else None."""
+        pages = self.pages.get(normalize_url(category_url))
+        if not pages:
+            return None
+        rows = [row for page_rows, _ in pages for row in page_rows]
+        return rows, pages[-1][1], len(pages)
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
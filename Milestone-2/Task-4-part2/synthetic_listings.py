@@ -0,0 +1,18 @@
+# Markup of one listing as served by the Wigan directory, for benchmarks run without saved pages
+SYNTHETIC_HIT = """
+<div class="result_hit">
+    <h3><a href="/listing/{index}">Listing {index}</a></h3>
+    <div class="clearfix mt-1 mb-3 font-weight-bold">Mondays 10am - 12pm</div>
+    <div class="result-hit-body"><div class="mb-2">Description of listing {index}.{padding}</div></div>
+    <span class="comma_split_line">{index} Market Street</span>
+    <span class="comma_split_line">Wigan WN1 1&#8203;AA</span>
+    <i class="fa fa-phone"></i><a href="tel:0194200000{index}">01942 00000{index}</a>
+    <i class="fa fa-envelope"></i><a href="mailto:info{index}@example.org">info{index}@example.org</a>
+    <i class="fa fa-globe"></i><a href="https://example.org/{index}">Website</a>
+</div>
+"""
+
+def synthetic_results_page(hits, padding=""):
+    """A results page with `hits` listings; `padding` is appended to each description."""
+    listings = "".join(SYNTHETIC_HIT.format(index=index, padding=padding) for index in range(hits))
+    return f"<html><head><title>Results</title></head><body><main>{listings}</main></body></html>"
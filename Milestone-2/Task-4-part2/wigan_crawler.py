@@ -0,0 +1,283 @@
+import io
+import os
+import re
+import csv
+import time
+import asyncio
+from urllib.parse import urljoin
+import aiohttp
+from crawl_state import CategoryFrontier, fingerprint_first_page
+
+from common.rate_limit import get_rate_limiter, retry_after_seconds, THROTTLE_STATUSES
+from common.wigan_listings import LISTING_SCHEMA, CSV_HEADER, parse_category_links
+from common.html_parser import parse_html, select_first_attribute
+
+DEFAULT_WORKERS = 16
+REQUEST_TIMEOUT = 30
+MAX_ATTEMPTS = 3
+
+# -------------------- Helper Functions --------------------
+
+def create_directory_if_not_exists(dir_path):
+    """Ensures the directory exists by creating it if necessary."""
+    if not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+
+def sanitize_directory_name(dir_name):
+    """Cleans the directory name to remove invalid characters."""
+    return re.sub(r'[<>:"/\\|?*]', '', dir_name).strip()
+
+def clean_string(s):
+    """Cleans and sanitizes string input."""
+    return str(s).replace('\u200b', '').strip()
+
+def write_category_csv(output_folder, rows):
+    """Writes one category's listings to data.csv in its folder, leaving the file alone if nothing changed.
+    Returns (path, written)."""
+    csv_output_file = os.path.join(output_folder, "data.csv")
+    buffer = io.StringIO(newline='')
+    csv_writer = csv.writer(buffer)
+    csv_writer.writerow(CSV_HEADER)
+    for row in rows:
+        csv_writer.writerow([clean_string(item) for item in row])
+    content = buffer.getvalue()
+    try:
+        with open(csv_output_file, newline='', encoding='utf-8') as csv_file:
+            if csv_file.read() == content:
+                return csv_output_file, False
+    except OSError:
+        pass
+    with open(csv_output_file, mode='w', newline='', encoding='utf-8') as csv_file:
+        csv_file.write(content)
+    return csv_output_file, True
+
+# -------------------- Parsing --------------------
+
+def parse_child_categories(html, page_url):
+    """Returns (name, absolute url) for each category block on a page."""
+    return [(clean_string(name), urljoin(page_url, href))
+            for name, href in parse_category_links(parse_html(html)) if href]
+
+def parse_result_page(html, page_url):
+    """Returns the listing rows on a results page and the absolute URL of the next page, if any."""
+    document = parse_html(html)
+    rows = LISTING_SCHEMA.extract_rows(document)
+    next_href = select_first_attribute(
+        document, 'ol.pagination .page-item:not(.d-none) .page-link.btn[title="Go to Next Page"]', 'href')
+    next_url = urljoin(page_url, next_href) if rows and next_href else None
+    return rows, next_url
+
+# -------------------- Async Crawler --------------------
+
+class CrawlStats:
+    """Counters for the end-of-crawl throughput summary."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.category_pages = 0
+        self.result_pages = 0
+        self.listings = 0
+        self.csv_files = 0
+        self.failures = 0
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        pages = self.category_pages + self.result_pages
+        return (f"Crawled {pages} pages ({self.category_pages} category, {self.result_pages} results) "
+                f"and {self.listings} listings into {self.csv_files} CSV files in {elapsed:.1f}s: "
+                f"{pages / elapsed:.1f} pages/s, {self.listings / elapsed:.1f} listings/s, "
+                f"{self.failures} failed requests")
+
+
+class WiganCrawler:
+    """
+    Crawls the category tree and every paginated results listing with a bounded pool of
+    asyncio workers sharing one URL frontier, writing the same folder/data.csv layout as
+    explore_and_scrape_categories.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, fingerprints=None, journal=None):
+        self.workers = workers
+        self.fingerprints = fingerprints  # FingerprintStore for incremental crawls, else None
+        self.journal = journal  # CrawlJournal recording progress, else None
+        self.stats = CrawlStats()
+        self.frontier = asyncio.Queue()
+        self.pending_rows = {}  # output folder -> rows collected so far, in page order
+        self.category_urls = {}  # output folder -> url of the category being scraped into it
+        self.pending_fingerprints = {}  # output folder -> (category url, fingerprint, response headers)
+        self.incomplete = set()  # output folders with a results page that failed to load
+        self.seen = None  # CategoryFrontier, created per crawl
+
+    async def fetch(self, session, url, headers=None):
+        """Returns (status, html, response headers), or None if every attempt failed.
+        Requests are paced per host by the shared adaptive limiter."""
+        limiter = get_rate_limiter()
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            host = await limiter.acquire_async(url)
+            started = time.monotonic()
+            released = False
+            try:
+                async with session.get(url, headers=headers) as response:
+                    host.release(response.status, time.monotonic() - started, retry_after_seconds(response.headers))
+                    released = True
+                    if response.status in THROTTLE_STATUSES and attempt < MAX_ATTEMPTS:
+                        continue  # The limiter has already slowed the host down
+                    if response.status == 304:
+                        return 304, None, response.headers
+                    response.raise_for_status()
+                    return response.status, await response.text(), response.headers
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if not released:
+                    host.release(error=True)
+                if attempt == MAX_ATTEMPTS:
+                    self.stats.failures += 1
+                    print(f"Failed to fetch {url}: {error}")
+                    return None
+                await asyncio.sleep(2 ** attempt)
+
+    def enqueue_children(self, categories, folder):
+        for name, child_url in categories:
+            subfolder_path = os.path.join(folder, sanitize_directory_name(name))
+            create_directory_if_not_exists(subfolder_path)
+            # Categories listed under several parents are fetched once and linked elsewhere
+            if self.seen.claim(child_url, subfolder_path):
+                self.frontier.put_nowait(("category", child_url, subfolder_path, None))
+
+    def resume_from_journal(self, url, folder):
+        """Continues a category from the journal without fetching it. Returns False if the journal has nothing on it."""
+        if self.journal.is_completed(url):
+            print(f"Already scraped in an earlier run, skipping {url}")
+            return True
+        categories = self.journal.children_of(url)
+        if categories is not None:
+            self.enqueue_children(categories, folder)
+            return True
+        resume = self.journal.resume_point(url)
+        if resume is None:
+            return False
+        rows, next_url, pages_done = resume
+        print(f"Resuming {url} after page {pages_done}")
+        self.category_urls[folder] = url
+        self.pending_rows[folder] = rows
+        if next_url:
+            self.frontier.put_nowait(("results", next_url, folder, pages_done + 1))
+        else:
+            self.finish_category(folder, pages_done)
+        return True
+
+    async def handle_category(self, session, url, folder):
+        if self.journal and self.resume_from_journal(url, folder):
+            return
+        headers = self.fingerprints.conditional_headers(url, folder) if self.fingerprints else {}
+        fetched = await self.fetch(session, url, headers)
+        if fetched is None:
+            return
+        status, html, response_headers = fetched
+        self.stats.category_pages += 1
+        if status == 304:
+            if self.fingerprints and self.fingerprints.is_unchanged(url, folder, not_modified=True):
+                print(f"Unchanged since last crawl (304), skipping {url}")
+                return
+            # The output the validators stood for is gone; a 304 has no body, so fetch the page in full
+            if self.fingerprints:
+                self.fingerprints.forget(url)
+            fetched = await self.fetch(session, url)
+            if fetched is None:
+                return
+            status, html, response_headers = fetched
+            if html is None:
+                self.stats.failures += 1
+                print(f"Failed to fetch {url}: 304 Not Modified to an unconditional request")
+                return
+        categories = parse_child_categories(html, url)
+        if not categories:
+            if self.fingerprints:
+                fingerprint = fingerprint_first_page(*parse_result_page(html, url))
+                if self.fingerprints.is_unchanged(url, folder, fingerprint, headers=response_headers):
+                    print(f"Unchanged since last crawl, skipping {url}")
+                    return
+                self.pending_fingerprints[folder] = (url, fingerprint, response_headers)
+            print(f"No categories found at {url}, scraping this page directly...")
+            # The category page is the first results page; parse it without fetching it again
+            self.category_urls[folder] = url
+            self.pending_rows[folder] = []
+            await self.handle_results(session, url, folder, 1, html)
+            return
+        if self.journal:
+            self.journal.record_children(url, categories)
+        self.enqueue_children(categories, folder)
+
+    async def handle_results(self, session, url, folder, page_index, html=None):
+        if html is None:
+            fetched = await self.fetch(session, url)
+            if fetched is not None:
+                html = fetched[1]
+                self.stats.result_pages += 1
+            else:
+                self.incomplete.add(folder)
+        rows, next_url = parse_result_page(html, url) if html is not None else ([], None)
+        if self.journal and html is not None:
+            self.journal.record_page(self.category_urls[folder], rows, next_url)
+        self.pending_rows[folder].extend(rows)
+        self.stats.listings += len(rows)
+        if next_url:
+            self.frontier.put_nowait(("results", next_url, folder, page_index + 1))
+            return
+        self.finish_category(folder, page_index)
+
+    def finish_category(self, folder, page_index):
+        csv_output_file, written = write_category_csv(folder, self.pending_rows.pop(folder))
+        category_url = self.category_urls.pop(folder)
+        pending_fingerprint = self.pending_fingerprints.pop(folder, None)
+        if folder not in self.incomplete:
+            if pending_fingerprint:
+                self.fingerprints.record(*pending_fingerprint)
+            if self.journal:
+                self.journal.record_category(category_url, csv_output_file)
+        self.incomplete.discard(folder)
+        if not written:
+            print(f"No changes in {csv_output_file} ({page_index} pages)")
+            return
+        self.stats.csv_files += 1
+        print(f"Data successfully written to {csv_output_file} ({page_index} pages)")
+
+    async def worker(self, session):
+        while True:
+            kind, url, folder, page_index = await self.frontier.get()
+            try:
+                if kind == "category":
+                    await self.handle_category(session, url, folder)
+                else:
+                    await self.handle_results(session, url, folder, page_index)
+            except Exception as error:
+                self.stats.failures += 1
+                print(f"Error processing {url}: {error}")
+            finally:
+                self.frontier.task_done()
+
+    async def crawl(self, start_url, output_folder):
+        create_directory_if_not_exists(output_folder)
+        self.seen = CategoryFrontier(output_folder)
+        self.seen.claim(start_url, output_folder)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit=self.workers)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            self.frontier.put_nowait(("category", start_url, output_folder, None))
+            tasks = [asyncio.create_task(self.worker(session)) for _ in range(self.workers)]
+            await self.frontier.join()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.seen.link_duplicates()
+        print(self.stats.summary())
+        print(self.seen.summary())
+        print(get_rate_limiter().format_metrics())
+        if self.fingerprints:
+            self.fingerprints.save()
+            print(self.fingerprints.summary())
+        return self.stats
+
+
+def crawl_wigan_directory(start_url, output_folder, workers=DEFAULT_WORKERS, fingerprints=None, journal=None):
+    """Runs the async crawl to completion and returns its stats."""
+    return asyncio.run(WiganCrawler(workers, fingerprints, journal).crawl(start_url, output_folder))
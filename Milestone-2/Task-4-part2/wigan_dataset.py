@@ -0,0 +1,161 @@
+import os
+import csv
+import sys
+import time
+import shutil
+import argparse
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from common.wigan_listings import CSV_HEADER
+
+EXPLORATION_FOLDER = "Wigan_Exploration"
+DATASET_FOLDER = "Wigan_Dataset"
+# Top-level category the dataset is partitioned on: one folder of Parquet files per value
+PARTITION_COLUMN = "category_1"
+CATEGORY_PATH_COLUMN = "category_path"
+CATEGORY_SEPARATOR = " > "
+COMPRESSION = "zstd"
+
+# -------------------- Compaction --------------------
+
+def category_column(level):
+    return f"category_{level}"
+
+def iter_category_files(source_folder):
+    """(category path parts, data.csv path) for every category in the crawl output, in a stable order."""
+    for folder, subfolders, files in os.walk(source_folder):
+        subfolders.sort()
+        if "data.csv" in files and folder != source_folder:
+            yield os.path.relpath(folder, source_folder).split(os.sep), os.path.join(folder, "data.csv")
+
+def read_category_table(source_folder):
+    """All listings of the crawl as one table of strings, with one column per category level."""
+    categories = []
+    listings = {column: [] for column in CSV_HEADER}
+    for parts, path in iter_category_files(source_folder):
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            for row in csv.DictReader(csv_file):
+                categories.append(parts)
+                for column in CSV_HEADER:
+                    listings[column].append(row.get(column))
+    levels = max((len(parts) for parts in categories), default=1)
+    columns = {category_column(level): [parts[level - 1] if len(parts) >= level else None for parts in categories]
+               for level in range(1, levels + 1)}
+    columns[CATEGORY_PATH_COLUMN] = [CATEGORY_SEPARATOR.join(parts) for parts in categories]
+    columns.update(listings)
+    return pa.table({name: pa.array(values, type=pa.string()) for name, values in columns.items()})
+
+def compact_exploration(source_folder=EXPLORATION_FOLDER, dataset_folder=DATASET_FOLDER):
+    """
+    Merges every Wigan_Exploration/**/data.csv into one Parquet dataset partitioned by top-level
+    category, zstd-compressed with dictionary-encoded columns. The previous dataset is replaced
+    only once the new one is fully written. Returns the number of listings.
+    """
+    table = read_category_table(source_folder)
+    temp_folder = dataset_folder + ".tmp"
+    shutil.rmtree(temp_folder, ignore_errors=True)
+    pq.write_to_dataset(table, temp_folder, partition_cols=[PARTITION_COLUMN],
+                        compression=COMPRESSION, use_dictionary=True)
+    shutil.rmtree(dataset_folder, ignore_errors=True)
+    os.replace(temp_folder, dataset_folder)
+    return table.num_rows
+
+# -------------------- Queries --------------------
+
+class WiganDataset:
+    """
+    Read side of the compacted dataset. Files are memory-mapped; a filter on category_1 skips
+    whole partitions, other filters are pushed down to the Parquet row groups, and only the
+    requested columns are read.
+    """
+
+    def __init__(self, dataset_folder=DATASET_FOLDER):
+        self.dataset = ds.dataset(dataset_folder, format="parquet", partitioning="hive",
+                                  filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    @property
+    def category_columns(self):
+        return [name for name in self.dataset.schema.names
+                if name.startswith("category_") and name != CATEGORY_PATH_COLUMN]
+
+    @staticmethod
+    def category_filter(categories):
+        """Expression for {column: value or list of values}, e.g. {'category_1': 'Young People'}."""
+        expression = None
+        for column, values in (categories or {}).items():
+            values = [values] if isinstance(values, str) else list(values)
+            condition = ds.field(column).isin(values)
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def query(self, columns=None, categories=None, where=None):
+        """The listings matching the category selection and an optional extra expression, as an Arrow table."""
+        expression = self.category_filter(categories)
+        if where is not None:
+            expression = where if expression is None else expression & where
+        return self.dataset.to_table(columns=columns, filter=expression)
+
+    def count_by(self, column, categories=None):
+        """Listings per value of `column`, largest first."""
+        counts = pc.value_counts(self.query([column], categories)[column]).to_pylist()
+        return sorted(((item['values'], item['counts']) for item in counts), key=lambda item: -item[1])
+
+    def search(self, text, columns=None, search_columns=("Title", "Description"), categories=None):
+        """Listings whose search columns contain `text`, ignoring case."""
+        where = None
+        for column in search_columns:
+            condition = pc.match_substring(ds.field(column), text, ignore_case=True)
+            where = condition if where is None else where | condition
+        return self.query(columns, categories, where)
+
+# -------------------- Command Line --------------------
+
+def parse_categories(values):
+    categories = {}
+    for value in values or []:
+        column, _, category = value.partition("=")
+        categories.setdefault(column, []).append(category)
+    return categories
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact Wigan_Exploration into a Parquet dataset and query it.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compact = subparsers.add_parser("compact", help="Rebuild the dataset from the crawl's data.csv files")
+    compact.add_argument("--source", default=EXPLORATION_FOLDER)
+    compact.add_argument("--dataset", default=DATASET_FOLDER)
+    query = subparsers.add_parser("query", help="Print matching listings")
+    query.add_argument("--dataset", default=DATASET_FOLDER)
+    query.add_argument("--category", action="append", metavar="LEVEL=NAME",
+                       help="e.g. --category 'category_1=Young People'; repeat to select several")
+    query.add_argument("--columns", help="Comma-separated columns to read, default all")
+    query.add_argument("--search", help="Only listings whose Title or Description contains this text")
+    query.add_argument("--count-by", help="Print listings per value of this column instead of rows")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "compact":
+        rows = compact_exploration(args.source, args.dataset)
+        print(f"Compacted {rows} listings into {args.dataset} in {time.perf_counter() - started:.2f}s")
+        return 0
+
+    dataset = WiganDataset(args.dataset)
+    categories = parse_categories(args.category)
+    columns = args.columns.split(",") if args.columns else None
+    if args.count_by:
+        for value, count in dataset.count_by(args.count_by, categories):
+            print(f"{count:>6}  {value}")
+    else:
+        table = dataset.search(args.search, columns, categories=categories) if args.search \
+            else dataset.query(columns, categories)
+        print(table.to_pandas().to_string(max_rows=20, max_colwidth=40))
+        print(f"{table.num_rows} listings")
+    print(f"Query took {(time.perf_counter() - started) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
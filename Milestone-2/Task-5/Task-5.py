@@ -1,9 +1,7 @@
 import os
 import re
-import csv
 import requests
 import pandas as pd
-from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
 import streamlit as st
 import asyncio
@@ -11,6 +9,12 @@ import sys
 import logging 
 from io import BytesIO
 
+from common.wigan_listings import LISTING_SCHEMA, parse_category_links
+from common.html_parser import parse_html
+from common.rate_limit import paced
+from common.http_client import http_get
+from common.category_index import get_category_index
+
 # Set logging to ERROR level to suppress unnecessary logs
 logging.basicConfig(level=logging.ERROR)
 
@@ -29,18 +33,19 @@ def clean_string(s):
     return str(s).replace('\u200b', '').strip()
 
 def fetch_child_categories(category_link):
+    # The prebuilt category index answers without a network round trip; the site is only asked
+    # about categories the index does not know yet
+    indexed = get_category_index().children(category_link)
+    if indexed is not None:
+        return {clean_string(child['name']): child['url'] for child in indexed}
     try:
-        response = requests.get(category_link)
+        response = http_get(category_link)
         response.raise_for_status()
-        html_content = BeautifulSoup(response.text, 'html.parser')
-
-        category_elements = html_content.find_all(['li', 'div'], class_='category-block')
+        category_elements = parse_category_links(parse_html(response.text))
         categories = {}
-        for category in category_elements:
-            category_anchor = category.find('a')
-            if category_anchor:
-                name = clean_string(category_anchor.text)
-                url = category_anchor['href']
+        for anchor_text, url in category_elements:
+            if url:
+                name = clean_string(anchor_text)
                 full_url = requests.compat.urljoin(category_link, url)
                 categories[name] = full_url
         return categories
@@ -48,30 +53,11 @@ def fetch_child_categories(category_link):
         st.error(f"Failed to fetch {category_link}: {error}")
         return {}
 
-def extract_data_from_page(page):
-    result_items = page.query_selector_all('.result_hit')
-    scraped_data = []
-
-    for item in result_items:
-        title = item.query_selector('h3 a')
-        schedule = item.query_selector('.clearfix.mt-1.mb-3.font-weight-bold')
-        description = item.query_selector('.result-hit-body .mb-2')
-        location = item.query_selector_all('.comma_split_line')
-        phone = item.query_selector('.fa-phone + .comma_split_line, .fa-phone + a')
-        email = item.query_selector('.fa-envelope + a')
-        website = item.query_selector('.fa-globe + a')
-
-        scraped_data.append([
-            clean_string(title.inner_text() if title else "N/A"),
-            clean_string(schedule.inner_text() if schedule else "N/A"),
-            clean_string(description.inner_text() if description else "N/A"),
-            clean_string(", ".join([loc.inner_text() for loc in location]) if location else "N/A"),
-            clean_string(phone.inner_text() if phone else "N/A"),
-            clean_string(email.inner_text() if email else "N/A"),
-            clean_string(website.get_attribute('href') if website else "N/A"),
-        ])
-
-    return scraped_data
+def extract_data_from_page(page, batched=True):
+    if batched:
+        # All seven fields for every hit in a single page.evaluate call
+        return LISTING_SCHEMA.extract_rows_playwright(page)
+    return LISTING_SCHEMA.extract_rows_per_element(page)
 
 def scrape_all_pages_in_category(start_url):
     complete_data = []
@@ -81,7 +67,10 @@ def scrape_all_pages_in_category(start_url):
         page = browser.new_page()
 
         while True:
-            page.goto(start_url, wait_until="domcontentloaded")
+            # The shared limiter paces page loads to what the host tolerates
+            with paced(start_url) as outcome:
+                response = page.goto(start_url, wait_until="domcontentloaded")
+                outcome['status'] = response.status if response else None
             data = extract_data_from_page(page)
             if not data:
                 break
@@ -93,7 +82,6 @@ def scrape_all_pages_in_category(start_url):
                 next_url = next_button.get_attribute('href')
                 if next_url:
                     start_url = requests.compat.urljoin(start_url, next_url)
-                    page.wait_for_timeout(1000)
                 else:
                     break
             else:
@@ -102,7 +90,7 @@ def scrape_all_pages_in_category(start_url):
         browser.close()
 
     if complete_data:
-        df = pd.DataFrame(complete_data, columns=['Title', 'Schedule', 'Description', 'Location', 'Phone', 'Email', 'Website'])
+        df = pd.DataFrame(complete_data, columns=LISTING_SCHEMA.columns)
         st.dataframe(df)
 
         csv = df.to_csv(index=False).encode('utf-8')
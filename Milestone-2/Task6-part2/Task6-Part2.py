@@ -1,5 +1,3 @@
-import csv
-import json
 import time
 import pandas as pd
 from io import BytesIO
@@ -14,13 +12,20 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import streamlit as st
 
+from common.lean_fetch import apply_lean_chrome_options, enable_lean_fetch_selenium
+
 # Common function to set up the WebDriver
-def setup_driver():
+def setup_driver(lean=True):
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Uncomment for headless mode
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
+    if lean:
+        # Keep CSS: the card text we read with .text depends on element visibility
+        apply_lean_chrome_options(chrome_options, block_css=False)
     driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    if lean:
+        enable_lean_fetch_selenium(driver, block_css=False)
     return driver
 
 # Scrape Behance Assets with search functionality
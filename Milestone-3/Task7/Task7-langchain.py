@@ -1,8 +1,7 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate, MessagesPlaceholder
+from langchain.prompts import PromptTemplate
 from langchain.memory import ChatMessageHistory
-from langchain.schema import SystemMessage
 from dotenv import load_dotenv
 import os
 
@@ -1,11 +1,14 @@
-import os
 import streamlit as st
 from streamlit_tags import st_tags
 from datetime import datetime
-from io import BytesIO
-from scraper import perform_scrape
-from tools import html_to_markdown_with_readability
+from job_queue import get_job_queue, get_job_store, ACTIVE_STATUSES, DONE
+from exports import EXPORT_FORMATS, available_formats, build_export, cached_export
 import pandas as pd
+
+from common.lean_fetch import format_page_report
+
+# How often a page showing a running job refreshes its progress
+JOB_POLL_SECONDS = 1.0
 # Add custom CSS for table styling
 CUSTOM_CSS = """
 <style>
@@ -24,8 +27,126 @@ CUSTOM_CSS = """
 </style>
 """
 
+def show_fetch_report(fetch_info):
+    """Shows the warnings and fetch statistics of a finished scrape."""
+    for warning in fetch_info.get('warnings', []):
+        st.warning(warning)
+    st.caption(f"Pruned {fetch_info.get('bytes_saved', 0) / 1024:.0f} KB of non-content HTML "
+               f"(~{fetch_info.get('tokens_saved', 0)} tokens saved)")
+    st.caption(f"Fetched {fetch_info.get('pages_scraped', 0)} page(s) via {fetch_info.get('fetch_mode', 'browser')}")
+    for report in fetch_info.get('lean_fetch', []):
+        st.caption(f"{report['url']}: {format_page_report(report)}")
+    if fetch_info.get('scroll_timings'):
+        timings = ", ".join(f"{phase} {seconds}s" for phase, seconds in fetch_info['scroll_timings'].items())
+        st.caption(f"Scrolling: {timings}")
+    if fetch_info.get('switched_to_browser'):
+        st.info("The plain HTTP fetch found no data; the next scrape of this site will use the browser.")
+
+def show_results(job, df, timestamp):
+    """The extracted table with its download buttons."""
+    # Centered output table with custom styling
+    st.markdown("<div style='display: flex; justify-content: center; flex-direction: column; align-items: center;'>", unsafe_allow_html=True)
+    st.markdown("<h2 style='text-align: center;'>Extracted Data</h2>", unsafe_allow_html=True)
+    st.markdown("<div class='table-container' style='width: 100%; max-width: 800px;'>", unsafe_allow_html=True)
+    st.dataframe(df, use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+    
+    # Exports are written only when a format is asked for, then cached with the job's results
+    st.markdown("<div style='display: flex; justify-content: center; gap: 1rem; width: 100%; max-width: 800px;'>", unsafe_allow_html=True)
+    label = st.radio("Download format", available_formats(), horizontal=True)
+    extension, mime = EXPORT_FORMATS[label][:2]
+    path = cached_export(job, label)
+    if path is None and st.button(f"Prepare {label} download"):
+        with st.spinner(f"Writing {label}..."):
+            path = build_export(job, label)
+    if path is not None:
+        with open(path, 'rb') as export_file:
+            st.download_button(
+                label=f"Download Data as {label}",
+                data=export_file,
+                file_name=f"scraped_data_{timestamp}.{extension}",
+                mime=mime
+            )
+    
+    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+def show_token_metrics(job):
+    with st.sidebar:
+        col1, col2, col3 = st.sidebar.columns(3)
+        with col1:
+            st.metric("Input Tokens", job['input_tokens'])
+        with col2:
+            st.metric("Output Tokens", job['output_tokens'])
+        with col3:
+            st.metric("Total Tokens", job['input_tokens'] + job['output_tokens'])
+        cache_stats = job['fetch_info'].get('llm_cache')
+        if cache_stats:
+            col4, col5, col6 = st.sidebar.columns(3)
+            with col4:
+                st.metric("Cache Hits", cache_stats["hits"])
+            with col5:
+                st.metric("Cache Misses", cache_stats["misses"])
+            with col6:
+                st.metric("Cached Chunks", cache_stats["entries"])
+
+def job_label(job):
+    started = datetime.fromtimestamp(job['created_at']).strftime('%Y-%m-%d %H:%M')
+    return f"#{job['id']} {job['status']} · {started} · {job['url']}"
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job_progress(job_id):
+    """Progress and rows of a running job; only this block reruns while the job store is polled."""
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None or job['status'] not in ACTIVE_STATUSES:
+        st.rerun()  # Finished or removed: redraw the whole page with the results
+    if job['status'] == 'queued':
+        st.info("Waiting for a free scraper worker...")
+    else:
+        # The total is only known once the last page is in, so progress is over the chunks seen so far
+        done, seen = job['chunks_done'], max(job['chunks_seen'], 1)
+        st.progress(min(done / seen, 1.0))
+        st.text(f"Processed chunk {done} of {job['chunks_seen']} ({job['pages']} pages loaded so far)...")
+    if job['cancel_requested']:
+        st.warning("Cancelling: no new chunks are sent to the model; requests already sent are finishing...")
+    elif st.button("Cancel"):
+        get_job_queue().cancel(job_id)
+        st.rerun(scope="fragment")
+    rows = store.rows(job_id)
+    if rows:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+def show_job(job_id):
+    """Header of a job, then its live progress while it runs or its results once it has finished."""
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None:
+        st.session_state.job_id = None
+        return
+    st.markdown(f"**Job #{job['id']}** · {job['url']} · fields: {', '.join(job['fields'])}")
+    
+    if job['status'] in ACTIVE_STATUSES:
+        show_job_progress(job_id)
+        return
+    
+    df = pd.DataFrame(store.rows(job_id))
+    timestamp = datetime.fromtimestamp(job['updated_at']).strftime('%Y%m%d_%H%M%S')
+    if job['status'] == DONE:
+        st.success(f"Successfully extracted {len(df)} entries!")
+    elif job['error']:
+        st.error(f"Error during scraping: {job['error']}")
+    else:
+        st.warning(f"The job was {job['status']}; showing the {len(df)} entries extracted before it stopped.")
+    show_fetch_report(job['fetch_info'])
+    if len(df) > 0:
+        show_results(job, df, timestamp)
+    show_token_metrics(job)
+
 def main():
     st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+    # Starting the queue also flags jobs a previous server run left unfinished
+    get_job_queue()
 
     # Main title with centered alignment
     st.markdown("<h1 style='text-align: center;'>Universal Web Scraper 🐙</h1>", unsafe_allow_html=True)
@@ -54,6 +175,16 @@ def main():
         st.session_state.fields = unique_fields
         tr=st.button("Scrape")
         
+        # Earlier jobs, including ones started in other sessions, can be reopened without scraping again
+        jobs = get_job_store().list_jobs()
+        if jobs:
+            st.header("Scrape Jobs")
+            labels = {job['id']: job_label(job) for job in jobs}
+            options = [None] + list(labels)
+            current = st.session_state.job_id if st.session_state.job_id in labels else None
+            st.session_state.job_id = st.selectbox("Open a job", options, index=options.index(current),
+                                                   format_func=lambda job_id: "-" if job_id is None else labels[job_id])
+        
     if tr :
             if not url:
                 st.error("Please enter a URL")
@@ -63,74 +194,16 @@ def main():
                 st.error("Please enter at least one field to extract")
                 st.stop()
                 
-            try:
-                # Assuming perform_scrape is a function that returns the required data
-                df, input_tokens, output_tokens, total_cost = perform_scrape(url, unique_fields, model)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                if len(df) > 0:
-                    st.success(f"Successfully extracted {len(df)} entries!")
-                    
-                    # Centered output table with custom styling
-                    st.markdown("<div style='display: flex; justify-content: center; flex-direction: column; align-items: center;'>", unsafe_allow_html=True)
-                    st.markdown("<h2 style='text-align: center;'>Extracted Data</h2>", unsafe_allow_html=True)
-                    st.markdown("<div class='table-container' style='width: 100%; max-width: 800px;'>", unsafe_allow_html=True)
-                    st.dataframe(df, use_container_width=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
-                    
-                    # Centered download buttons
-                    st.markdown("<div style='display: flex; justify-content: center; gap: 1rem; width: 100%; max-width: 800px;'>", unsafe_allow_html=True)
-                    
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        label="Download Data as CSV",
-                        data=csv,
-                        file_name=f"scraped_data_{timestamp}.csv",
-                        mime="text/csv"
-                    )
-                    
-                    output = BytesIO()
-                    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                        df.to_excel(writer, index=False, sheet_name="ScrapedData")
-                    xlsx_data = output.getvalue()
-                    
-                    st.download_button(
-                        label="Download Data as XLSX",
-                        data=xlsx_data,
-                        file_name=f"scraped_data_{timestamp}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-                    
-                    markdown = df.to_markdown(index=False)
-                    st.download_button(
-                        label="Download Data as Markdown",
-                        data=markdown,
-                        file_name=f"scraped_data_{timestamp}.md",
-                        mime="text/markdown"
-                    )
-                    
-                    json_data = df.to_json(orient="records")
-                    st.download_button(
-                        label="Download Data as JSON",
-                        data=json_data,
-                        file_name=f"scraped_data_{timestamp}.json",
-                        mime="application/json"
-                    )
-                    
-                    st.markdown("</div>", unsafe_allow_html=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
-                with st.sidebar:
-                    col1, col2, col3 = st.sidebar.columns(3)
-                    with col1:
-                        st.metric("Input Tokens", input_tokens)
-                    with col2:
-                        st.metric("Output Tokens", output_tokens)
-                    with col3:
-                        st.metric("Total Tokens", input_tokens + output_tokens)
-                    
-            except Exception as e:
-                st.error(f"Error during scraping: {str(e)}")
+            # The scrape runs in a worker process, so reruns and other sessions don't interrupt it
+            st.session_state.job_id = get_job_queue().submit(url, unique_fields, model)
+            st.rerun()
+    
+    if st.session_state.job_id is not None:
+        show_job(st.session_state.job_id)
 
 if __name__ == "__main__":
     if 'fields' not in st.session_state:
         st.session_state.fields = []
-    main()
\ No newline at end of file
+    if 'job_id' not in st.session_state:
+        st.session_state.job_id = None
+    main()
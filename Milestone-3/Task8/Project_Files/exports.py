@@ -0,0 +1,158 @@
+import os
+import json
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+import xlsxwriter
+from job_queue import EXPORTS_DIR, get_job_store
+
+# Parquet and Arrow IPC exports are offered only when pyarrow is installed
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+# Rows read from the job store and written per step, so memory stays flat however large the result
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+SHEET_NAME = "ScrapedData"
+
+
+def export_columns(job: Dict) -> List[str]:
+    """The requested fields, then any other keys the model returned, in the order first seen."""
+    columns = list(job['fields'])
+    seen = set(columns)
+    for batch in get_job_store().iter_row_batches(job['id'], EXPORT_CHUNK_ROWS):
+        for row in batch:
+            for key in row:
+                if key not in seen:
+                    seen.add(key)
+                    columns.append(key)
+    return columns
+
+
+def text_cell(value) -> Optional[str]:
+    """A cell as text for the typed formats; nested values are kept as JSON."""
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def excel_cell(value):
+    return value if isinstance(value, (int, float)) else text_cell(value)
+
+
+def markdown_cell(value) -> str:
+    value = text_cell(value)
+    return "" if value is None else value.replace("|", "\\|").replace("\n", " ")
+
+
+# -------------------- Writers --------------------
+# Each writer takes the output path, the column names and an iterator of row batches
+
+def write_csv(path: str, columns: List[str], batches: Iterator[List[Dict]]) -> None:
+    with open(path, 'w', encoding='utf-8', newline='') as export_file:
+        export_file.write(pd.DataFrame(columns=columns).to_csv(index=False))
+        for batch in batches:
+            pd.DataFrame(batch, columns=columns, dtype=object).to_csv(export_file, index=False, header=False)
+
+
+def write_xlsx(path: str, columns: List[str], batches: Iterator[List[Dict]]) -> None:
+    # constant_memory flushes each row to disk once the next one starts, so rows are written one by one
+    # (pandas.to_excel writes column by column, which that mode does not allow)
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(SHEET_NAME)
+    worksheet.write_row(0, 0, columns, workbook.add_format({'bold': True, 'border': 1}))
+    row_number = 1
+    for batch in batches:
+        for row in batch:
+            worksheet.write_row(row_number, 0, [excel_cell(row.get(column)) for column in columns])
+            row_number += 1
+    workbook.close()
+
+
+def write_markdown(path: str, columns: List[str], batches: Iterator[List[Dict]]) -> None:
+    with open(path, 'w', encoding='utf-8') as export_file:
+        export_file.write("| " + " | ".join(markdown_cell(column) for column in columns) + " |\n")
+        export_file.write("|" + "|".join("-" * (len(column) + 2) for column in columns) + "|\n")
+        for batch in batches:
+            export_file.writelines("| " + " | ".join(markdown_cell(row.get(column)) for column in columns) + " |\n"
+                                   for row in batch)
+
+
+def write_json(path: str, columns: List[str], batches: Iterator[List[Dict]]) -> None:
+    with open(path, 'w', encoding='utf-8') as export_file:
+        export_file.write("[")
+        first = True
+        for batch in batches:
+            # Each batch is a JSON array; its brackets are dropped so the batches join into one array
+            records = pd.DataFrame(batch, columns=columns, dtype=object).to_json(orient="records")[1:-1]
+            export_file.write(records if first else "," + records)
+            first = False
+        export_file.write("]")
+
+
+def arrow_batch(columns: List[str], batch: List[Dict]):
+    """A record batch of string columns; the model's values have no reliable types across rows."""
+    return pa.RecordBatch.from_arrays(
+        [pa.array([text_cell(row.get(column)) for row in batch], type=pa.string()) for column in columns],
+        names=columns)
+
+
+def write_parquet(path: str, columns: List[str], batches: Iterator[List[Dict]]) -> None:
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    # One row group per batch; repeated values are dictionary-encoded, then compressed with zstd
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_batches([arrow_batch(columns, batch)], schema=schema))
+
+
+def write_arrow(path: str, columns: List[str], batches: Iterator[List[Dict]]) -> None:
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(arrow_batch(columns, batch))
+
+
+# Label -> (file extension, MIME type, writer, needs pyarrow)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv", write_csv, False),
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_xlsx, False),
+    "Markdown": ("md", "text/markdown", write_markdown, False),
+    "JSON": ("json", "application/json", write_json, False),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", write_parquet, True),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file", write_arrow, True),
+}
+
+
+def available_formats() -> List[str]:
+    return [label for label, (_, _, _, needs_pyarrow) in EXPORT_FORMATS.items() if HAVE_PYARROW or not needs_pyarrow]
+
+
+def export_path(job: Dict, label: str) -> str:
+    """Where the export of this job's result is cached; a job whose rows change gets a new path."""
+    extension = EXPORT_FORMATS[label][0]
+    return os.path.join(EXPORTS_DIR, f"job_{job['id']}_{int(job['updated_at'])}.{extension}")
+
+
+def cached_export(job: Dict, label: str) -> Optional[str]:
+    """The path of an export generated earlier, or None."""
+    path = export_path(job, label)
+    return path if os.path.exists(path) else None
+
+
+def build_export(job: Dict, label: str) -> str:
+    """Writes the job's rows in the chosen format, batch by batch, and returns the file's path."""
+    path = export_path(job, label)
+    if os.path.exists(path):
+        return path
+    os.makedirs(EXPORTS_DIR, exist_ok=True)
+    writer = EXPORT_FORMATS[label][2]
+    # The temporary file keeps the extension, which the Excel writer checks
+    root, extension = os.path.splitext(path)
+    temp_path = f"{root}.tmp{extension}"
+    writer(temp_path, export_columns(job), get_job_store().iter_row_batches(job['id'], EXPORT_CHUNK_ROWS))
+    os.replace(temp_path, path)
+    return path
@@ -0,0 +1,159 @@
+import os
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from tools import estimate_tokens
+
+# Gemini 1.5 Flash free-tier limits by default, overridable from the environment (.env)
+REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "15"))
+TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Chunks buffered between the fetch/convert stage and extraction
+CHUNK_QUEUE_SIZE = int(os.getenv("LLM_CHUNK_QUEUE_SIZE", "8"))
+# How often a wait for the rate limit checks whether the scrape was stopped
+STOP_CHECK_SECONDS = 0.5
+
+_END_OF_CHUNKS = object()
+
+
+class RateLimiter:
+    """Sliding one-minute window limiter for requests and tokens per minute."""
+
+    def __init__(self, requests_per_minute: int = REQUESTS_PER_MINUTE, tokens_per_minute: int = TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._events = deque()  # (timestamp, tokens)
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= 60:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def acquire(self, tokens: int, should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Blocks until one request of `tokens` tokens fits in the current window.
+        Returns False without taking a slot if `should_stop()` turns True while waiting.
+        """
+        # A single request larger than the whole budget is let through on an empty window
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            if should_stop and should_stop():
+                return False
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                if (len(self._events) < self.requests_per_minute
+                        and self._tokens_in_window + tokens <= self.tokens_per_minute):
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return True
+                wait = 60 - (now - self._events[0][0]) if self._events else 0.05
+            if should_stop:
+                wait = min(wait, STOP_CHECK_SECONDS)
+            time.sleep(max(wait, 0.05))
+
+
+# Shared by every scrape in the process so concurrent scrapes stay within the same quota
+_shared_limiter = RateLimiter()
+
+ChunkResult = Tuple[List[Dict], int, int, float]
+
+
+def stream_extract_chunks(
+    chunks: Iterable[str],
+    extract: Callable[[str], ChunkResult],
+    lookup: Optional[Callable[[str], Optional[ChunkResult]]] = None,
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+    rate_limiter: Optional[RateLimiter] = None,
+    queue_size: int = CHUNK_QUEUE_SIZE,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Iterator[Tuple[int, Optional[ChunkResult]]]:
+    """
+    Pulls chunks from `chunks` on a producer thread through a bounded queue and runs
+    `extract` on up to `max_workers` of them at once, respecting the rate limits.
+    Yields (chunk_index, result) in completion order, with None for chunks that failed.
+    The chunk source may be a slow generator (e.g. pages still being fetched); at most
+    `queue_size` chunks are buffered ahead of extraction. Chunks answered by `lookup`
+    (e.g. a cache) skip the rate limiter and the model call. An exception raised by the
+    chunk source is re-raised once the chunks produced before it have been extracted.
+    Once `should_stop()` returns True no further chunks are sent to the model; requests
+    already sent finish, and chunks still waiting for the rate limit are dropped.
+    """
+    limiter = rate_limiter or _shared_limiter
+    pending = queue.Queue(maxsize=max(1, queue_size))
+    stop = threading.Event()
+    source_error = []
+
+    def put(item) -> bool:
+        # Blocks while the queue is full, giving up if the consumer has gone away
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+        except Exception as e:
+            source_error.append(e)
+        finally:
+            # A generator source left early still holds its page fetcher (e.g. a browser); close it here
+            close = getattr(chunks, 'close', None)
+            if close:
+                close()
+            put(_END_OF_CHUNKS)
+
+    def run(chunk):
+        if lookup:
+            cached = lookup(chunk)
+            if cached is not None:
+                return cached
+        if not limiter.acquire(estimate_tokens(chunk), should_stop=stop.is_set):
+            return None  # Stopped while waiting for the rate limit
+        return extract(chunk)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    in_flight = {}
+    next_index = 0
+    source_done = False
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        try:
+            while not source_done or in_flight:
+                if should_stop and should_stop():
+                    return
+                # Keep the workers busy; only block on the source when nothing is running
+                while not source_done and len(in_flight) < max_workers:
+                    try:
+                        chunk = pending.get(block=not in_flight)
+                    except queue.Empty:
+                        break
+                    if chunk is _END_OF_CHUNKS:
+                        source_done = True
+                        break
+                    in_flight[executor.submit(run, chunk)] = next_index
+                    next_index += 1
+                if not in_flight:
+                    continue
+                finished, _ = wait(in_flight, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = in_flight.pop(future)
+                    try:
+                        yield index, future.result()
+                    except Exception:
+                        yield index, None  # Failed chunks are skipped, as in the sequential loop
+        finally:
+            # Set before the pool waits for its workers, so those waiting for the rate limit give up
+            stop.set()
+    if source_error:
+        raise source_error[0]
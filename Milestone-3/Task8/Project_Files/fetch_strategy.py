@@ -0,0 +1,113 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+from typing import List, Optional
+from urllib.parse import urljoin, urlparse
+import requests
+import lxml.html
+from tools import USER_AGENTS, prune_html
+
+from common.http_client import http_get
+
+STORE_PATH = os.getenv("FETCH_STRATEGY_STORE", ".fetch_strategy.json")
+# Re-check a domain's decision after this long, since sites get redesigned
+DECISION_TTL_SECONDS = 7 * 24 * 3600
+STATIC_TIMEOUT = 10
+# A static page needs at least this many words of content once boilerplate is pruned
+MIN_CONTENT_WORDS = 150
+
+# Signs that the server sent an app shell that JavaScript fills in
+JS_SHELL_PATTERNS = [
+    re.compile(r"<div[^>]+id=[\"'](root|app|__next|__nuxt)[\"'][^>]*>\s*</div>", re.I),
+    re.compile(r"(enable|requires?) javascript", re.I),
+]
+
+
+def domain_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def fetch_static(url: str) -> Optional[str]:
+    """Plain HTTP fetch through the shared pooled, cached client.
+    Returns the HTML, or None if the request fails or is not HTML."""
+    try:
+        response = http_get(url, headers={"User-Agent": random.choice(USER_AGENTS)}, timeout=STATIC_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException:
+        return None
+    if "html" not in response.headers.get("Content-Type", "html"):
+        return None
+    return response.text
+
+
+def has_meaningful_content(html: str) -> bool:
+    """True if the server-rendered HTML already carries real page content."""
+    pruned, _ = prune_html(html)
+    try:
+        words = len(lxml.html.fromstring(pruned).text_content().split())
+    except Exception:
+        return False
+    if words < MIN_CONTENT_WORDS:
+        return False
+    # A shell with a little static text around an empty app root still needs the browser
+    looks_like_shell = any(pattern.search(html) for pattern in JS_SHELL_PATTERNS)
+    return not looks_like_shell or words >= 2 * MIN_CONTENT_WORDS
+
+
+def find_pagination_links_static(html: str, base_url: str, xpaths: List[str]) -> List[str]:
+    """Same pagination lookup as check_pagination, run with lxml over static HTML."""
+    try:
+        root = lxml.html.fromstring(html)
+    except Exception:
+        return []
+    for xpath in xpaths:
+        hrefs = [element.get("href") for element in root.xpath(xpath)]
+        links = list(dict.fromkeys(
+            urljoin(base_url, href) for href in hrefs
+            if href and "javascript:void(0)" not in href.lower()
+        ))
+        if links:
+            return links
+    return []
+
+
+class DomainStrategyStore:
+    """Small JSON file remembering whether each domain needs a browser ("browser") or not ("static")."""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as file:
+                self._decisions = json.load(file)
+        except (OSError, ValueError):
+            self._decisions = {}
+
+    def get(self, url: str) -> Optional[str]:
+        """Returns the remembered mode for the URL's domain, or None if unknown or expired."""
+        decision = self._decisions.get(domain_of(url))
+        if not decision or time.time() - decision["decided_at"] > DECISION_TTL_SECONDS:
+            return None
+        return decision["mode"]
+
+    def set(self, url: str, mode: str) -> None:
+        with self._lock:
+            self._decisions[domain_of(url)] = {"mode": mode, "decided_at": time.time()}
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(self._decisions, file, indent=2)
+            os.replace(temp_path, self.path)
+
+
+_store = None
+
+
+def get_strategy_store() -> DomainStrategyStore:
+    """Returns the process-wide domain decision store."""
+    global _store
+    if _store is None:
+        _store = DomainStrategyStore()
+    return _store
@@ -0,0 +1,292 @@
+import os
+import json
+import glob
+import time
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional
+
+JOBS_DIR = os.getenv("SCRAPE_JOBS_DIR", ".scrape_jobs")
+# Downloads generated from finished jobs (see exports.py)
+EXPORTS_DIR = os.path.join(JOBS_DIR, "exports")
+# Scrapes that run at once; each worker process keeps its own warm browser pool between jobs
+JOB_WORKERS = int(os.getenv("SCRAPE_JOB_WORKERS", "2"))
+# Finished jobs kept so their results can be reopened; older ones are deleted
+MAX_KEPT_JOBS = int(os.getenv("SCRAPE_JOBS_KEPT", "50"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+# Left queued or running by a Streamlit server that has since stopped
+INTERRUPTED = "interrupted"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+JOB_COLUMNS = ("id", "url", "fields", "model", "status", "cancel_requested", "chunks_done", "chunks_seen",
+               "pages", "rows", "input_tokens", "output_tokens", "total_cost", "error", "fetch_info",
+               "created_at", "updated_at")
+
+
+class JobStore:
+    """
+    SQLite record of scrape jobs: status, progress, the rows extracted so far and the final totals.
+    The UI process and the job workers each open their own connection to the same file.
+    """
+
+    def __init__(self, path: str = os.path.join(JOBS_DIR, "jobs.sqlite3"), max_kept: int = MAX_KEPT_JOBS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_kept = max_kept
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL lets the UI read progress while a worker is writing it
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   url TEXT NOT NULL,
+                   fields TEXT NOT NULL,
+                   model TEXT NOT NULL,
+                   status TEXT NOT NULL,
+                   cancel_requested INTEGER NOT NULL DEFAULT 0,
+                   chunks_done INTEGER NOT NULL DEFAULT 0,
+                   chunks_seen INTEGER NOT NULL DEFAULT 0,
+                   pages INTEGER NOT NULL DEFAULT 0,
+                   rows INTEGER NOT NULL DEFAULT 0,
+                   input_tokens INTEGER NOT NULL DEFAULT 0,
+                   output_tokens INTEGER NOT NULL DEFAULT 0,
+                   total_cost REAL NOT NULL DEFAULT 0,
+                   error TEXT,
+                   fetch_info TEXT,
+                   created_at REAL NOT NULL,
+                   updated_at REAL NOT NULL
+               );
+               CREATE TABLE IF NOT EXISTS job_rows (
+                   job_id INTEGER NOT NULL,
+                   chunk INTEGER NOT NULL,
+                   position INTEGER NOT NULL,
+                   row TEXT NOT NULL,
+                   PRIMARY KEY (job_id, chunk, position)
+               );"""
+        )
+        self._conn.commit()
+
+    def _update(self, job_id: int, **values) -> None:
+        values['updated_at'] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*values.values(), job_id))
+            self._conn.commit()
+
+    def create(self, url: str, fields: List[str], model: str) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (url, fields, model, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, json.dumps(fields), model, QUEUED, now, now),
+            )
+            self._prune()
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def list_jobs(self, limit: int = MAX_KEPT_JOBS) -> List[Dict]:
+        """The most recent jobs first."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY id DESC LIMIT ?",
+                                      (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    @staticmethod
+    def _job(row) -> Dict:
+        job = dict(zip(JOB_COLUMNS, row))
+        job['fields'] = json.loads(job['fields'])
+        job['fetch_info'] = json.loads(job['fetch_info']) if job['fetch_info'] else {}
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def start(self, job_id: int) -> None:
+        self._update(job_id, status=RUNNING)
+
+    def add_rows(self, job_id: int, chunk: int, rows: List[Dict], progress: Dict) -> None:
+        """Stores the rows of one extracted chunk together with the job's progress."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_rows (job_id, chunk, position, row) VALUES (?, ?, ?, ?)",
+                [(job_id, chunk, position, json.dumps(row, ensure_ascii=False)) for position, row in enumerate(rows)],
+            )
+            self._conn.execute(
+                "UPDATE jobs SET chunks_done = ?, chunks_seen = ?, pages = ?, rows = rows + ?, input_tokens = ?, "
+                "output_tokens = ?, total_cost = ?, updated_at = ? WHERE id = ?",
+                (progress['done'], progress['produced'], progress['pages'], len(rows), progress['input_tokens'],
+                 progress['output_tokens'], progress['total_cost'], now, job_id),
+            )
+            self._conn.commit()
+
+    def rows(self, job_id: int) -> List[Dict]:
+        """The rows extracted so far, in page/chunk order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT row FROM job_rows WHERE job_id = ? ORDER BY chunk, position",
+                                      (job_id,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_row_batches(self, job_id: int, batch_size: int) -> Iterator[List[Dict]]:
+        """The same rows in batches of `batch_size`, so large results are never loaded at once."""
+        last = (-1, -1)
+        while True:
+            with self._lock:
+                batch = self._conn.execute(
+                    "SELECT chunk, position, row FROM job_rows "
+                    "WHERE job_id = ? AND (chunk > ? OR (chunk = ? AND position > ?)) "
+                    "ORDER BY chunk, position LIMIT ?",
+                    (job_id, last[0], last[0], last[1], batch_size)).fetchall()
+            if not batch:
+                return
+            last = batch[-1][:2]
+            yield [json.loads(row[2]) for row in batch]
+
+    def finish(self, job_id: int, status: str, fetch_info: Optional[Dict] = None, error: Optional[str] = None) -> None:
+        self._update(job_id, status=status, error=error,
+                     fetch_info=json.dumps(fetch_info or {}, ensure_ascii=False, default=str))
+
+    def request_cancel(self, job_id: int) -> None:
+        self._update(job_id, cancel_requested=1)
+
+    def is_cancel_requested(self, job_id: int) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_interrupted(self) -> None:
+        """Flags jobs that a previous server process left queued or running; their partial rows stay readable."""
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET status = ?, updated_at = ? WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})",
+                (INTERRUPTED, time.time(), *ACTIVE_STATUSES),
+            )
+            self._conn.commit()
+
+    def _prune(self) -> None:
+        stale = [row[0] for row in self._conn.execute(
+            f"SELECT id FROM jobs WHERE status NOT IN ({', '.join('?' * len(ACTIVE_STATUSES))}) "
+            "ORDER BY id DESC LIMIT -1 OFFSET ?", (*ACTIVE_STATUSES, self.max_kept)).fetchall()]
+        for job_id in stale:
+            self._conn.execute("DELETE FROM job_rows WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            for path in glob.glob(os.path.join(EXPORTS_DIR, f"job_{job_id}_*")):
+                os.remove(path)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Returns this process's connection to the job store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
+
+
+def run_job(job_id: int) -> None:
+    """Runs one scrape in a worker process, storing progress and rows as each chunk is extracted."""
+    # Imported here so only the worker processes load the scraper and its browser and model clients
+    from scraper import scrape_rows
+    from llm_cache import get_llm_cache
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None or job['cancel_requested']:
+        store.finish(job_id, CANCELLED)
+        return
+    store.start(job_id)
+    cache_before = get_llm_cache().stats()
+    try:
+        rows, _, _, _, fetch_info = scrape_rows(
+            job['url'], job['fields'], job['model'],
+            on_chunk=lambda chunk, chunk_rows, progress: store.add_rows(job_id, chunk, chunk_rows, progress),
+            should_stop=lambda: store.is_cancel_requested(job_id),
+        )
+    except Exception as e:
+        store.finish(job_id, FAILED, error=str(e))
+        return
+    cache_after = get_llm_cache().stats()
+    fetch_info['llm_cache'] = {'hits': cache_after['hits'] - cache_before['hits'],
+                               'misses': cache_after['misses'] - cache_before['misses'],
+                               'entries': cache_after['entries']}
+    if fetch_info.get('stopped'):
+        store.finish(job_id, CANCELLED, fetch_info)
+    elif not rows:
+        store.finish(job_id, FAILED, fetch_info, error="No data was extracted. Please check your fields and try again.")
+    else:
+        store.finish(job_id, DONE, fetch_info)
+
+
+class JobQueue:
+    """
+    Runs scrape jobs on a pool of worker processes. It lives at module level, so it outlives
+    Streamlit reruns; everything the UI shows is read back from the job store.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, workers: int = JOB_WORKERS):
+        self.store = store or get_job_store()
+        self.workers = workers
+        self.store.mark_interrupted()
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn rather than fork: the Streamlit server process runs many threads
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, url: str, fields: List[str], model: str) -> int:
+        job_id = self.store.create(url, fields, model)
+        with self._lock:
+            try:
+                future = self._executor.submit(run_job, job_id)
+            except BrokenProcessPool:
+                # A worker died (e.g. a crashed browser took it down); start a fresh pool
+                self._executor = self._new_executor()
+                future = self._executor.submit(run_job, job_id)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda done: self._on_done(job_id, done))
+        return job_id
+
+    def _on_done(self, job_id: int, future) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            self.store.finish(job_id, CANCELLED)
+        elif future.exception() is not None:
+            self.store.finish(job_id, FAILED, error=str(future.exception()))
+
+    def cancel(self, job_id: int) -> None:
+        """Drops a queued job at once; a running one stops after the chunk it is extracting."""
+        self.store.request_cancel(job_id)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Returns the process-wide job queue."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -1,25 +1,22 @@
 import os
-import time
-import random
-import requests
+from concurrent.futures import ThreadPoolExecutor
 import json
-import pandas as pd
-from datetime import datetime
-from typing import List, Type, Dict, Any, Tuple
-from pydantic import BaseModel, create_model
-import html2text
+from typing import List, Dict, Tuple, Optional, Iterator, Callable
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, JavascriptException
 from dotenv import load_dotenv
 import google.generativeai as genai
 import streamlit as st
-from typing import List, Optional
-from tools import *
+from tools import USER_AGENTS, prune_html, html_to_markdown_with_readability, iter_markdown_chunks
+from fetch_strategy import fetch_static, has_meaningful_content, find_pagination_links_static, get_strategy_store
+from common.lean_fetch import LeanFetchStats, collect_selenium_page_stats
+from common.driver_pool import get_driver_pool
+from common.scroll_engine import scroll_until_settled
+from extraction import stream_extract_chunks
+from llm_cache import get_llm_cache, make_cache_key
 # Load environment variables
 load_dotenv()
 API_KEY = os.getenv('GOOGLE_API_KEY')
@@ -28,6 +25,11 @@ if not API_KEY:
 # Configure Gemini
 genai.configure(api_key=API_KEY)
 HEADLESS_OPTIONS = ["--headless", "--disable-gpu", "--no-sandbox", "--disable-dev-shm-usage"]
+# Max pagination pages fetched and how many are loaded at once (1 = one after another)
+MAX_PAGINATION_PAGES = 10
+PAGINATION_CONCURRENCY = int(os.getenv("PAGINATION_CONCURRENCY", "3"))
+# Try a plain HTTP fetch before launching a browser, remembering the outcome per domain
+STATIC_FIRST = os.getenv("STATIC_FIRST", "1") == "1"
 
 SYSTEM_MESSAGE = """You are an intelligent text extraction and conversion assistant. 
 Your task is to extract structured information from the given text and convert it into a pure JSON format. 
@@ -35,26 +37,26 @@ Format the output as a JSON array of objects, with each object containing the sp
 Extract ALL available entries that match the specified fields.
 Do not include any markdown formatting or code block indicators in your response."""
 
+PAGINATION_XPATHS = [
+    "//ul[contains(@class, 'pagination')]//a",
+    "//div[contains(@class, 'pagination')]//a",
+    "//nav[contains(@class, 'pagination')]//a",
+    "//a[contains(@class, 'page-link')]",
+    "//a[contains(@class, 'pagination')]",
+    "//button[contains(@class, 'pagination')]"
+]
+
 def check_pagination(driver) -> tuple[bool, Optional[List[str]]]:
     """
     Check if the page has pagination and return pagination links if found.
     Returns: (has_pagination, pagination_links)
     """
-    common_pagination_selectors = [
-        "//ul[contains(@class, 'pagination')]//a",
-        "//div[contains(@class, 'pagination')]//a",
-        "//nav[contains(@class, 'pagination')]//a",
-        "//a[contains(@class, 'page-link')]",
-        "//a[contains(@class, 'pagination')]",
-        "//button[contains(@class, 'pagination')]"
-    ]
-    
-    for selector in common_pagination_selectors:
+    for selector in PAGINATION_XPATHS:
         try:
             pagination_elements = driver.find_elements(By.XPATH, selector)
             if pagination_elements:
-                # Extract unique href values, filtering out None and javascript:void(0)
-                links = list(set(
+                # Extract unique href values in page order, filtering out None and javascript:void(0)
+                links = list(dict.fromkeys(
                     elem.get_attribute('href') for elem in pagination_elements
                     if elem.get_attribute('href') and 
                     'javascript:void(0)' not in elem.get_attribute('href').lower()
@@ -88,118 +90,154 @@ def check_pagination(driver) -> tuple[bool, Optional[List[str]]]:
 #     return scrolled
 
 
-def fetch_html_selenium(url: str) -> dict:
+def record_lean_stats(pool, driver, page_url: str, result: Optional[dict]) -> None:
+    """Adds the page's blocked-request and bytes-saved report to `result['lean_fetch']`."""
+    if pool.lean and result is not None:
+        result.setdefault('lean_fetch', []).append(
+            collect_selenium_page_stats(driver, LeanFetchStats(), page_url)
+        )
+
+
+def load_page_source(pool, page_url: str, result: Optional[dict] = None) -> str:
+    """Loads a single page on a pooled driver and returns its HTML."""
+    with pool.driver() as driver:
+        driver.get(page_url)
+        WebDriverWait(driver, 10).until(
+            lambda d: d.execute_script("return document.readyState") != "loading"
+        )
+        html = driver.page_source
+        record_lean_stats(pool, driver, page_url, result)
+        return html
+
+
+def iter_pages_concurrently(pool, page_urls: List[str], concurrency: int = PAGINATION_CONCURRENCY, result: Optional[dict] = None) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
     """
-    Fetches HTML content using Selenium with support for both infinite scroll and pagination.
-    Returns a dictionary containing the HTML content and metadata about the scraping process.
+    Loads pagination pages on up to `concurrency` pooled drivers at once.
+    Yields (url, html, error) tuples in the same order as `page_urls`, each as soon as it is ready.
     """
-    options = Options()
-    options.add_argument(f"user-agent={random.choice(USER_AGENTS)}")
-    for option in HEADLESS_OPTIONS:
-        options.add_argument(option)
-    
-    driver = None
+    def load(page_url):
+        try:
+            return page_url, load_page_source(pool, page_url, result), None
+        except Exception as e:
+            return page_url, None, str(e)
+
+    if concurrency <= 1:
+        for page_url in page_urls:
+            yield load(page_url)
+        return
+    # Streamlit calls are not allowed from worker threads, so errors are reported by the caller
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        yield from executor.map(load, page_urls)
+
+
+def iter_html_pages(url: str, result: dict, concurrency: int = PAGINATION_CONCURRENCY) -> Iterator[str]:
+    """
+    Yields the HTML of each page as soon as it is loaded: the start page first, then any
+    pagination pages in order. Scraping metadata and warnings are recorded in `result`.
+    Makes no Streamlit calls, so it can run on a worker thread.
+    """
+    result.setdefault('pages_scraped', 0)
+    result.setdefault('scraping_method', 'single_page')
+    result.setdefault('warnings', [])
+    pool = get_driver_pool(HEADLESS_OPTIONS, USER_AGENTS)
+    driver = pool.borrow()
     try:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-        driver.set_page_load_timeout(30)
-        
-        result = {
-            'html_content': [],
-            'pages_scraped': 0,
-            'scraping_method': 'single_page',
-            'success': False
-        }
-        
-        # Load initial page
-        with st.spinner("Loading webpage..."):
-            driver.get(url)
-            time.sleep(3)
+        # Load initial page; scroll_page waits for it to settle instead of a fixed sleep
+        driver.get(url)
         
         # First try scrolling
         wait = WebDriverWait(driver, 10)
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
         
-        is_scrollable = scroll_page(driver)
+        is_scrollable = scroll_page(driver, result)
+        first_page = driver.page_source
+        record_lean_stats(pool, driver, url, result)
+        result['pages_scraped'] = 1
         if is_scrollable:
-            result['html_content'].append(driver.page_source)
-            result['pages_scraped'] = 1
             result['scraping_method'] = 'infinite_scroll'
-            result['success'] = True
-        else:
-            # If not scrollable, check for pagination
-            has_pagination, pagination_links = check_pagination(driver)
-            
-            if has_pagination and pagination_links:
-                result['scraping_method'] = 'pagination'
-                # Add the first page
-                result['html_content'].append(driver.page_source)
-                result['pages_scraped'] += 1
-                
-                # Scrape subsequent pages
-                for page_url in pagination_links[:10]:  # Limit to 10 pages for safety
-                    try:
-                        with st.spinner(f"Loading page {result['pages_scraped'] + 1}..."):
-                            driver.get(page_url)
-                            time.sleep(3)
-                            
-                            wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                            result['html_content'].append(driver.page_source)
-                            result['pages_scraped'] += 1
-                    except Exception as e:
-                        st.warning(f"Failed to load page {page_url}: {str(e)}")
-                        break
-                
-                result['success'] = True
-            else:
-                # No pagination or scrolling - just get the single page
-                result['html_content'].append(driver.page_source)
-                result['pages_scraped'] = 1
-                result['scraping_method'] = 'single_page'
-                result['success'] = True
+            yield first_page
+            return
         
-        if not result['html_content']:
-            raise ValueError("No HTML content retrieved")
+        # If not scrollable, check for pagination
+        has_pagination, pagination_links = check_pagination(driver)
+        if not (has_pagination and pagination_links):
+            # No pagination or scrolling - just get the single page
+            yield first_page
+            return
         
-        return result
-    
-    except Exception as e:
-        raise ValueError(f"Failed to fetch HTML: {str(e)}")
-    
+        result['scraping_method'] = 'pagination'
+        # Release this driver so it can serve one of the parallel page loads
+        pool.give_back(driver)
+        driver = None
+        yield first_page
+        
+        # Scrape subsequent pages
+        page_urls = pagination_links[:MAX_PAGINATION_PAGES]  # Limit pages for safety
+        for page_url, html, error in iter_pages_concurrently(pool, page_urls, concurrency, result):
+            if error:
+                result['warnings'].append(f"Failed to load page {page_url}: {error}")
+                break
+            result['pages_scraped'] += 1
+            yield html
     finally:
         if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+            # Hand the browser back for reuse; give_back drops it if it is no longer healthy
+            pool.give_back(driver, pages=max(result['pages_scraped'], 1))
+
+
+def iter_static_pages(url: str, first_page: str, result: dict, concurrency: int = PAGINATION_CONCURRENCY) -> Iterator[str]:
+    """Yields a server-rendered page and its pagination pages, fetched over plain HTTP."""
+    result['fetch_mode'] = 'static'
+    result['pages_scraped'] = 1
+    yield first_page
+    
+    page_urls = find_pagination_links_static(first_page, url, PAGINATION_XPATHS)[:MAX_PAGINATION_PAGES]
+    if not page_urls:
+        return
+    result['scraping_method'] = 'pagination'
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for page_url, html in zip(page_urls, executor.map(fetch_static, page_urls)):
+            if html is None:
+                result['warnings'].append(f"Failed to load page {page_url}")
+                break
+            result['pages_scraped'] += 1
+            yield html
 
 
-def scroll_page(driver: webdriver.Chrome) -> None:
-    """Scrolls the page to load dynamic content."""
+def iter_html_pages_auto(url: str, result: dict, concurrency: int = PAGINATION_CONCURRENCY) -> Iterator[str]:
+    """
+    Static-first fetch: uses plain HTTP when it yields meaningful content and only falls
+    back to the browser when the page needs JavaScript. The decision is remembered per domain.
+    """
+    result.setdefault('scraping_method', 'single_page')
+    result.setdefault('warnings', [])
+    store = get_strategy_store()
+    if STATIC_FIRST and store.get(url) != 'browser':
+        html = fetch_static(url)
+        if html and has_meaningful_content(html):
+            if store.get(url) != 'static':
+                store.set(url, 'static')
+            yield from iter_static_pages(url, html, result, concurrency)
+            return
+        store.set(url, 'browser')
+    result['fetch_mode'] = 'browser'
+    yield from iter_html_pages(url, result, concurrency)
+
+
+def scroll_page(driver: webdriver.Chrome, result: Optional[dict] = None) -> bool:
+    """
+    Scrolls the page to load dynamic content, advancing whenever the DOM and network go quiet.
+    Returns True if scrolling loaded more content; time spent per phase is stored in `result`.
+    """
     try:
-        with st.spinner("Scrolling page to load dynamic content..."):
-            last_height = driver.execute_script("return document.body.scrollHeight")
-            
-            scroll_progress = st.progress(0)
-            while True:
-                for i in range(0, last_height, 800):
-                    driver.execute_script(f"window.scrollTo(0, {i});")
-                    progress = min(i / last_height, 1.0)
-                    scroll_progress.progress(progress)
-                    time.sleep(0.1)
-                
-                time.sleep(2)
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                
-                if new_height == last_height:
-                    break
-                    
-                last_height = new_height
-            
-            driver.execute_script("window.scrollTo(0, 0);")
-            scroll_progress.progress(1.0)
-            
-    except Exception as e:
-        pass  
+        report = scroll_until_settled(driver)
+    except (TimeoutException, JavascriptException) as e:
+        if result is not None:
+            result.setdefault('warnings', []).append(f"Scrolling stopped early: {e.msg or type(e).__name__}")
+        return False
+    if result is not None:
+        result['scroll_timings'] = report['timings']
+    return report['loaded_more']
 
 def format_data_with_genai(data: str, fields: List[str], model: str) -> Tuple[List[Dict], int, int, float]:
     """Format data using selected AI model."""
@@ -234,45 +272,99 @@ Example format: [{{"field1": "value1"}}, {{"field1": "value2"}}]
     except json.JSONDecodeError:
         return [], input_tokens, token_counts["output_tokens"], 0
         
+    get_llm_cache().put(make_cache_key(data, fields, model), formatted_data)
     total_cost = (token_counts["input_tokens"] + token_counts["output_tokens"]) * 0.001
     return formatted_data, token_counts["input_tokens"], token_counts["output_tokens"], total_cost
 
-def perform_scrape(url: str, fields: List[str], model: str) -> Tuple[pd.DataFrame, int, int, float]:
-    """Main scraping function."""
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    with st.spinner("Fetching webpage content..."):
-        raw_html = fetch_html_selenium(url)
-        markdown = markdown = html_to_markdown_with_readability("".join(raw_html['html_content']))
+def cached_format_data(data: str, fields: List[str], model: str) -> Optional[Tuple[List[Dict], int, int, float]]:
+    """Returns a previous extraction of this chunk from the on-disk cache, at no token cost."""
+    cached = get_llm_cache().get(make_cache_key(data, fields, model))
+    if cached is None:
+        return None
+    return cached, 0, 0, 0
+
+def iter_page_chunks(url: str, model: str, result: dict,
+                     should_stop: Optional[Callable[[], bool]] = None) -> Iterator[str]:
+    """
+    Fetch -> prune -> markdown -> chunk, one page at a time: each page is converted and
+    chunked as soon as it arrives, so extraction can start while later pages still load.
+    Pruning savings and the number of chunks produced are accumulated in `result`.
+    No further pages are fetched once `should_stop()` returns True.
+    """
+    result.setdefault('bytes_saved', 0)
+    result.setdefault('tokens_saved', 0)
+    result.setdefault('chunks', 0)
+    try:
+        for html in iter_html_pages_auto(url, result):
+            if should_stop and should_stop():
+                result['stopped'] = True
+                return
+            # Strip non-content markup first so it never reaches the prompt
+            pruned, stats = prune_html(html)
+            result['bytes_saved'] += stats['bytes_saved']
+            result['tokens_saved'] += stats['tokens_saved']
+            for chunk in iter_markdown_chunks(html_to_markdown_with_readability(pruned), model):
+                result['chunks'] += 1
+                yield chunk
+    except Exception as e:
+        raise ValueError(f"Failed to fetch HTML: {str(e)}")
+
+
+def scrape_rows(url: str, fields: List[str], model: str,
+                on_chunk: Optional[Callable[[int, List[Dict], dict], None]] = None,
+                should_stop: Optional[Callable[[], bool]] = None) -> Tuple[List[Dict], int, int, float, dict]:
+    """
+    The scrape pipeline without Streamlit calls, so it can also run in a job worker process.
+    `on_chunk(index, rows, progress)` is called as each chunk is extracted, where progress holds
+    done/produced chunk counts, pages loaded and running token totals. When `should_stop()`
+    returns True the remaining chunks are abandoned.
+    Returns (rows in page/chunk order, input tokens, output tokens, cost, fetch info).
+    """
+    fetch_info = {}
+    chunk_results = {}
+    progress = {'done': 0, 'produced': 0, 'pages': 0, 'input_tokens': 0, 'output_tokens': 0, 'total_cost': 0}
     
-    chunks = split_text_into_chunks(markdown, chunk_size=8000)
+    # Pages are fetched, converted and chunked on a background thread while chunks are
+    # extracted concurrently within the rate limits
+    stream = stream_extract_chunks(
+        iter_page_chunks(url, model, fetch_info, should_stop),
+        lambda chunk: format_data_with_genai(chunk, fields, model),
+        lookup=lambda chunk: cached_format_data(chunk, fields, model),
+        should_stop=should_stop
+    )
+    try:
+        for done, (index, chunk_result) in enumerate(stream, start=1):
+            chunk_results[index] = chunk_result
+            progress['done'] = done
+            # The total is only known once the last page is in, so track the chunks seen so far
+            progress['produced'] = max(done, fetch_info.get('chunks', 0))
+            progress['pages'] = fetch_info.get('pages_scraped', 0)
+            if chunk_result is not None:
+                formatted_data, input_tokens, output_tokens, chunk_cost = chunk_result
+                progress['input_tokens'] += input_tokens
+                progress['output_tokens'] += output_tokens
+                progress['total_cost'] += chunk_cost
+            if on_chunk:
+                on_chunk(index, chunk_result[0] if chunk_result else [], progress)
+    finally:
+        # Stops the producer thread and waits for in-flight chunks, also when on_chunk raised
+        stream.close()
+    if should_stop and should_stop():
+        fetch_info['stopped'] = True
     
+    # Rows are returned in page/chunk order regardless of completion order
     all_formatted_data = []
-    total_input_tokens = 0
-    total_output_tokens = 0
-    total_cost = 0
-    
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for i, chunk in enumerate(chunks):
-        try:
-            status_text.text(f"Processing chunk {i+1} of {len(chunks)}...")
-            progress_bar.progress((i + 1) / len(chunks))
-            
-            formatted_data, input_tokens, output_tokens, chunk_cost = format_data_with_genai(
-                chunk, fields, model
-            )
-            
-            all_formatted_data.extend(formatted_data)
-            total_input_tokens += input_tokens
-            total_output_tokens += output_tokens
-            total_cost += chunk_cost
-            
-        except Exception as e:
-            continue  # Suppress error messages for individual chunks
+    for index in sorted(chunk_results):
+        if chunk_results[index] is not None:
+            all_formatted_data.extend(chunk_results[index][0])
     
-    if not all_formatted_data:
-        st.error("No data was extracted. Please check your fields and try again.")
-        return pd.DataFrame(), 0, 0, 0
-        
-    return pd.DataFrame(all_formatted_data), total_input_tokens, total_output_tokens, total_cost
\ No newline at end of file
+    # Only chunks the model actually answered say anything about the page; failed ones (quota,
+    # API or key errors) are None and must not push a static-friendly site onto the browser
+    answered = any(result is not None for result in chunk_results.values())
+    if (answered and not all_formatted_data and not fetch_info.get('stopped')
+            and fetch_info.get('fetch_mode') == 'static'):
+        # The static HTML looked complete but held nothing useful; use the browser next time
+        get_strategy_store().set(url, 'browser')
+        fetch_info['switched_to_browser'] = True
+    return (all_formatted_data, progress['input_tokens'], progress['output_tokens'],
+            progress['total_cost'], fetch_info)
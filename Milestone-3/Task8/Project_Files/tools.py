@@ -1,6 +1,9 @@
-from typing import List, Type, Dict, Any, Tuple
-from pydantic import BaseModel, create_model
+import io
+import re
+from typing import Dict, Tuple, Iterator, Optional
 import html2text
+import lxml.html
+from lxml import etree
 # Constants
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -66,6 +69,82 @@ USER_AGENTS = [
 # def create_listings_container_model(listing_model: Type[BaseModel]) -> Type[BaseModel]:
 #    """Creates a container model for listings."""
 #    return create_model('DynamicListingsContainer', listings=(List[listing_model], ...))
+# Subtrees that never carry listing content but still end up in the prompt
+NON_CONTENT_TAGS = ["script", "style", "noscript", "template", "svg", "canvas", "iframe",
+                    "nav", "footer", "aside", "button", "select", "link", "meta"]
+NON_CONTENT_ROLES = ["navigation", "banner", "contentinfo", "dialog", "alertdialog", "search"]
+# Matched as whole words of an id or class ("cookie-banner", "social_links"), not inside words like "shareholders"
+BOILERPLATE_PATTERN = re.compile(r"(?<![a-z0-9])(cookies?|consent|gdpr|banner|newsletter|popup|modal|share|social|breadcrumbs?)(?![a-z0-9])", re.I)
+# Only these wrappers are dropped for a boilerplate id/class; inline elements and cells are left alone
+CONTAINER_TAGS = {"div", "section", "aside", "header", "form", "ul", "ol", "dialog", "figure", "table"}
+
+
+def _attached(element, root) -> bool:
+    """False once the element went out with a dropped ancestor."""
+    return element.getparent() is not None and any(ancestor is root for ancestor in element.iterancestors())
+
+
+def _drop(element) -> int:
+    """Removes an element (keeping its tail text) and returns the visible characters removed."""
+    removed = 0 if element.tag in ("script", "style", "noscript", "template") else len(element.text_content())
+    element.drop_tree()
+    return removed
+
+
+def _content_score(element) -> int:
+    """Text length minus link text length: high for content, low for menus and link lists."""
+    text = len(element.text_content())
+    link_text = sum(len(a.text_content()) for a in element.iter("a"))
+    return text - 2 * link_text
+
+
+def prune_html(raw_html: str, main_content_only: bool = False) -> Tuple[str, Dict[str, int]]:
+    """
+    Removes scripts, styles, navigation, cookie banners, footers, SVG and other
+    non-content subtrees before markdown conversion. With `main_content_only`, keeps just
+    <main>/[role=main] or else the densest text region. Returns the pruned HTML and stats.
+    """
+    bytes_before = len(raw_html.encode("utf-8"))
+    try:
+        root = lxml.html.fromstring(raw_html)
+    except (etree.ParserError, ValueError):
+        return raw_html, {"bytes_before": bytes_before, "bytes_after": bytes_before, "bytes_saved": 0, "tokens_saved": 0}
+
+    removed_chars = 0
+    etree.strip_elements(root, etree.Comment, with_tail=False)
+    for element in list(root.iter(*NON_CONTENT_TAGS)):
+        if _attached(element, root):
+            removed_chars += _drop(element)
+    for element in list(root.iter()):
+        if not isinstance(element.tag, str) or element.tag in ("html", "body", "main") or not _attached(element, root):
+            continue
+        marker = " ".join(filter(None, [element.get("id"), element.get("class")]))
+        boilerplate = element.tag in CONTAINER_TAGS and marker and BOILERPLATE_PATTERN.search(marker)
+        hidden = element.get("aria-hidden") == "true" or "display:none" in (element.get("style") or "").replace(" ", "")
+        if hidden or element.get("role") in NON_CONTENT_ROLES or boilerplate:
+            removed_chars += _drop(element)
+
+    if main_content_only:
+        main = next(iter(root.xpath(".//main | .//*[@role='main']")), None)
+        if main is None:
+            candidates = root.xpath(".//article | .//section | .//div")
+            main = max(candidates, key=_content_score, default=None)
+        if main is not None:
+            body = root.find(".//body")
+            total_chars = len((body if body is not None else root).text_content())
+            removed_chars += max(total_chars - len(main.text_content()), 0)
+            root = main
+
+    pruned = lxml.html.tostring(root, encoding="unicode")
+    bytes_after = len(pruned.encode("utf-8"))
+    return pruned, {
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after,
+        "tokens_saved": removed_chars // 4,
+    }
+
+
 def html_to_markdown_with_readability(raw_html: str) -> str:
     """Converts HTML to markdown format with improved readability."""
     try:
@@ -79,24 +158,81 @@ def html_to_markdown_with_readability(raw_html: str) -> str:
         raise ValueError(f"Failed to convert HTML to markdown: {str(e)}")
 
 
-def split_text_into_chunks(text: str, chunk_size: int) -> List[str]:
-    """Splits text into chunks while preserving complete entries."""
-    words = text.split()
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    
-    for word in words:
-        word_size = len(word) + 1
-        if current_size + word_size > chunk_size and current_chunk:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = [word]
-            current_size = word_size
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token), used to size prompts without an API call."""
+    return len(text) // 4 + 1
+
+
+# Target prompt size per chunk for each model. Gemini's context is far larger, but the
+# JSON answer for a chunk has to fit in its 8k output tokens.
+MODEL_CHUNK_TOKENS = {
+    "gemini flash-1.5": 6000,
+}
+DEFAULT_CHUNK_TOKENS = 4000
+
+LIST_ITEM_PATTERN = re.compile(r"^\s{0,3}([*+-]|\d+[.)])\s+")
+
+
+def iter_markdown_blocks(markdown: str) -> Iterator[str]:
+    """Yields headings, list items and blank-line separated blocks, keeping their newlines."""
+    block = []
+    for line in io.StringIO(markdown):
+        line = line.rstrip("\n")
+        if not line.strip():
+            if block:
+                yield "\n".join(block)
+                block = []
+            continue
+        starts_block = line.lstrip().startswith("#") or LIST_ITEM_PATTERN.match(line)
+        if starts_block and block:
+            yield "\n".join(block)
+            block = []
+        block.append(line)
+    if block:
+        yield "\n".join(block)
+
+
+def split_oversized_block(block: str, token_budget: int) -> Iterator[str]:
+    """Splits a single block that exceeds the budget on line, then word, boundaries."""
+    part = []
+    part_tokens = 0
+    for line in block.split("\n"):
+        pieces = [line]
+        if estimate_tokens(line) > token_budget:
+            words = line.split(" ")
+            step = max(1, len(words) * token_budget // estimate_tokens(line))
+            pieces = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if part and part_tokens + piece_tokens > token_budget:
+                yield "\n".join(part)
+                part, part_tokens = [], 0
+            part.append(piece)
+            part_tokens += piece_tokens
+    if part:
+        yield "\n".join(part)
+
+
+def iter_markdown_chunks(markdown: str, model: Optional[str] = None, token_budget: Optional[int] = None) -> Iterator[str]:
+    """
+    Packs markdown blocks into chunks of up to `token_budget` tokens (the model's default
+    budget if not given), only breaking between headings, list items and paragraphs.
+    """
+    budget = token_budget or MODEL_CHUNK_TOKENS.get(model, DEFAULT_CHUNK_TOKENS)
+    chunk = []
+    chunk_tokens = 0
+    for block in iter_markdown_blocks(markdown):
+        block_tokens = estimate_tokens(block)
+        if block_tokens > budget:
+            pieces = list(split_oversized_block(block, budget))
         else:
-            current_chunk.append(word)
-            current_size += word_size
-    
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    
-    return chunks
\ No newline at end of file
+            pieces = [block]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if chunk and chunk_tokens + piece_tokens > budget:
+                yield "\n\n".join(chunk)
+                chunk, chunk_tokens = [], 0
+            chunk.append(piece)
+            chunk_tokens += piece_tokens
+    if chunk:
+        yield "\n\n".join(chunk)
@@ -1,10 +1,15 @@
 import os
 import re
+import time
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import streamlit as st
-import json
+
+from common.http_client import http_get
+from common.html_parser import make_soup
+from common.wigan_listings import DIRECTORY_SCHEMA
+from common.category_index import get_category_index
+from common.listing_search import get_listing_index, write_category_sidecar
 
 # Function to create a folder if it doesn't exist
 def create_folder(folder_name):
@@ -27,36 +32,20 @@ def write_to_xml(data, file_path):
 def write_to_json(data, file_path):
     data.to_json(file_path, orient="records", lines=True)
 
-# Function to scrape data from the page
+# Function to scrape data from the page (one dict per listing, selectors compiled once in DIRECTORY_SCHEMA)
 def scrape_data_from_page(soup):
-    data = []
-    results = soup.select("[id^=hit-]")
-    
-    for result in results:
-        entry = {
-            "Title": result.select_one("h3 a").get_text(strip=True) if result.select_one("h3 a") else "N/A",
-            "Schedule": result.select_one(".mt-1.mb-3.font-weight-bold").get_text(strip=True) if result.select_one(".mt-1.mb-3.font-weight-bold") else "N/A",
-            "Description": result.select_one("div.result-hit-body > div.mb-2, div.mb-2").get_text(strip=True) if result.select_one("div.result-hit-body > div.mb-2, div.mb-2") else "N/A",
-            "Address": " ".join([span.get_text(strip=True) for span in result.select(".mb-3.text-muted .comma_split_line")]) if result.select(".mb-3.text-muted .comma_split_line") else "N/A",
-            "Phone": result.select_one(".contact-links ul li:nth-child(1) span.comma_split_line.d-none.d-sm-block.text-body").get_text(strip=True) if result.select_one(".contact-links ul li:nth-child(1) span.comma_split_line.d-none.d-sm-block.text-body") else "N/A",
-            "Email": result.select_one(".contact-links ul li:nth-child(2) a").get("href").replace("mailto:", "").strip() if result.select_one(".contact-links ul li:nth-child(2) a") else "N/A",
-            "Website": result.select_one(".contact-links ul li:nth-child(3) a").get("href").strip() if result.select_one(".contact-links ul li:nth-child(3) a") else "N/A"
-        }
-        data.append(entry)
-    
-    return pd.DataFrame(data)
+    return DIRECTORY_SCHEMA.extract_records(soup)
 
 # Function to scrape all pages of a category
 def scrape_category_pages(url):
-    all_data = pd.DataFrame()
+    all_rows = []
     while url:
-        response = requests.get(url)
+        response = http_get(url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = make_soup(response.text)
 
         # Scrape data from the current page
-        page_data = scrape_data_from_page(soup)
-        all_data = pd.concat([all_data, page_data], ignore_index=True)
+        all_rows.extend(scrape_data_from_page(soup))
 
         # Find the next page link
         active_page = soup.select_one("nav > ol > li.page-item.active")
@@ -68,12 +57,17 @@ def scrape_category_pages(url):
                 url = None  # No more pages
         else:
             url = None
-    return all_data
+    # Build the DataFrame once instead of concatenating one per page
+    return pd.DataFrame(all_rows, columns=DIRECTORY_SCHEMA.columns)
 
 # Recursive function to fetch all nested categories and subcategories
 def fetch_nested_categories(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # Served from the prebuilt category index when it covers this URL, so the dropdowns don't wait on the site
+    indexed = get_category_index().children(url)
+    if indexed is not None:
+        return {child['label'] or child['name']: child['url'] for child in indexed}
+    response = http_get(url)
+    soup = make_soup(response.text)
     nested_categories = {}
     
     for block in soup.find_all(['li', 'div'], class_='category-block'):
@@ -85,25 +79,49 @@ def fetch_nested_categories(url):
             nested_categories[sub_name] = full_sub_url
     return nested_categories
 
-# Function to display dropdowns for nested categories and fetch the selected subcategory URL
-def select_nested_category(url):
+# Function to display dropdowns for nested categories and fetch the selected subcategory URL,
+# along with the names of the categories chosen on the way
+def select_nested_category(url, path=()):
     nested_categories = fetch_nested_categories(url)
     if nested_categories:
         selected_subcategory = st.selectbox("Select a Subcategory", list(nested_categories.keys()))
         next_url = nested_categories[selected_subcategory]
-        return select_nested_category(next_url)  # Recursive call to handle further nesting
+        # Recursive call to handle further nesting
+        return select_nested_category(next_url, path + (category_name(next_url, selected_subcategory),))
     else:
-        return url  # No more subcategories, return the final URL for scraping
+        return url, list(path)  # No more subcategories, return the final URL for scraping
+
+# Function to name a category the way the Wigan_Exploration folders do (by its link text), so
+# search facets line up; the dropdown label is used when the category index doesn't know the URL
+def category_name(url, label):
+    node = get_category_index().nodes.get(url)
+    return node['name'] if node and node.get('name') else label
+
+# Function to show a keyword search over every listing scraped so far, with category facets
+def search_listings():
+    index = get_listing_index()
+    index.refresh()  # Picks up data.csv files written by crawls since the last search
+    query = st.text_input("Search scraped listings", placeholder="e.g. youth club, swimming, dementia")
+    if not query:
+        return
+    started = time.perf_counter()
+    counts = dict(index.facets(query))
+    categories = st.multiselect("Filter by category", list(counts), format_func=lambda name: f"{name} ({counts[name]})")
+    results = index.search(query, categories)
+    st.caption(f"{len(results)} best matches in {(time.perf_counter() - started) * 1000:.0f} ms")
+    st.dataframe(pd.DataFrame(results))
 
 # Streamlit Interface
 st.title("Wigan Directory Data Scraper")
 st.write("Select a category and subcategory to scrape data from the Wigan directory.")
 
+search_listings()
+
 # Main base URL
 base_url = "https://directory.wigan.gov.uk/kb5/wigan/fsd/home.page"
 
 # Use recursive dropdowns to get the final subcategory URL for scraping
-selected_url = select_nested_category(base_url)
+selected_url, selected_path = select_nested_category(base_url)
 
 # Scrape Data
 if st.button("Scrape Data"):
@@ -121,7 +139,10 @@ if st.button("Scrape Data"):
     xml_path = os.path.join(folder, f"{sanitize_folder_name(selected_url)}.xml")
     json_path = os.path.join(folder, f"{sanitize_folder_name(selected_url)}.json")
 
+    # The category goes next to the CSV first, so the search index files the rows under it
+    write_category_sidecar(csv_path, selected_url, selected_path)
     write_to_csv(scraped_data, csv_path)
+    get_listing_index().update()
     write_to_xml(scraped_data, xml_path)
     write_to_json(scraped_data, json_path)
 
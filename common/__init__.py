@@ -0,0 +1 @@
+"""Helpers shared by the scrapers across the milestone folders."""
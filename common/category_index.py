@@ -0,0 +1,121 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+import subprocess
+import threading
+from common.wigan_listings import LISTING_SCHEMA
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+INDEX_PATH = os.getenv("WIGAN_CATEGORY_INDEX", os.path.join(REPO_ROOT, ".wigan_category_index.json"))
+# The index is rebuilt in the background once it is older than this
+INDEX_TTL_SECONDS = int(os.getenv("WIGAN_CATEGORY_INDEX_TTL_HOURS", "24")) * 3600
+ROOT_URL = "https://directory.wigan.gov.uk/kb5/wigan/fsd/home.page"
+# The Task4-part1 explorer builds the index; the background refresh re-runs it
+EXPLORER_SCRIPT = os.path.join(REPO_ROOT, "Milestone-2", "Task-4-part1", "Task4-part1.py")
+# A rebuild that runs longer than this is abandoned; after a failed one, the next waits this long
+REFRESH_TIMEOUT_SECONDS = 2 * 3600
+REFRESH_RETRY_SECONDS = 3600
+RESULT_COUNT_PATTERN = re.compile(r'(\d[\d,]*)\s+results?\b', re.I)
+
+
+def count_results(soup):
+    """Total results a leaf category reports, or the listings on its first page if it shows no total."""
+    match = RESULT_COUNT_PATTERN.search(soup.get_text(" "))
+    if match:
+        return int(match.group(1).replace(',', ''))
+    return len(LISTING_SCHEMA.extract_rows(soup))
+
+
+class CategoryIndex:
+    """
+    Flat map of category URL -> {name, depth, result_count, children}, where each child is
+    {name, label, url}. `label` is the card title shown on the site, when it differs from the link text.
+    """
+
+    def __init__(self, root_url=ROOT_URL, nodes=None, built_at=None):
+        self.root_url = root_url
+        self.nodes = nodes if nodes is not None else {}
+        self.built_at = built_at
+
+    def add_node(self, url, name, depth, children, result_count=None):
+        self.nodes[url] = {'name': name, 'depth': depth, 'result_count': result_count, 'children': children}
+
+    def children(self, url):
+        """The child categories of an indexed URL ([] for a leaf), or None if the URL is not indexed."""
+        node = self.nodes.get(url)
+        return node['children'] if node is not None else None
+
+    def is_stale(self, ttl_seconds=INDEX_TTL_SECONDS):
+        return self.built_at is None or time.time() - self.built_at > ttl_seconds
+
+    def save(self, path=INDEX_PATH):
+        self.built_at = time.time()
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as index_file:
+            json.dump({'root': self.root_url, 'built_at': self.built_at, 'nodes': self.nodes},
+                      index_file, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """The saved index, or an empty one if there is none yet."""
+        try:
+            with open(path, encoding='utf-8') as index_file:
+                data = json.load(index_file)
+            return cls(data['root'], data['nodes'], data['built_at'])
+        except (OSError, ValueError, KeyError):
+            return cls()
+
+
+logger = logging.getLogger(__name__)
+
+_index = None
+_index_lock = threading.Lock()
+_refreshing = threading.Event()
+_last_attempt = 0
+
+
+def _refresh(path):
+    """Rebuilds the index with the explorer in a child process, then swaps it in."""
+    global _index
+    try:
+        completed = subprocess.run([sys.executable, EXPLORER_SCRIPT, "--index-only", "--index", path],
+                                   cwd=os.path.dirname(EXPLORER_SCRIPT), capture_output=True, text=True,
+                                   timeout=REFRESH_TIMEOUT_SECONDS)
+        if completed.returncode == 0:
+            with _index_lock:
+                _index = CategoryIndex.load(path)
+        else:
+            logger.warning("Category index rebuild failed (exit %s), retrying in %ss:\n%s", completed.returncode,
+                           REFRESH_RETRY_SECONDS, completed.stderr[-2000:])
+    except (OSError, subprocess.TimeoutExpired) as error:
+        logger.warning("Category index rebuild failed, retrying in %ss: %s", REFRESH_RETRY_SECONDS, error)
+    finally:
+        _refreshing.clear()
+
+
+def refresh_in_background(path=INDEX_PATH):
+    """Starts a rebuild unless one is running or the last attempt was under REFRESH_RETRY_SECONDS ago.
+    Never blocks the caller."""
+    global _last_attempt
+    with _index_lock:
+        if _refreshing.is_set() or time.time() - _last_attempt < REFRESH_RETRY_SECONDS:
+            return
+        _refreshing.set()
+        _last_attempt = time.time()
+    threading.Thread(target=_refresh, args=(path,), daemon=True).start()
+
+
+def get_category_index(path=INDEX_PATH):
+    """Returns the index loaded once per process, starting a background rebuild when it is missing or stale."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CategoryIndex.load(path)
+        index = _index
+    if index.is_stale():
+        refresh_in_background(path)
+    return index
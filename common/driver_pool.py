@@ -0,0 +1,209 @@
+import os
+import time
+import queue
+import random
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+
+from common.lean_fetch import apply_lean_chrome_options, enable_lean_fetch_selenium
+
+# Pool settings, overridable from the environment (.env)
+POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "3"))
+MAX_PAGES_PER_DRIVER = int(os.getenv("DRIVER_MAX_PAGES", "50"))
+# Block images, fonts, media, CSS and analytics and use the eager page-load strategy
+LEAN_FETCH = os.getenv("LEAN_FETCH", "1") == "1"
+PAGE_LOAD_TIMEOUT = 30
+DEFAULT_OPTIONS = ["--headless", "--disable-gpu", "--no-sandbox", "--disable-dev-shm-usage"]
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def get_driver_path() -> str:
+    """Installs chromedriver once per process and returns the cached path."""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = ChromeDriverManager().install()
+        return _driver_path
+
+
+class DriverPool:
+    """Process-wide pool of pre-launched, reusable headless Chrome drivers."""
+
+    def __init__(self, size: int = POOL_SIZE, max_pages: int = MAX_PAGES_PER_DRIVER,
+                 chrome_options: Optional[List[str]] = None, lean: bool = LEAN_FETCH,
+                 user_agents: Optional[List[str]] = None):
+        self.size = max(1, size)
+        self.lean = lean
+        self.max_pages = max_pages
+        self.chrome_options = chrome_options or DEFAULT_OPTIONS
+        self.user_agents = user_agents or []
+        self._idle = queue.LifoQueue()
+        self._pages: Dict[int, int] = {}
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _launch(self) -> webdriver.Chrome:
+        """Starts a new headless Chrome instance."""
+        options = Options()
+        for option in self.chrome_options:
+            options.add_argument(option)
+        if self.lean:
+            apply_lean_chrome_options(options)
+        driver = webdriver.Chrome(service=Service(get_driver_path()), options=options)
+        driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        if self.lean:
+            enable_lean_fetch_selenium(driver)
+        self._pages[id(driver)] = 0
+        return driver
+
+    def _quit(self, driver: webdriver.Chrome) -> None:
+        """Quits a driver and frees its slot in the pool."""
+        self._pages.pop(id(driver), None)
+        with self._lock:
+            self._created -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def is_healthy(driver: webdriver.Chrome) -> bool:
+        """Returns True if the browser behind the driver still responds."""
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def warm(self) -> None:
+        """Launches drivers until the pool holds `size` of them."""
+        while True:
+            with self._lock:
+                if self._closed or self._created >= self.size:
+                    return
+                self._created += 1
+            try:
+                self._idle.put(self._launch())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                return
+
+    def warm_in_background(self) -> None:
+        """Pre-launches the pool without blocking the caller."""
+        threading.Thread(target=self.warm, daemon=True).start()
+
+    def borrow(self, timeout: float = 60) -> webdriver.Chrome:
+        """Takes a healthy driver from the pool, launching one if there is room."""
+        deadline = time.time() + timeout
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = None
+                with self._lock:
+                    can_launch = self._created < self.size
+                    if can_launch:
+                        self._created += 1
+                if can_launch:
+                    try:
+                        driver = self._launch()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError("No Chrome driver became available in time")
+                    try:
+                        driver = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+
+            if not self.is_healthy(driver):
+                self._quit(driver)
+                continue
+
+            if self.lean:
+                # Drop network events from the previous borrower so page stats start clean
+                try:
+                    driver.get_log("performance")
+                except Exception:
+                    pass
+            # Vary the user agent per borrow like a fresh driver would
+            if self.user_agents:
+                try:
+                    driver.execute_cdp_cmd("Network.setUserAgentOverride",
+                                           {"userAgent": random.choice(self.user_agents)})
+                except Exception:
+                    pass
+            return driver
+
+    def give_back(self, driver: webdriver.Chrome, pages: int = 1, discard: bool = False) -> None:
+        """Returns a driver to the pool, recycling it after `max_pages` page loads."""
+        if driver is None:
+            return
+        used = self._pages.get(id(driver), 0) + pages
+        self._pages[id(driver)] = used
+
+        if discard or self._closed or used >= self.max_pages or not self.is_healthy(driver):
+            self._quit(driver)
+            if not self._closed:
+                self.warm_in_background()
+            return
+
+        try:
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+        except Exception:
+            self._quit(driver)
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, pages: int = 1):
+        """Context manager around borrow/give_back."""
+        driver = self.borrow()
+        failed = False
+        try:
+            yield driver
+        except Exception:
+            failed = not self.is_healthy(driver)
+            raise
+        finally:
+            self.give_back(driver, pages=pages, discard=failed)
+
+    def close(self) -> None:
+        """Quits every idle driver and stops the pool from relaunching."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(driver)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool(chrome_options: Optional[List[str]] = None,
+                    user_agents: Optional[List[str]] = None) -> DriverPool:
+    """Returns the process-wide driver pool, creating and warming it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(chrome_options=chrome_options, user_agents=user_agents)
+            _pool.warm_in_background()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,68 @@
+import os
+import importlib.util
+from bs4 import BeautifulSoup
+
+# Optional faster backends; each is used only when its package is installed
+HAVE_LXML = importlib.util.find_spec("lxml") is not None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    HAVE_SELECTOLAX = True
+except ImportError:
+    LexborHTMLParser = None
+    HAVE_SELECTOLAX = False
+
+BACKENDS = ('html.parser', 'lxml', 'selectolax')
+# HTML_PARSER picks the backend. The default is the pure-Python parser the scrapers were written
+# against; "lxml", "selectolax" or "auto" (lxml when installed) are opt-in
+PARSER_BACKEND = os.getenv("HTML_PARSER", "html.parser")
+
+
+def available_backends():
+    """Backends usable in this environment, fastest last."""
+    return [backend for backend, usable in zip(BACKENDS, (True, HAVE_LXML, HAVE_SELECTOLAX)) if usable]
+
+
+def resolve_backend(backend=None):
+    """The backend to use for `backend` (or HTML_PARSER), falling back when its package is missing."""
+    backend = backend or PARSER_BACKEND
+    if backend == 'auto':
+        return 'lxml' if HAVE_LXML else 'html.parser'
+    if backend == 'selectolax' and not HAVE_SELECTOLAX:
+        return 'lxml' if HAVE_LXML else 'html.parser'
+    if backend == 'lxml' and not HAVE_LXML:
+        return 'html.parser'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend {backend!r}, expected one of {BACKENDS}")
+    return backend
+
+
+def make_soup(markup, backend=None):
+    """
+    BeautifulSoup tree built with the chosen backend. selectolax has no BeautifulSoup tree
+    builder, so code that needs the BeautifulSoup API gets lxml (or html.parser) instead.
+    """
+    backend = resolve_backend(backend)
+    return BeautifulSoup(markup, 'html.parser' if backend == 'html.parser' or not HAVE_LXML else 'lxml')
+
+
+def parse_html(markup, backend=None):
+    """Parses with the chosen backend: a selectolax tree for 'selectolax', a BeautifulSoup tree otherwise."""
+    if isinstance(markup, bytes):
+        markup = markup.decode('utf-8', errors='replace')
+    if resolve_backend(backend) == 'selectolax':
+        return LexborHTMLParser(markup)
+    return make_soup(markup, backend)
+
+
+def is_selectolax_tree(document):
+    return LexborHTMLParser is not None and isinstance(document, LexborHTMLParser)
+
+
+def select_first_attribute(document, selector, attribute):
+    """The attribute of the first element matching a CSS selector in either kind of tree, or None."""
+    if is_selectolax_tree(document):
+        node = document.css_first(selector)
+        return node.attributes.get(attribute) if node is not None else None
+    element = document.select_one(selector)
+    return element.get(attribute) if element is not None else None
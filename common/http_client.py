@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from common.rate_limit import paced_get
+
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_MB", "500")) * 1024 * 1024
+DEFAULT_TIMEOUT = 30
+# Connections kept alive per host; should cover the rate limiter's largest concurrency window
+POOL_MAXSIZE = 16
+DEFAULT_HEADERS = {
+    'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    'Accept-Encoding': "gzip, deflate",
+}
+# Without explicit freshness, a page is fresh for this share of the time since it was last modified (RFC 7234 4.2.2)
+HEURISTIC_FRESHNESS_SHARE = 0.1
+HEURISTIC_FRESHNESS_MAX = 24 * 3600
+CACHEABLE_STATUSES = {200}
+# The stored body is already decoded, so these no longer describe it
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+def parse_cache_control(value):
+    """Cache-Control directives as a dict; valueless directives map to True."""
+    directives = {}
+    for part in (value or "").split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else True
+    return directives
+
+
+def http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers):
+    """Seconds a response stays fresh: max-age, else Expires - Date, else the Last-Modified heuristic."""
+    cache_control = parse_cache_control(headers.get('Cache-Control'))
+    if 'max-age' in cache_control:
+        try:
+            return max(int(cache_control['max-age']), 0)
+        except (TypeError, ValueError):
+            return 0
+    date = http_date(headers.get('Date')) or time.time()
+    expires = headers.get('Expires')
+    if expires:
+        expires_at = http_date(expires)
+        return max(expires_at - date, 0) if expires_at else 0
+    last_modified = http_date(headers.get('Last-Modified'))
+    if last_modified:
+        return min(max(date - last_modified, 0) * HEURISTIC_FRESHNESS_SHARE, HEURISTIC_FRESHNESS_MAX)
+    return 0
+
+
+def is_storable(response):
+    """True for responses a private cache may keep and that can later be reused or revalidated."""
+    if response.status_code not in CACHEABLE_STATUSES:
+        return False
+    if 'no-store' in parse_cache_control(response.headers.get('Cache-Control')):
+        return False
+    if response.headers.get('Vary', '').strip() == '*':
+        return False
+    has_validator = 'ETag' in response.headers or 'Last-Modified' in response.headers
+    return has_validator or freshness_lifetime(response.headers) > 0
+
+
+class HTTPCache:
+    """On-disk SQLite store of GET responses with their validators and size-based LRU eviction."""
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "responses.sqlite3"), max_bytes=CACHE_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   key TEXT PRIMARY KEY,
+                   url TEXT NOT NULL,
+                   status INTEGER NOT NULL,
+                   headers TEXT NOT NULL,
+                   vary TEXT NOT NULL,
+                   body BLOB NOT NULL,
+                   size INTEGER NOT NULL,
+                   stored_at REAL NOT NULL,
+                   accessed_at REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def get(self, url, request_headers):
+        """Returns the stored entry for `url` if its Vary headers match the request, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, vary, body, stored_at FROM responses WHERE key = ?",
+                (self.key(url),)).fetchone()
+            if row is None:
+                return None
+            vary = json.loads(row[3])
+            if any(request_headers.get(name) != value for name, value in vary.items()):
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), self.key(url)))
+            self._conn.commit()
+        return {'url': row[0], 'status': row[1], 'headers': CaseInsensitiveDict(json.loads(row[2])),
+                'body': row[4], 'stored_at': row[5]}
+
+    def put(self, url, response, request_headers):
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in DROPPED_HEADERS}
+        vary = {name.strip(): request_headers.get(name.strip())
+                for name in response.headers.get('Vary', '').split(',') if name.strip()}
+        body = response.content
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, headers, vary, body, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.key(url), response.url or url, response.status_code, json.dumps(headers), json.dumps(vary),
+                 body, len(body), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, url, entry, not_modified):
+        """Merges the headers of a 304 into a stored entry and restarts its age. Returns the updated entry."""
+        headers = CaseInsensitiveDict(entry['headers'])
+        headers.update({name: value for name, value in not_modified.headers.items()
+                        if name.lower() not in DROPPED_HEADERS})
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET headers = ?, stored_at = ? WHERE key = ?",
+                               (json.dumps(dict(headers)), now, self.key(url)))
+            self._conn.commit()
+        return {**entry, 'headers': headers, 'stored_at': now}
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def count(self, outcome):
+        """Adds one to the 'hits', 'revalidated' or 'misses' counter; requests run on many threads."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses, 'entries': entries}
+
+
+def cached_response(entry, request):
+    """Builds a requests.Response from a stored entry."""
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = entry['body']
+    response.url = entry['url']
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.reason = "OK"
+    response.request = request
+    response.from_cache = True
+    return response
+
+
+class HTTPClient:
+    """
+    One keep-alive session per host with a bounded connection pool, an on-disk HTTP cache that
+    follows the response's freshness rules and revalidates stale entries with their validators,
+    and network requests paced by the shared per-host rate limiter.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else HTTPCache()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, url):
+        """Returns the keep-alive session for the URL's host."""
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        with self._lock:
+            if origin not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+                session.mount(origin, adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                self._sessions[origin] = session
+            return self._sessions[origin]
+
+    def get(self, url, headers=None, timeout=DEFAULT_TIMEOUT, use_cache=True, **kwargs):
+        """Drop-in for requests.get. Fresh cached responses skip the network; stale ones are revalidated.
+        Requests that carry their own If-None-Match/If-Modified-Since go to the network as sent."""
+        session = self.session(url)
+        request_headers = CaseInsensitiveDict(session.headers)
+        request_headers.update(headers or {})
+        request = requests.Request('GET', url, headers=dict(request_headers)).prepare()
+        caller_conditional = any(name in request_headers for name in CONDITIONAL_HEADERS)
+        request_directives = parse_cache_control(request_headers.get('Cache-Control'))
+        if not use_cache or caller_conditional or 'no-store' in request_directives:
+            return paced_get(url, session=session, headers=headers, timeout=timeout, **kwargs)
+
+        entry = self.cache.get(url, request_headers)
+        conditional = {}
+        if entry:
+            response_directives = parse_cache_control(entry['headers'].get('Cache-Control'))
+            age = time.time() - entry['stored_at'] + float(entry['headers'].get('Age', 0) or 0)
+            must_revalidate = 'no-cache' in response_directives or 'no-cache' in request_directives
+            if not must_revalidate and age < freshness_lifetime(entry['headers']):
+                self.cache.count('hits')
+                return cached_response(entry, request)
+            if entry['headers'].get('ETag'):
+                conditional['If-None-Match'] = entry['headers']['ETag']
+            if entry['headers'].get('Last-Modified'):
+                conditional['If-Modified-Since'] = entry['headers']['Last-Modified']
+
+        response = paced_get(url, session=session, headers={**(headers or {}), **conditional},
+                             timeout=timeout, **kwargs)
+        if response.status_code == 304 and entry and conditional:
+            self.cache.count('revalidated')
+            return cached_response(self.cache.refresh(url, entry, response), request)
+        self.cache.count('misses')
+        if is_storable(response):
+            self.cache.put(url, response, request_headers)
+        return response
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Returns the process-wide client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
+
+
+def http_get(url, **kwargs):
+    """requests.get through the shared pooled, cached and paced client."""
+    return get_http_client().get(url, **kwargs)
@@ -0,0 +1,134 @@
+import json
+import fnmatch
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Resource types we never need for DOM text
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+# Third-party analytics and ad hosts, blocked regardless of resource type
+BLOCKED_HOST_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*", "*segment.io*",
+    "*scorecardresearch.com*", "*newrelic.com*", "*nr-data.net*", "*adobedtm.com*",
+]
+# URL patterns for CDP Network.setBlockedURLs, which matches on URLs rather than resource types
+BLOCKED_EXTENSION_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*", "*.m3u8*"],
+    "stylesheet": ["*.css*"],
+}
+# Typical transfer sizes per blocked request (HTTP Archive medians), used to estimate bytes saved
+TYPICAL_BYTES = {"image": 25000, "media": 250000, "font": 30000, "stylesheet": 15000, "script": 20000, "other": 5000}
+
+# Sums the bytes actually transferred for the current document and its subresources
+TRANSFERRED_BYTES_JS = """
+return performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))
+    .reduce(function (total, entry) { return total + (entry.transferSize || 0); }, 0);
+"""
+
+
+def blocked_types(block_css: bool = True) -> set:
+    """Resource types to block; CSS can be kept for scrapers that rely on element visibility."""
+    return BLOCKED_RESOURCE_TYPES if block_css else BLOCKED_RESOURCE_TYPES - {"stylesheet"}
+
+
+class LeanFetchStats:
+    """Counts blocked requests per page and reports transferred and estimated saved bytes."""
+
+    def __init__(self):
+        self.blocked = Counter()
+        self.pages: List[Dict] = []
+
+    def record_blocked(self, resource_type: str) -> None:
+        self.blocked[resource_type if resource_type in TYPICAL_BYTES else "other"] += 1
+
+    def finish_page(self, url: str, transferred_bytes: Optional[int] = None) -> Dict:
+        """Closes the stats for one page and returns its report."""
+        report = {
+            "url": url,
+            "blocked_requests": sum(self.blocked.values()),
+            "blocked_by_type": dict(self.blocked),
+            "transferred_bytes": transferred_bytes or 0,
+            "estimated_bytes_saved": sum(TYPICAL_BYTES[kind] * count for kind, count in self.blocked.items()),
+        }
+        self.pages.append(report)
+        self.blocked = Counter()
+        return report
+
+    @property
+    def total_bytes_saved(self) -> int:
+        return sum(page["estimated_bytes_saved"] for page in self.pages)
+
+
+def format_page_report(report: Dict) -> str:
+    """One-line summary of a page report for logs and the UI."""
+    return (f"Lean fetch: blocked {report['blocked_requests']} requests, "
+            f"~{report['estimated_bytes_saved'] / 1024:.0f} KB saved, "
+            f"{report['transferred_bytes'] / 1024:.0f} KB transferred")
+
+
+# -------------------- Selenium / Chrome --------------------
+
+def apply_lean_chrome_options(options, block_css: bool = True) -> None:
+    """Disables images via Chrome prefs, uses the eager load strategy and enables the performance log."""
+    prefs = {"profile.managed_default_content_settings.images": 2}
+    if block_css:
+        prefs["profile.managed_default_content_settings.stylesheets"] = 2
+    options.add_experimental_option("prefs", prefs)
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.page_load_strategy = "eager"
+    # Network.loadingFailed events in this log tell us which requests were blocked
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def enable_lean_fetch_selenium(driver, block_css: bool = True) -> None:
+    """Blocks heavy resources and analytics hosts on a Chrome driver through CDP."""
+    patterns = list(BLOCKED_HOST_PATTERNS)
+    for kind in blocked_types(block_css):
+        patterns.extend(BLOCKED_EXTENSION_PATTERNS[kind])
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def collect_selenium_page_stats(driver, stats: LeanFetchStats, url: str) -> Dict:
+    """Reads blocked requests from the Chrome performance log and closes the page's stats."""
+    try:
+        for entry in driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            params = message.get("params", {})
+            if message.get("method") == "Network.loadingFailed" and params.get("blockedReason"):
+                stats.record_blocked(params.get("type", "other").lower())
+    except Exception:
+        pass  # Performance logging not enabled on this driver
+    try:
+        transferred = driver.execute_script(TRANSFERRED_BYTES_JS)
+    except Exception:
+        transferred = 0
+    return stats.finish_page(url, transferred)
+
+
+# -------------------- Playwright --------------------
+
+def enable_lean_fetch_playwright(page_or_context, stats: LeanFetchStats, block_css: bool = True) -> None:
+    """Aborts heavy resource types and analytics hosts through Playwright routing."""
+    kinds = blocked_types(block_css)
+
+    def handle(route):
+        request = route.request
+        if request.resource_type in kinds or any(fnmatch.fnmatch(request.url, p) for p in BLOCKED_HOST_PATTERNS):
+            stats.record_blocked(request.resource_type)
+            route.abort()
+        else:
+            route.continue_()
+
+    page_or_context.route("**/*", handle)
+
+
+def collect_playwright_page_stats(page, stats: LeanFetchStats) -> Dict:
+    """Closes the stats for the page currently loaded in a Playwright page."""
+    try:
+        transferred = page.evaluate("() => { " + TRANSFERRED_BYTES_JS + " }")
+    except Exception:
+        transferred = 0
+    return stats.finish_page(page.url, transferred)
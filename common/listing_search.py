@@ -0,0 +1,291 @@
+import os
+import re
+import csv
+import json
+import time
+import sqlite3
+import threading
+from common.wigan_listings import MISSING
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+INDEX_PATH = os.getenv("LISTING_SEARCH_INDEX", os.path.join(REPO_ROOT, ".listing_search.sqlite3"))
+# The crawl output of Task4-part2 and the downloads saved by the wigan_directories app
+EXPLORATION_FOLDER = os.getenv("WIGAN_EXPLORATION_FOLDER",
+                               os.path.join(REPO_ROOT, "Milestone-2", "Task-4-part2", "Wigan_Exploration"))
+SCRAPED_DATA_FOLDER = os.getenv("WIGAN_SCRAPED_DATA_FOLDER",
+                                os.path.join(REPO_ROOT, "Milestone-3", "Task8", "Project_Files", "Wigan_Scraped_Data"))
+# Searches re-check the source files for changes at most this often
+REFRESH_SECONDS = 30
+SEARCH_LIMIT = 50
+# bm25 weights of the indexed columns: title, description, schedule, location
+COLUMN_WEIGHTS = (10.0, 3.0, 1.0, 2.0)
+RESULT_COLUMNS = ('title', 'categories', 'schedule', 'location', 'phone', 'email', 'website')
+LISTING_COLUMNS = ('title', 'description', 'schedule', 'location', 'phone', 'email', 'website')
+# Written next to each CSV saved by the wigan_directories app, holding the category it was scraped from
+CATEGORY_SIDECAR_SUFFIX = ".category.json"
+# Bumped whenever the tables change; an index with another version is rebuilt from the source files
+SCHEMA_VERSION = 2
+
+
+def exploration_files(folder):
+    """(path, category path parts) of every Wigan_Exploration/**/data.csv."""
+    for current, subfolders, files in os.walk(folder):
+        subfolders.sort()
+        if "data.csv" in files and current != folder:
+            yield os.path.join(current, "data.csv"), os.path.relpath(current, folder).split(os.sep)
+
+
+def category_sidecar_path(csv_path):
+    return csv_path[:-len(".csv")] + CATEGORY_SIDECAR_SUFFIX
+
+
+def write_category_sidecar(csv_path, url, category_path):
+    """Records which directory category a file saved by the wigan_directories app came from."""
+    with open(category_sidecar_path(csv_path), 'w', encoding='utf-8') as sidecar:
+        json.dump({'url': url, 'category_path': list(category_path)}, sidecar, ensure_ascii=False)
+
+
+def read_category_sidecar(csv_path):
+    """The category path recorded next to a saved file, or None if there is none."""
+    try:
+        with open(category_sidecar_path(csv_path), encoding='utf-8') as sidecar:
+            return json.load(sidecar).get('category_path') or None
+    except (OSError, ValueError):
+        return None
+
+
+def scraped_data_files(folder):
+    """(path, category path parts or None) of every CSV saved by the wigan_directories app. The JSON and
+    XML files next to them hold the same rows, so they are not indexed. Files saved without a category
+    sidecar have no category and are left out of the facets."""
+    if not os.path.isdir(folder):
+        return
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".csv"):
+            path = os.path.join(folder, name)
+            yield path, read_category_sidecar(path)
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a source file and its category sidecar together, or None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    mtime_ns, size = stat.st_mtime_ns, stat.st_size
+    if path.endswith(".csv"):
+        try:
+            sidecar = os.stat(category_sidecar_path(path))
+            mtime_ns, size = max(mtime_ns, sidecar.st_mtime_ns), size + sidecar.st_size
+        except OSError:
+            pass
+    return mtime_ns, size
+
+
+def listing_key(title, location):
+    """A listing's identity: the same service appears in data.csv under every category it belongs to."""
+    return "|".join(re.sub(r'\s+', ' ', value or '').strip().lower() for value in (title, location))
+
+
+def fts_query(text):
+    """FTS5 query where every word of `text` must match, as a prefix so results appear while typing."""
+    return " ".join(f'"{term}"*' for term in re.findall(r'\w+', text))
+
+
+def field(row, *names):
+    """The first of the named CSV columns that is present, with the N/A placeholder dropped."""
+    for name in names:
+        value = row.get(name)
+        if value is not None:
+            return None if value == MISSING else value
+    return None
+
+
+class ListingIndex:
+    """
+    SQLite FTS5 index of the scraped listings over Title, Description, Schedule and Location. A listing
+    that the crawl saved under several categories is stored once, with its category paths in a side
+    table for the facets. Source files are tracked by size and mtime, so an update only re-reads the
+    files a crawl has written since the last one.
+    """
+
+    def __init__(self, path=INDEX_PATH, exploration_folder=EXPLORATION_FOLDER, scraped_data_folder=SCRAPED_DATA_FOLDER):
+        self.exploration_folder = exploration_folder
+        self.scraped_data_folder = scraped_data_folder
+        self.updated_at = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.executescript(
+                """DROP TABLE IF EXISTS listings_fts;
+                   DROP TABLE IF EXISTS listing_categories;
+                   DROP TABLE IF EXISTS listings;
+                   DROP TABLE IF EXISTS sources;"""
+            )
+        self._conn.executescript(
+            f"""CREATE TABLE IF NOT EXISTS sources (
+                   path TEXT PRIMARY KEY,
+                   mtime_ns INTEGER NOT NULL,
+                   size INTEGER NOT NULL
+               );
+               CREATE TABLE IF NOT EXISTS listings (
+                   id INTEGER PRIMARY KEY,
+                   key TEXT NOT NULL UNIQUE,
+                   title TEXT,
+                   description TEXT,
+                   schedule TEXT,
+                   location TEXT,
+                   phone TEXT,
+                   email TEXT,
+                   website TEXT
+               );
+               -- One row per source file and category a listing was found in; category_1 is NULL when unknown
+               CREATE TABLE IF NOT EXISTS listing_categories (
+                   listing_id INTEGER NOT NULL,
+                   source TEXT NOT NULL,
+                   category_1 TEXT,
+                   category_path TEXT,
+                   PRIMARY KEY (listing_id, source)
+               );
+               CREATE INDEX IF NOT EXISTS listing_categories_source ON listing_categories (source);
+               CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(
+                   title, description, schedule, location,
+                   content='listings', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+               );
+               -- Keep the full-text index in step with the listings table
+               CREATE TRIGGER IF NOT EXISTS listings_insert AFTER INSERT ON listings BEGIN
+                   INSERT INTO listings_fts (rowid, title, description, schedule, location)
+                   VALUES (new.id, new.title, new.description, new.schedule, new.location);
+               END;
+               CREATE TRIGGER IF NOT EXISTS listings_delete AFTER DELETE ON listings BEGIN
+                   INSERT INTO listings_fts (listings_fts, rowid, title, description, schedule, location)
+                   VALUES ('delete', old.id, old.title, old.description, old.schedule, old.location);
+               END;
+               CREATE TRIGGER IF NOT EXISTS listings_update AFTER UPDATE ON listings BEGIN
+                   INSERT INTO listings_fts (listings_fts, rowid, title, description, schedule, location)
+                   VALUES ('delete', old.id, old.title, old.description, old.schedule, old.location);
+                   INSERT INTO listings_fts (rowid, title, description, schedule, location)
+                   VALUES (new.id, new.title, new.description, new.schedule, new.location);
+               END;
+               PRAGMA user_version = {SCHEMA_VERSION};"""
+        )
+        self._conn.commit()
+
+    def source_files(self):
+        yield from exploration_files(self.exploration_folder)
+        yield from scraped_data_files(self.scraped_data_folder)
+
+    def _delete_orphans(self):
+        """Removes the listings that no source file holds any more."""
+        self._conn.execute("DELETE FROM listings WHERE id NOT IN (SELECT listing_id FROM listing_categories)")
+
+    def _index_file(self, path, categories):
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            rows = [tuple(field(row, *names) for names in (('Title',), ('Description',), ('Schedule',),
+                                                          ('Location', 'Address'), ('Phone',), ('Email',),
+                                                          ('Website',)))
+                    for row in csv.DictReader(csv_file)]
+        self._conn.execute("DELETE FROM listing_categories WHERE source = ?", (path,))
+        category_1 = categories[0] if categories else None
+        category_path = " > ".join(categories) if categories else None
+        for row in rows:
+            key = listing_key(row[0], row[3])
+            # The latest copy of a listing wins; an unchanged copy leaves the full-text index alone
+            self._conn.execute(
+                f"INSERT INTO listings (key, {', '.join(LISTING_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                f"ON CONFLICT (key) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in LISTING_COLUMNS)} "
+                f"WHERE {' OR '.join(f'{column} IS NOT excluded.{column}' for column in LISTING_COLUMNS)}",
+                (key, *row))
+            listing_id = self._conn.execute("SELECT id FROM listings WHERE key = ?", (key,)).fetchone()[0]
+            self._conn.execute("INSERT OR REPLACE INTO listing_categories (listing_id, source, category_1, category_path) "
+                               "VALUES (?, ?, ?, ?)", (listing_id, path, category_1, category_path))
+        self._delete_orphans()
+
+    def update(self):
+        """Indexes new and changed source files and drops deleted ones. Returns (files indexed, files removed)."""
+        with self._lock:
+            known = {path: (mtime_ns, size) for path, mtime_ns, size
+                     in self._conn.execute("SELECT path, mtime_ns, size FROM sources")}
+            seen = set()
+            indexed = 0
+            for path, categories in self.source_files():
+                signature = file_signature(path)
+                if signature is None:
+                    continue
+                seen.add(path)
+                if known.get(path) == signature:
+                    continue
+                self._index_file(path, categories)
+                self._conn.execute("INSERT OR REPLACE INTO sources (path, mtime_ns, size) VALUES (?, ?, ?)",
+                                   (path, *signature))
+                indexed += 1
+            removed = set(known) - seen
+            for path in removed:
+                self._conn.execute("DELETE FROM listing_categories WHERE source = ?", (path,))
+                self._conn.execute("DELETE FROM sources WHERE path = ?", (path,))
+            if removed:
+                self._delete_orphans()
+            self._conn.commit()
+            self.updated_at = time.time()
+        return indexed, len(removed)
+
+    def refresh(self, max_age=REFRESH_SECONDS):
+        """Runs update() if the last one is older than `max_age` seconds, so new crawl output shows up."""
+        if time.time() - self.updated_at > max_age:
+            self.update()
+
+    def search(self, text, categories=None, limit=SEARCH_LIMIT):
+        """Best matches first, one per listing, as dicts of RESULT_COLUMNS plus a 'match' snippet of the
+        description. 'categories' lists every category path the listing was found under.
+        `categories` restricts the results to listings in those top-level categories."""
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = ("SELECT listings_fts.rowid, snippet(listings_fts, 1, '**', '**', '...', 16) FROM listings_fts "
+               "WHERE listings_fts MATCH ?")
+        parameters = [query]
+        if categories:
+            sql += (" AND listings_fts.rowid IN (SELECT listing_id FROM listing_categories "
+                    f"WHERE category_1 IN ({', '.join('?' * len(categories))}))")
+            parameters.extend(categories)
+        sql += f" ORDER BY bm25(listings_fts, {', '.join(str(weight) for weight in COLUMN_WEIGHTS)}) LIMIT ?"
+        parameters.append(limit)
+        columns = [column for column in RESULT_COLUMNS if column != 'categories']
+        with self._lock:
+            results = []
+            for listing_id, match in self._conn.execute(sql, parameters).fetchall():
+                listing = dict(zip(columns, self._conn.execute(
+                    f"SELECT {', '.join(columns)} FROM listings WHERE id = ?", (listing_id,)).fetchone()))
+                paths = self._conn.execute(
+                    "SELECT DISTINCT category_path FROM listing_categories "
+                    "WHERE listing_id = ? AND category_path IS NOT NULL ORDER BY category_path", (listing_id,)).fetchall()
+                listing['categories'] = "; ".join(path for path, in paths)
+                listing['match'] = match
+                results.append({column: listing[column] for column in RESULT_COLUMNS + ('match',)})
+        return results
+
+    def facets(self, text):
+        """Distinct matching listings per top-level category, largest first. Listings without a known
+        category are not counted."""
+        query = fts_query(text)
+        if not query:
+            return []
+        with self._lock:
+            return self._conn.execute(
+                "SELECT c.category_1, COUNT(DISTINCT c.listing_id) AS matches "
+                "FROM listings_fts JOIN listing_categories c ON c.listing_id = listings_fts.rowid "
+                "WHERE listings_fts MATCH ? AND c.category_1 IS NOT NULL "
+                "GROUP BY c.category_1 ORDER BY matches DESC", (query,)).fetchall()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_listing_index():
+    """Returns the process-wide index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ListingIndex()
+        return _index
@@ -0,0 +1,223 @@
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+
+# Requests per second each host starts at, and the range it may adapt within
+INITIAL_RATE = 2.0
+MIN_RATE = 0.2
+MAX_RATE = 20.0
+# Added to the rate after every healthy response (additive increase)
+RATE_INCREASE = 0.25
+# Requests allowed in flight per host, and the range it may adapt within
+INITIAL_CONCURRENCY = 2
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16
+# Rate and concurrency are multiplied by these on throttling or a latency spike (multiplicative decrease)
+THROTTLE_DECREASE = 0.5
+LATENCY_DECREASE = 0.8
+# Latency this many times above the host's best smoothed latency counts as the host struggling
+LATENCY_BACKOFF_RATIO = 2.0
+LATENCY_SMOOTHING = 0.2
+# Latency below this never counts as struggling, so jitter on very fast hosts is ignored
+MIN_BACKOFF_LATENCY = 0.25
+# At most one decrease per this many seconds, so one burst of slow responses is not punished repeatedly
+DECREASE_COOLDOWN = 1.0
+THROTTLE_STATUSES = {429, 503}
+MAX_THROTTLE_RETRIES = 3
+
+
+def retry_after_seconds(headers):
+    """Seconds requested by a Retry-After header (delay or HTTP date), or None."""
+    headers = headers or {}
+    # Playwright lower-cases header names; requests and aiohttp look them up case-insensitively
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    """
+    Token bucket plus an AIMD concurrency window for one host. Healthy responses raise the rate
+    and window additively; 429/503, errors and rising latency cut them multiplicatively.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.rate = INITIAL_RATE
+        self.concurrency = float(INITIAL_CONCURRENCY)
+        self.tokens = 1.0
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.latency = None  # smoothed seconds per response
+        self.best_latency = None
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        burst = max(1.0, self.concurrency)
+        self.tokens = min(burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def try_acquire(self):
+        """Takes a slot and returns 0, or returns how many seconds to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.concurrency):
+                return 0.05
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+            self.in_flight += 1
+            self.requests += 1
+            return 0
+
+    def _decrease(self, now, factor):
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self.rate = max(MIN_RATE, self.rate * factor)
+        self.concurrency = max(float(MIN_CONCURRENCY), self.concurrency * factor)
+
+    def release(self, status=None, latency=None, retry_after=None, error=False):
+        """Frees the slot and adapts the pace to how the host answered."""
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if error or status in THROTTLE_STATUSES:
+                if error:
+                    self.errors += 1
+                else:
+                    self.throttled += 1
+                self._decrease(now, THROTTLE_DECREASE)
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+                return
+            if latency is not None:
+                self.latency = latency if self.latency is None else (
+                    LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency)
+                self.best_latency = min(self.best_latency or self.latency, self.latency)
+                if self.latency > max(LATENCY_BACKOFF_RATIO * self.best_latency, MIN_BACKOFF_LATENCY):
+                    self._decrease(now, LATENCY_DECREASE)
+                    return
+            self.rate = min(MAX_RATE, self.rate + RATE_INCREASE)
+            self.concurrency = min(float(MAX_CONCURRENCY), self.concurrency + 1 / self.concurrency)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'rate': round(self.rate, 2),
+                'concurrency': int(self.concurrency),
+                'in_flight': self.in_flight,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'errors': self.errors,
+                'latency_ms': round(self.latency * 1000) if self.latency is not None else None,
+            }
+
+
+class AdaptiveRateLimiter:
+    """Hands out a HostLimiter per host; usable from threads and from asyncio code."""
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url):
+        name = urlparse(url).netloc.lower()
+        with self._lock:
+            if name not in self._hosts:
+                self._hosts[name] = HostLimiter(name)
+            return self._hosts[name]
+
+    def acquire(self, url):
+        """Blocks until the URL's host has a slot. Release it on the returned HostLimiter."""
+        host = self.host(url)
+        while True:
+            wait = host.try_acquire()
+            if not wait:
+                return host
+            time.sleep(wait)
+
+    async def acquire_async(self, url):
+        """Like acquire, but waits without blocking the event loop."""
+        host = self.host(url)
+        while True:
+            wait = host.try_acquire()
+            if not wait:
+                return host
+            await asyncio.sleep(wait)
+
+    def metrics(self):
+        """Current rate, concurrency window and counters per host."""
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return {host.host: host.metrics() for host in hosts}
+
+    def format_metrics(self):
+        return "\n".join(
+            f"{host}: {m['rate']} req/s, concurrency {m['concurrency']} ({m['in_flight']} in flight), "
+            f"{m['requests']} requests, {m['throttled']} throttled, {m['errors']} errors, "
+            f"latency {m['latency_ms']} ms"
+            for host, m in self.metrics().items()
+        )
+
+
+# Shared by every scraper in the process so they pace each host together
+_limiter = AdaptiveRateLimiter()
+
+
+def get_rate_limiter():
+    """Returns the process-wide limiter."""
+    return _limiter
+
+
+@contextmanager
+def paced(url, limiter=None):
+    """
+    Holds a slot on the URL's host around a request made some other way (e.g. a browser page load).
+    Set 'status' (and optionally 'headers') on the yielded dict so the limiter can adapt.
+    """
+    host = (limiter or _limiter).acquire(url)
+    outcome = {'status': None, 'headers': None}
+    started = time.monotonic()
+    try:
+        yield outcome
+    except Exception:
+        host.release(error=True)
+        raise
+    host.release(outcome['status'], time.monotonic() - started, retry_after_seconds(outcome['headers']))
+
+
+def paced_get(url, session=None, limiter=None, **kwargs):
+    """requests.get paced by the shared limiter, retrying when the host answers 429/503."""
+    limiter = limiter or _limiter
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        host = limiter.acquire(url)
+        started = time.monotonic()
+        try:
+            response = (session or requests).get(url, **kwargs)
+        except requests.RequestException:
+            host.release(error=True)
+            raise
+        host.release(response.status_code, time.monotonic() - started, retry_after_seconds(response.headers))
+        if response.status_code not in THROTTLE_STATUSES or attempt == MAX_THROTTLE_RETRIES:
+            return response
@@ -0,0 +1,122 @@
+import time
+from typing import Dict
+
+# How long the page must show no DOM mutations and no in-flight requests to count as settled
+QUIET_MS = 400
+# Hard caps so a page that never stops changing (tickers, carousels) cannot stall a scrape
+MAX_SCROLL_SECONDS = 30
+MAX_SCROLL_ROUNDS = 50
+
+# Counts in-flight fetch/XHR requests and records the time of the last DOM mutation
+# or network event. Safe to inject more than once.
+ACTIVITY_MONITOR_JS = """
+(function () {
+    if (window.__activityMonitor) { return; }
+    var monitor = {inflight: 0, lastActivity: performance.now()};
+    var touch = function () { monitor.lastActivity = performance.now(); };
+    window.__activityMonitor = monitor;
+
+    var startObserver = function () {
+        new MutationObserver(touch).observe(document.documentElement,
+            {childList: true, subtree: true, characterData: true});
+    };
+    if (document.documentElement) { startObserver(); }
+    else { document.addEventListener('DOMContentLoaded', startObserver); }
+
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            monitor.inflight++; touch();
+            return originalFetch.apply(this, arguments).finally(function () {
+                monitor.inflight--; touch();
+            });
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        monitor.inflight++; touch();
+        this.addEventListener('loadend', function () { monitor.inflight--; touch(); }, {once: true});
+        return originalSend.apply(this, arguments);
+    };
+    if (window.PerformanceObserver) {
+        try { new PerformanceObserver(touch).observe({entryTypes: ['resource']}); } catch (e) {}
+    }
+})();
+"""
+
+# Resolves once the page has been quiet for `quietMs`, or when the deadline passes
+WAIT_FOR_QUIET_JS = """
+var quietMs = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+var started = performance.now();
+(function check() {
+    var monitor = window.__activityMonitor;
+    var now = performance.now();
+    if (!monitor) { done(true); return; }
+    if (monitor.inflight <= 0 && now - monitor.lastActivity >= quietMs) { done(true); return; }
+    if (now - started >= timeoutMs) { done(false); return; }
+    setTimeout(check, 50);
+})();
+"""
+
+
+def install_activity_monitor(driver) -> None:
+    """Injects the activity monitor now and, on Chrome, into every page loaded afterwards."""
+    if not getattr(driver, "_activity_monitor_registered", False):
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": ACTIVITY_MONITOR_JS})
+            driver._activity_monitor_registered = True
+        except Exception:
+            pass  # Not a Chromium driver; fall back to injecting after load
+    driver.execute_script(ACTIVITY_MONITOR_JS)
+
+
+def wait_for_quiet(driver, quiet_ms: int = QUIET_MS, timeout: float = 10) -> bool:
+    """Waits until no DOM mutations or requests happened for `quiet_ms`. Returns False on timeout."""
+    driver.set_script_timeout(timeout + 5)
+    return bool(driver.execute_async_script(WAIT_FOR_QUIET_JS, quiet_ms, int(timeout * 1000)))
+
+
+def scroll_until_settled(driver, quiet_ms: int = QUIET_MS, max_seconds: float = MAX_SCROLL_SECONDS,
+                         max_rounds: int = MAX_SCROLL_ROUNDS) -> Dict:
+    """
+    Scrolls to the bottom one viewport at a time, advancing as soon as the page goes quiet
+    instead of sleeping for a fixed time, until the page height stops growing.
+    Returns whether new content was loaded, the rounds taken and the seconds spent per phase.
+    """
+    deadline = time.monotonic() + max_seconds
+    timings = {"initial_settle": 0.0, "scrolling": 0.0, "waiting": 0.0}
+    install_activity_monitor(driver)
+
+    started = time.monotonic()
+    wait_for_quiet(driver, quiet_ms, max(deadline - time.monotonic(), 0))
+    timings["initial_settle"] = time.monotonic() - started
+
+    initial_height = driver.execute_script("return document.body.scrollHeight")
+    last_height = initial_height
+    position = 0
+    rounds = 0
+    while rounds < max_rounds and time.monotonic() < deadline:
+        rounds += 1
+        started = time.monotonic()
+        viewport = driver.execute_script("return window.innerHeight") or 800
+        while position < last_height:
+            position += viewport
+            driver.execute_script("window.scrollTo(0, arguments[0]);", position)
+        timings["scrolling"] += time.monotonic() - started
+
+        started = time.monotonic()
+        wait_for_quiet(driver, quiet_ms, max(deadline - time.monotonic(), 0))
+        timings["waiting"] += time.monotonic() - started
+
+        new_height = driver.execute_script("return document.body.scrollHeight")
+        if new_height <= last_height:
+            break
+        last_height = new_height
+
+    driver.execute_script("window.scrollTo(0, 0);")
+    return {
+        "loaded_more": last_height > initial_height,
+        "rounds": rounds,
+        "capped": time.monotonic() >= deadline or rounds >= max_rounds,
+        "timings": {phase: round(seconds, 2) for phase, seconds in timings.items()},
+    }
@@ -0,0 +1,188 @@
+import re
+import json
+from collections import namedtuple
+import soupsieve
+from common.html_parser import parse_html, is_selectolax_tree
+
+# One output column of a listing. `selector` is evaluated inside each hit; the value is the element's
+# text, or `attribute` when given. With `many`, every match is kept and joined with `separator`.
+# `transform` names an entry of TRANSFORMS applied to the value.
+Field = namedtuple('Field', ['name', 'selector', 'attribute', 'many', 'separator', 'transform'],
+                   defaults=(None, False, ', ', None))
+
+MISSING = "N/A"
+
+# Python and JavaScript versions of each named transform, so both extraction paths agree
+TRANSFORMS = {
+    'strip_mailto': (lambda value: value.replace("mailto:", "").strip(), "value => value.replace('mailto:', '').trim()"),
+}
+
+# The listing as written to Wigan_Exploration/**/data.csv by Task4-part2, its async crawler and Task-5
+LISTING_FIELDS = [
+    Field('Title', 'h3 a'),
+    Field('Schedule', '.clearfix.mt-1.mb-3.font-weight-bold'),
+    Field('Description', '.result-hit-body .mb-2'),
+    Field('Location', '.comma_split_line', many=True),
+    Field('Phone', '.fa-phone + .comma_split_line, .fa-phone + a'),
+    Field('Email', '.fa-envelope + a'),
+    Field('Website', '.fa-globe + a', attribute='href'),
+]
+
+# The listing as shown by the Milestone-3 wigan_directories app
+DIRECTORY_FIELDS = [
+    Field('Title', 'h3 a'),
+    Field('Schedule', '.mt-1.mb-3.font-weight-bold'),
+    Field('Description', 'div.result-hit-body > div.mb-2, div.mb-2'),
+    Field('Address', '.mb-3.text-muted .comma_split_line', many=True, separator=' '),
+    Field('Phone', '.contact-links ul li:nth-child(1) span.comma_split_line.d-none.d-sm-block.text-body'),
+    Field('Email', '.contact-links ul li:nth-child(2) a', attribute='href', transform='strip_mailto'),
+    Field('Website', '.contact-links ul li:nth-child(3) a', attribute='href'),
+]
+
+# Runs a schema over every hit on the page in a single browser round trip; TRANSFORMS is filled in per schema
+EXTRACT_ROWS_JS = """
+schema => {
+    const transforms = TRANSFORMS;
+    const clean = value => String(value).replace(/\\u200b/g, '').trim();
+    return Array.from(document.querySelectorAll(schema.item)).map(item => schema.fields.map(field => {
+        const read = element => field.attribute ? element.getAttribute(field.attribute) : element.innerText;
+        let value;
+        if (field.many) {
+            const values = Array.from(item.querySelectorAll(field.selector)).map(el => clean(read(el)));
+            value = values.length ? values.join(field.separator) : null;
+        } else {
+            const element = item.querySelector(field.selector);
+            value = element ? read(element) : null;
+        }
+        if (value === null) { return schema.missing; }
+        return clean(field.transform ? transforms[field.transform](value) : value);
+    }));
+}
+"""
+
+
+def clean_string(s):
+    """Cleans and sanitizes string input."""
+    return str(s).replace('\u200b', '').strip()
+
+
+class ListingSchema:
+    """
+    A declarative listing schema compiled once: CSS selectors are pre-compiled for BeautifulSoup,
+    and the same schema drives a single page.evaluate call for Playwright pages. Each field's
+    selector is evaluated once per hit.
+    """
+
+    def __init__(self, item_selector, fields, strip_text=False):
+        self.item_selector = item_selector
+        self.fields = fields
+        self.columns = [field.name for field in fields]
+        # strip_text joins the stripped text pieces like get_text(strip=True); otherwise whitespace
+        # is collapsed like the browser's innerText
+        self.strip_text = strip_text
+        self._item = soupsieve.compile(item_selector)
+        self._compiled = [(field, soupsieve.compile(field.selector),
+                           TRANSFORMS[field.transform][0] if field.transform else None) for field in fields]
+        used_transforms = sorted({field.transform for field in fields if field.transform})
+        self._js = EXTRACT_ROWS_JS.replace("TRANSFORMS", "{" + ", ".join(
+            f"{json.dumps(name)}: {TRANSFORMS[name][1]}" for name in used_transforms) + "}")
+        self._js_argument = {'item': item_selector, 'missing': MISSING,
+                             'fields': [field._asdict() for field in fields]}
+
+    def _read(self, element, field):
+        if field.attribute:
+            return element.get(field.attribute)
+        if self.strip_text:
+            return element.get_text(strip=True)
+        return re.sub(r'[ \t\r\n\f]+', ' ', element.get_text())
+
+    def _value(self, hit, field, selector, transform):
+        if field.many:
+            values = [clean_string(self._read(element, field)) for element in selector.select(hit)]
+            value = field.separator.join(values) if values else None
+        else:
+            element = selector.select_one(hit)
+            value = self._read(element, field) if element is not None else None
+        if value is None:
+            return MISSING
+        return clean_string(transform(value) if transform else value)
+
+    def _read_node(self, node, field):
+        if field.attribute:
+            return node.attributes.get(field.attribute)
+        if self.strip_text:
+            return node.text(strip=True)
+        return re.sub(r'[ \t\r\n\f]+', ' ', node.text())
+
+    def _value_selectolax(self, hit, field, transform):
+        if field.many:
+            values = [clean_string(self._read_node(node, field)) for node in hit.css(field.selector)]
+            value = field.separator.join(values) if values else None
+        else:
+            node = hit.css_first(field.selector)
+            value = self._read_node(node, field) if node is not None else None
+        if value is None:
+            return MISSING
+        return clean_string(transform(value) if transform else value)
+
+    def extract_rows(self, document):
+        """One list of values per hit in a BeautifulSoup or selectolax document, in column order."""
+        if is_selectolax_tree(document):
+            return [[self._value_selectolax(hit, field, transform) for field, _, transform in self._compiled]
+                    for hit in document.css(self.item_selector)]
+        return [[self._value(hit, field, selector, transform) for field, selector, transform in self._compiled]
+                for hit in self._item.select(document)]
+
+    def extract_records(self, document):
+        """One dict per hit in a BeautifulSoup or selectolax document, keyed by column name."""
+        return [dict(zip(self.columns, row)) for row in self.extract_rows(document)]
+
+    def extract_rows_from_html(self, html, backend=None):
+        """Parses `html` with the chosen parser backend (see common.html_parser) and extracts its rows."""
+        return self.extract_rows(parse_html(html, backend))
+
+    def extract_rows_playwright(self, page):
+        """Rows for every hit on a Playwright page, in one browser round trip."""
+        return page.evaluate(self._js, self._js_argument)
+
+    @staticmethod
+    def _read_handle(element, field):
+        return element.get_attribute(field.attribute) if field.attribute else element.inner_text()
+
+    def extract_rows_per_element(self, page):
+        """The same rows read element by element over the Playwright protocol; slower, kept for comparison."""
+        rows = []
+        for hit in page.query_selector_all(self.item_selector):
+            row = []
+            for field, _, transform in self._compiled:
+                if field.many:
+                    values = [clean_string(self._read_handle(element, field))
+                              for element in hit.query_selector_all(field.selector)]
+                    value = field.separator.join(values) if values else None
+                else:
+                    element = hit.query_selector(field.selector)
+                    value = self._read_handle(element, field) if element else None
+                row.append(MISSING if value is None else clean_string(transform(value) if transform else value))
+            rows.append(row)
+        return rows
+
+
+def parse_category_links(document):
+    """(anchor text, href) of the first link in each category block, for either parser backend."""
+    links = []
+    if is_selectolax_tree(document):
+        for block in document.css('li.category-block, div.category-block'):
+            anchor = block.css_first('a')
+            if anchor is not None:
+                links.append((anchor.text(), anchor.attributes.get('href')))
+        return links
+    for block in document.find_all(['li', 'div'], class_='category-block'):
+        anchor = block.find('a')
+        if anchor:
+            links.append((anchor.text, anchor.get('href')))
+    return links
+
+
+LISTING_SCHEMA = ListingSchema('.result_hit', LISTING_FIELDS)
+DIRECTORY_SCHEMA = ListingSchema('[id^=hit-]', DIRECTORY_FIELDS, strip_text=True)
+CSV_HEADER = LISTING_SCHEMA.columns
@@ -0,0 +1,4 @@
+import os
+
+# scraper.py refuses to import without a Gemini key; the tests never call the API
+os.environ.setdefault("GOOGLE_API_KEY", "test")
@@ -0,0 +1,91 @@
+import json
+import time
+import subprocess
+import pytest
+from bs4 import BeautifulSoup
+import common.category_index as category_index
+from common.category_index import CategoryIndex, count_results, get_category_index
+
+CLUBS = {'name': "Clubs", 'label': None, 'url': "https://example.com/clubs"}
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    """A saved index and a fresh process state; the explorer run is faked and exits with `returncode`."""
+    class Explorer:
+        runs = []
+        returncode = 0
+
+    def fake_run(command, **kwargs):
+        Explorer.runs.append(command)
+        if Explorer.returncode == 0:
+            rebuilt = CategoryIndex("https://example.com")
+            rebuilt.add_node("https://example.com", "Home", 0, [CLUBS, {**CLUBS, 'name': "Sport"}])
+            rebuilt.save(command[command.index("--index") + 1])
+        return subprocess.CompletedProcess(command, Explorer.returncode, "", "explorer failed")
+
+    path = str(tmp_path / "index.json")
+    index = CategoryIndex("https://example.com")
+    index.add_node("https://example.com", "Home", 0, [CLUBS])
+    index.add_node(CLUBS['url'], "Clubs", 1, [], result_count=12)
+    index.save(path)
+    monkeypatch.setattr(category_index.subprocess, "run", fake_run)
+    monkeypatch.setattr(category_index, "_index", None)
+    monkeypatch.setattr(category_index, "_last_attempt", 0)
+    Explorer.path = path
+    return Explorer
+
+
+def make_stale(path):
+    with open(path, encoding='utf-8') as index_file:
+        data = json.load(index_file)
+    with open(path, 'w', encoding='utf-8') as index_file:
+        json.dump({**data, 'built_at': 0}, index_file)
+
+
+def wait_for_refresh():
+    deadline = time.time() + 5
+    while category_index._refreshing.is_set() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_a_missing_index_is_empty_and_stale(tmp_path):
+    index = CategoryIndex.load(str(tmp_path / "missing.json"))
+    assert index.nodes == {} and index.is_stale()
+
+
+def test_a_fresh_index_is_served_without_a_rebuild(index_path):
+    index = get_category_index(index_path.path)
+    assert index.children("https://example.com") == [CLUBS]
+    assert index.children(CLUBS['url']) == [] and index.children("https://example.com/unknown") is None
+    assert index.nodes[CLUBS['url']]['result_count'] == 12
+    assert index_path.runs == []
+
+
+def test_a_stale_index_is_served_while_it_is_rebuilt(index_path):
+    make_stale(index_path.path)
+    assert get_category_index(index_path.path).children("https://example.com") == [CLUBS]
+    wait_for_refresh()
+    assert len(index_path.runs) == 1 and "--index-only" in index_path.runs[0]
+    assert len(get_category_index(index_path.path).children("https://example.com")) == 2
+
+
+def test_a_failed_rebuild_is_not_retried_straight_away(index_path, monkeypatch):
+    index_path.returncode = 1
+    make_stale(index_path.path)
+    get_category_index(index_path.path)
+    wait_for_refresh()
+    get_category_index(index_path.path)
+    wait_for_refresh()
+    assert len(index_path.runs) == 1
+    assert get_category_index(index_path.path).children("https://example.com") == [CLUBS]
+
+    monkeypatch.setattr(category_index, "_last_attempt", time.time() - category_index.REFRESH_RETRY_SECONDS - 1)
+    get_category_index(index_path.path)
+    wait_for_refresh()
+    assert len(index_path.runs) == 2
+
+
+def test_result_counts():
+    assert count_results(BeautifulSoup("<p>Showing 1,234 results</p>", 'html.parser')) == 1234
+    assert count_results(BeautifulSoup('<div class="result_hit"></div>' * 3, 'html.parser')) == 3
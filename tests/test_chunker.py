@@ -0,0 +1,43 @@
+from tools import estimate_tokens, iter_markdown_blocks, iter_markdown_chunks
+
+MARKDOWN = """# Listings
+
+Intro paragraph
+over two lines.
+
+* first item
+* second item
+
+## More
+Closing text."""
+
+
+def test_blocks_break_at_headings_list_items_and_blank_lines():
+    assert list(iter_markdown_blocks(MARKDOWN)) == [
+        "# Listings", "Intro paragraph\nover two lines.", "* first item", "* second item", "## More\nClosing text."]
+
+
+def test_small_documents_are_one_chunk():
+    assert list(iter_markdown_chunks(MARKDOWN, token_budget=1000)) == [
+        "# Listings\n\nIntro paragraph\nover two lines.\n\n* first item\n\n* second item\n\n## More\nClosing text."]
+
+
+def test_chunks_stay_within_the_budget_and_keep_all_text():
+    items = "\n".join(f"* Listing number {index} with some details" for index in range(200))
+    chunks = list(iter_markdown_chunks(items, token_budget=100))
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert [line for chunk in chunks for line in chunk.split("\n\n")] == items.split("\n")
+
+
+def test_an_oversized_paragraph_is_split_on_word_boundaries():
+    words = [f"word{index}" for index in range(500)]
+    chunks = list(iter_markdown_chunks(" ".join(words), token_budget=50))
+    assert len(chunks) > 1
+    assert " ".join(chunks).split() == words
+
+
+def test_model_budget_is_used_when_none_is_given():
+    text = "\n\n".join("x" * 400 for _ in range(100))  # about 10k tokens
+    assert len(list(iter_markdown_chunks(text, model="gemini flash-1.5"))) == 2
+    assert len(list(iter_markdown_chunks(text, model="unknown-model"))) == 3
@@ -0,0 +1,90 @@
+import importlib
+from contextlib import nullcontext
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+
+task4 = importlib.import_module("Task4-part2")
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    def route(self, pattern, handler):
+        pass
+
+    def new_page(self):
+        return FakePage(self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.visited = []
+
+    def is_closed(self):
+        return self.context.closed
+
+    def goto(self, url, wait_until=None):
+        if not self.context.browser.connected:
+            raise PlaywrightError("Target page, context or browser has been closed")
+        self.visited.append(url)
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self):
+        self.contexts.append(FakeContext(self))
+        return self.contexts[-1]
+
+    def close(self):
+        self.connected = False
+
+
+@pytest.fixture
+def crawl_browser(monkeypatch):
+    """A CrawlBrowser on fake Chromium instances, recording every launch."""
+    launched = []
+
+    class FakeChromium:
+        def launch(self, headless=True):
+            launched.append(FakeBrowser())
+            return launched[-1]
+
+    monkeypatch.setattr(task4, "paced", lambda url: nullcontext({}))
+    crawl_browser = task4.CrawlBrowser(pages_per_context=3)
+    crawl_browser.playwright = type("Playwright", (), {"chromium": FakeChromium()})()
+    crawl_browser.launched = launched
+    return crawl_browser
+
+
+def test_one_browser_and_page_serve_many_categories(crawl_browser):
+    first = crawl_browser.acquire_page()
+    crawl_browser.release_page(first)
+    second = crawl_browser.acquire_page()
+    assert second is first and len(crawl_browser.launched) == 1
+
+
+def test_a_context_is_replaced_after_serving_enough_pages(crawl_browser):
+    page = crawl_browser.acquire_page()
+    crawl_browser.release_page(page, page_loads=3)
+    assert page.context.closed
+    assert crawl_browser.acquire_page().context is not page.context
+
+
+def test_a_crashed_browser_is_relaunched_and_the_page_retried(crawl_browser):
+    page = crawl_browser.acquire_page()
+    crawl_browser.launched[0].connected = False
+    retried = task4.load_page_with_recovery(crawl_browser, page, "https://example.com/clubs")
+    assert len(crawl_browser.launched) == 2
+    assert page.context.closed and retried.visited == ["https://example.com/clubs"]
@@ -0,0 +1,127 @@
+import os
+import json
+from crawl_state import (FingerprintStore, fingerprint_first_page, normalize_url, CategoryFrontier, CrawlJournal,
+                         MANIFEST_FILE, JOURNAL_FILE)
+
+URL = "https://directory.wigan.gov.uk/kb5/wigan/fsd/results.page?categoryid=1"
+
+
+# -------------------- Category Fingerprints --------------------
+
+def scraped_category(tmp_path):
+    folder = tmp_path / "Young People"
+    folder.mkdir()
+    (folder / "data.csv").write_text("Title\n")
+    return str(folder)
+
+
+def test_fingerprint_covers_rows_and_next_page():
+    rows = [["Youth Club", "Wigan"]]
+    assert fingerprint_first_page(rows, "page2") == fingerprint_first_page([["Youth Club", "Wigan"]], "page2")
+    assert fingerprint_first_page(rows, "page2") != fingerprint_first_page(rows, None)
+
+
+def test_recorded_category_is_unchanged_until_its_fingerprint_changes(tmp_path):
+    folder = scraped_category(tmp_path)
+    store = FingerprintStore(str(tmp_path))
+    assert not store.is_unchanged(URL, folder, "a")
+    store.record(URL, "a", {"ETag": '"v1"'})
+    store.save()
+
+    store = FingerprintStore(str(tmp_path))
+    assert store.is_unchanged(URL, folder, "a")
+    assert not store.is_unchanged(URL, folder, "b")
+    assert store.is_unchanged(URL, folder, not_modified=True)
+
+
+def test_validators_are_sent_only_while_the_csv_exists(tmp_path):
+    folder = scraped_category(tmp_path)
+    store = FingerprintStore(str(tmp_path))
+    store.record(URL, "a", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    assert store.conditional_headers(URL, folder) == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    (tmp_path / "Young People" / "data.csv").unlink()
+    assert store.conditional_headers(URL, folder) == {}
+    assert not store.is_unchanged(URL, folder, "a")
+
+
+def test_fresh_validators_replace_the_stored_ones(tmp_path):
+    folder = scraped_category(tmp_path)
+    store = FingerprintStore(str(tmp_path))
+    store.record(URL, "a", {"ETag": '"v1"'})
+    store.is_unchanged(URL, folder, "a", headers={"ETag": '"v2"'})
+    assert store.conditional_headers(URL, folder)["If-None-Match"] == '"v2"'
+
+
+# -------------------- Frontier Deduplication --------------------
+
+def test_normalize_url_drops_what_does_not_identify_a_category():
+    assert normalize_url("HTTPS://Directory.Wigan.gov.uk:443/kb5/results.page;jsessionid=ABC?b=2&a=1#top") == \
+        "https://directory.wigan.gov.uk/kb5/results.page?a=1&b=2"
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_a_category_is_claimed_once_and_duplicates_get_links(tmp_path):
+    owner = tmp_path / "Young People" / "Clubs"
+    duplicate = tmp_path / "Leisure" / "Clubs"
+    same_category = URL.replace("https://directory", "https://DIRECTORY") + "#results"
+    frontier = CategoryFrontier(str(tmp_path))
+    assert frontier.claim(URL, str(owner))
+    assert not frontier.claim(same_category, str(duplicate))
+    assert frontier.claim(URL, str(owner))  # the owner itself may claim it again
+
+    (owner / "Sport").mkdir(parents=True)
+    (owner / "data.csv").write_text("Title\nYouth Club\n")
+    (owner / "Sport" / "data.csv").write_text("Title\nFootball\n")
+    assert frontier.link_duplicates() == 2
+    assert (duplicate / "Sport" / "data.csv").read_text() == "Title\nFootball\n"
+
+    manifest = json.loads((tmp_path / MANIFEST_FILE).read_text())
+    assert manifest == {os.path.join("Leisure", "Clubs"): {"url": same_category,
+                                                           "same_as": os.path.join("Young People", "Clubs")}}
+
+
+# -------------------- Crawl Journal --------------------
+
+CLUBS = URL.replace("categoryid=1", "categoryid=2")
+SPORT = URL.replace("categoryid=1", "categoryid=3")
+
+
+def test_resume_replays_children_pages_and_finished_categories(tmp_path):
+    journal = CrawlJournal(str(tmp_path))
+    journal.record_children(URL, [("Clubs", CLUBS)])
+    journal.record_page(CLUBS, [["Youth Club"]], CLUBS + "&page=2")
+    journal.record_page(CLUBS, [["Chess Club"]], CLUBS + "&page=3")
+    journal.record_page(SPORT, [["Football"]], None)
+    journal.record_category(SPORT, "Sport/data.csv")
+    journal.close()
+
+    resumed = CrawlJournal(str(tmp_path), resume=True)
+    assert resumed.children_of(URL) == [("Clubs", CLUBS)]
+    assert resumed.resume_point(CLUBS) == ([["Youth Club"], ["Chess Club"]], CLUBS + "&page=3", 2)
+    assert resumed.is_completed(SPORT) and resumed.resume_point(SPORT) is None
+    resumed.close()
+
+
+def test_resume_skips_a_line_cut_short_by_a_crash(tmp_path):
+    journal = CrawlJournal(str(tmp_path))
+    journal.record_page(URL, [["Youth Club"]], URL + "&page=2")
+    journal.close()
+    with open(tmp_path / JOURNAL_FILE, "a", encoding="utf-8") as journal_file:
+        journal_file.write('{"type": "page", "url": "')
+
+    resumed = CrawlJournal(str(tmp_path), resume=True)
+    resumed.record_page(URL, [["Chess Club"]], None)
+    resumed.close()
+    replayed = CrawlJournal(str(tmp_path), resume=True)
+    assert replayed.resume_point(URL) == ([["Youth Club"], ["Chess Club"]], None, 2)
+    replayed.close()
+
+
+def test_a_fresh_journal_starts_empty(tmp_path):
+    journal = CrawlJournal(str(tmp_path))
+    journal.record_category(URL, "data.csv")
+    journal.close()
+    journal = CrawlJournal(str(tmp_path))
+    assert not journal.is_completed(URL)
+    journal.close()
@@ -0,0 +1,92 @@
+import importlib
+import pytest
+import common.driver_pool as driver_pool
+from common.driver_pool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+        self.user_agents = []
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("browser crashed")
+        return 1
+
+    def execute_cdp_cmd(self, command, params):
+        self.user_agents.append(params["userAgent"])
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def launched(monkeypatch):
+    """Replaces Chrome with fake drivers and records every one launched."""
+    drivers = []
+
+    def fake_launch(self):
+        driver = FakeDriver()
+        self._pages[id(driver)] = 0
+        drivers.append(driver)
+        return driver
+
+    monkeypatch.setattr(DriverPool, "_launch", fake_launch)
+    monkeypatch.setattr(DriverPool, "warm_in_background", lambda self: None)
+    return drivers
+
+
+def test_drivers_are_reused_until_max_pages(launched):
+    pool = DriverPool(size=1, max_pages=3, lean=False, user_agents=["agent"])
+    for _ in range(2):
+        with pool.driver(pages=1):
+            pass
+    assert len(launched) == 1 and not launched[0].quit_called
+    assert launched[0].user_agents == ["agent", "agent"]
+
+    with pool.driver(pages=1):
+        pass
+    assert launched[0].quit_called
+    with pool.driver():
+        pass
+    assert len(launched) == 2
+
+
+def test_unhealthy_drivers_are_replaced_on_borrow(launched):
+    pool = DriverPool(size=1, lean=False)
+    first = pool.borrow()
+    pool.give_back(first, pages=0)
+    first.alive = False
+    second = pool.borrow()
+    assert first.quit_called and second is launched[1]
+
+
+def test_a_driver_that_crashed_during_use_is_discarded(launched):
+    pool = DriverPool(size=1, lean=False)
+    with pytest.raises(ValueError):
+        with pool.driver() as driver:
+            driver.alive = False
+            raise ValueError("page failed")
+    assert driver.quit_called
+    assert pool.borrow() is launched[1]
+
+
+def test_borrow_times_out_when_every_driver_is_in_use(launched):
+    pool = DriverPool(size=1, lean=False)
+    pool.borrow()
+    with pytest.raises(TimeoutError):
+        pool.borrow(timeout=0.05)
+
+
+def test_importing_the_scraper_does_not_start_chrome(monkeypatch):
+    monkeypatch.setattr(driver_pool, "_pool", None)
+    importlib.import_module("scraper")
+    assert driver_pool._pool is None
@@ -0,0 +1,86 @@
+import json
+import pytest
+import pandas as pd
+import exports
+from exports import EXPORT_FORMATS, build_export, cached_export
+from job_queue import JobStore
+
+ROWS = [
+    {'Name': "Café | Bar", 'Price': 3},
+    {'Name': "Line\nbreak", 'Price': 2.5, 'Tags': ["a", "b"]},
+    {'Name': None, 'Price': None},
+]
+COLUMNS = ['Name', 'Price', 'Tags']
+
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(exports, "get_job_store", lambda: store)
+    monkeypatch.setattr(exports, "EXPORTS_DIR", str(tmp_path / "exports"))
+    monkeypatch.setattr(exports, "EXPORT_CHUNK_ROWS", 2)  # several batches per export
+    job_id = store.create("https://example.com", ["Name", "Price"], "gpt-4o-mini")
+    store.add_rows(job_id, 0, ROWS, {'done': 1, 'produced': 1, 'pages': 1, 'input_tokens': 0,
+                                     'output_tokens': 0, 'total_cost': 0.0})
+    return store.get(job_id)
+
+
+def test_columns_are_the_fields_then_any_extra_keys(job):
+    assert exports.export_columns(job) == COLUMNS
+
+
+def test_csv(job):
+    frame = pd.read_csv(build_export(job, "CSV"))
+    assert list(frame.columns) == COLUMNS
+    assert frame['Name'].tolist()[:2] == ["Café | Bar", "Line\nbreak"]
+    assert frame['Price'].tolist()[:2] == [3, 2.5]
+
+
+def test_xlsx_keeps_numbers(job):
+    pytest.importorskip("openpyxl")
+    frame = pd.read_excel(build_export(job, "XLSX"), sheet_name=exports.SHEET_NAME)
+    assert list(frame.columns) == COLUMNS
+    assert frame['Price'].tolist()[:2] == [3, 2.5]
+    assert frame['Tags'][1] == '["a", "b"]'
+
+
+def test_json_is_one_array_across_batches(job):
+    with open(build_export(job, "JSON"), encoding='utf-8') as export_file:
+        records = json.load(export_file)
+    assert records == [{'Name': "Café | Bar", 'Price': 3, 'Tags': None},
+                       {'Name': "Line\nbreak", 'Price': 2.5, 'Tags': ["a", "b"]},
+                       {'Name': None, 'Price': None, 'Tags': None}]
+
+
+def test_markdown_escapes_pipes_and_newlines(job):
+    with open(build_export(job, "Markdown"), encoding='utf-8') as export_file:
+        lines = export_file.read().splitlines()
+    assert lines[0] == "| Name | Price | Tags |"
+    assert lines[2] == "| Café \\| Bar | 3 |  |"
+    assert lines[3] == '| Line break | 2.5 | ["a", "b"] |'
+    assert len(lines) == 5
+
+
+@pytest.mark.parametrize("label", ["Parquet", "Arrow IPC"])
+def test_arrow_formats_hold_string_columns(job, label):
+    pa = pytest.importorskip("pyarrow")
+    path = build_export(job, label)
+    if label == "Parquet":
+        table = pytest.importorskip("pyarrow.parquet").read_table(path)
+    else:
+        with pa.OSFile(path, 'rb') as source:
+            table = pa.ipc.open_file(source).read_all()
+    assert table.column_names == COLUMNS
+    assert table.column('Price').to_pylist() == ["3", "2.5", None]
+
+
+def test_exports_are_cached_per_job_version(job):
+    assert cached_export(job, "CSV") is None
+    path = build_export(job, "CSV")
+    assert cached_export(job, "CSV") == path and path.endswith(".csv")
+    assert exports.export_path({**job, 'updated_at': job['updated_at'] + 1}, "CSV") != path
+
+
+def test_plain_formats_are_always_available():
+    assert set(exports.available_formats()) <= set(EXPORT_FORMATS)
+    assert {"CSV", "XLSX", "Markdown", "JSON"} <= set(exports.available_formats())
@@ -0,0 +1,157 @@
+import time
+import threading
+import pytest
+import extraction
+from extraction import RateLimiter, stream_extract_chunks
+
+
+class FakeClock:
+    """Stands in for the time module: sleeping moves the clock instead of waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class NoLimit:
+    def acquire(self, tokens, should_stop=None):
+        return True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(extraction, "time", clock)
+    return clock
+
+
+def extract(chunk):
+    return [{'chunk': chunk}], 1, 2, 0.5
+
+
+def extract_all(chunks, extract, **kwargs):
+    """Collects the streamed results into chunk order."""
+    return [result for _, result in sorted(stream_extract_chunks(chunks, extract, **kwargs), key=lambda item: item[0])]
+
+
+# -------------------- RateLimiter --------------------
+
+def test_requests_per_minute_waits_for_the_window(clock):
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=1000)
+    limiter.acquire(10)
+    limiter.acquire(10)
+    assert clock.now == 0
+    limiter.acquire(10)
+    assert clock.now == pytest.approx(60)
+
+
+def test_tokens_per_minute_waits_for_the_window(clock):
+    limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=100)
+    limiter.acquire(60)
+    clock.now = 30
+    limiter.acquire(60)
+    assert clock.now == pytest.approx(60)
+
+
+def test_request_larger_than_the_budget_passes_on_an_empty_window(clock):
+    limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=100)
+    limiter.acquire(500)
+    assert clock.now == 0
+
+
+def test_a_stopped_wait_gives_up_without_taking_a_slot(clock):
+    limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=1000)
+    limiter.acquire(10)
+    assert limiter.acquire(10, should_stop=lambda: clock.now >= 1) is False
+    assert clock.now < 2 and len(limiter._events) == 1
+
+
+# -------------------- Chunk Extraction --------------------
+
+def test_concurrent_results_keep_chunk_order():
+    chunks = [f"chunk {index}" for index in range(10)]
+    results = extract_all(chunks, extract, max_workers=4, rate_limiter=NoLimit())
+    assert [result[0][0]['chunk'] for result in results] == chunks
+
+
+def test_failed_chunks_are_none():
+    def flaky(chunk):
+        if chunk == "bad":
+            raise RuntimeError("quota")
+        return extract(chunk)
+
+    results = extract_all(["good", "bad"], flaky, rate_limiter=NoLimit())
+    assert results[0] is not None and results[1] is None
+
+
+def test_lookup_hits_skip_the_limiter_and_the_model():
+    class CountingLimit:
+        calls = 0
+
+        def acquire(self, tokens, should_stop=None):
+            CountingLimit.calls += 1
+            return True
+
+    extracted = []
+
+    def extract_and_record(chunk):
+        extracted.append(chunk)
+        return extract(chunk)
+
+    lookup = lambda chunk: ([{'cached': chunk}], 0, 0, 0.0) if chunk == "cached" else None
+    results = extract_all(["cached", "new"], extract_and_record, lookup=lookup, rate_limiter=CountingLimit())
+    assert results[0][0] == [{'cached': "cached"}]
+    assert extracted == ["new"] and CountingLimit.calls == 1
+
+
+def test_stream_reraises_a_source_error_after_earlier_chunks():
+    def source():
+        yield "first"
+        raise ValueError("fetch failed")
+
+    stream = stream_extract_chunks(source(), extract, rate_limiter=NoLimit())
+    assert next(stream)[0] == 0
+    with pytest.raises(ValueError, match="fetch failed"):
+        next(stream)
+
+
+def test_closing_the_stream_closes_the_source():
+    closed = threading.Event()
+
+    def source():
+        try:
+            for index in range(1000):
+                yield f"chunk {index}"
+        finally:
+            closed.set()
+
+    stream = stream_extract_chunks(source(), extract, rate_limiter=NoLimit(), max_workers=1, queue_size=1)
+    next(stream)
+    stream.close()
+    assert closed.wait(5)
+
+
+def test_stopping_drops_chunks_still_waiting_for_the_rate_limit():
+    stopped = threading.Event()
+    extracted = []
+
+    def extract_and_stop(chunk):
+        extracted.append(chunk)
+        stopped.set()
+        return extract(chunk)
+
+    # Only the first request fits in the window; the others would wait a minute for it to pass
+    limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=1000)
+    started = time.monotonic()
+    results = list(stream_extract_chunks(["first", "second", "third"], extract_and_stop, rate_limiter=limiter,
+                                         max_workers=3, should_stop=stopped.is_set))
+    assert time.monotonic() - started < 5
+    assert extracted == ["first"]
+    assert results in ([(0, extract("first"))], [])  # Depends on whether the stop is seen before the result
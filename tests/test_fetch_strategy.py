@@ -0,0 +1,71 @@
+import pytest
+import fetch_strategy
+import scraper
+from fetch_strategy import DomainStrategyStore, find_pagination_links_static, has_meaningful_content
+
+ARTICLE = "<html><body><main>" + "<p>" + " ".join(["listing"] * 200) + "</p></main></body></html>"
+APP_SHELL = "<html><body><div id='root'></div><script src='app.js'></script></body></html>"
+PAGINATED = ARTICLE.replace("</main>", "</main><ul class='pagination'><a href='?page=2'>2</a>"
+                                       "<a href='javascript:void(0)'>next</a><a href='/list?page=3'>3</a></ul>")
+
+
+def test_meaningful_content():
+    assert has_meaningful_content(ARTICLE)
+    assert not has_meaningful_content(APP_SHELL)
+    assert not has_meaningful_content("<html><body><nav>" + "menu " * 300 + "</nav></body></html>")
+
+
+def test_pagination_links_are_found_in_static_html():
+    assert find_pagination_links_static(PAGINATED, "https://example.com/list", scraper.PAGINATION_XPATHS) == [
+        "https://example.com/list?page=2", "https://example.com/list?page=3"]
+
+
+def test_decisions_are_per_domain_and_expire(tmp_path, monkeypatch):
+    store = DomainStrategyStore(str(tmp_path / "strategy.json"))
+    store.set("https://example.com/a", "browser")
+    reloaded = DomainStrategyStore(str(tmp_path / "strategy.json"))
+    assert reloaded.get("https://EXAMPLE.com/b") == "browser"
+    assert reloaded.get("https://other.example/") is None
+    monkeypatch.setattr(fetch_strategy, "DECISION_TTL_SECONDS", -1)
+    assert reloaded.get("https://example.com/a") is None
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """A site served by fake static and browser fetchers, with a fresh strategy store."""
+    class Site:
+        static_pages = {}
+        browser_loads = []
+
+    def fake_browser(url, result, concurrency):
+        Site.browser_loads.append(url)
+        yield "<html>rendered</html>"
+
+    store = DomainStrategyStore(str(tmp_path / "strategy.json"))
+    monkeypatch.setattr(scraper, "get_strategy_store", lambda: store)
+    monkeypatch.setattr(scraper, "fetch_static", lambda url: Site.static_pages.get(url))
+    monkeypatch.setattr(scraper, "iter_html_pages", fake_browser)
+    Site.store = store
+    return Site
+
+
+def test_server_rendered_pages_skip_the_browser(site):
+    site.static_pages = {"https://example.com/list": PAGINATED, "https://example.com/list?page=2": ARTICLE,
+                         "https://example.com/list?page=3": ARTICLE}
+    result = {}
+    pages = list(scraper.iter_html_pages_auto("https://example.com/list", result))
+    assert len(pages) == 3 and site.browser_loads == []
+    assert result['fetch_mode'] == 'static' and result['pages_scraped'] == 3
+    assert site.store.get("https://example.com") == 'static'
+
+
+def test_an_app_shell_falls_back_to_the_browser_and_is_remembered(site):
+    site.static_pages = {"https://example.com/app": APP_SHELL}
+    result = {}
+    assert list(scraper.iter_html_pages_auto("https://example.com/app", result)) == ["<html>rendered</html>"]
+    assert result['fetch_mode'] == 'browser' and site.store.get("https://example.com") == 'browser'
+
+    # The next scrape of the domain goes straight to the browser
+    site.static_pages = {"https://example.com/other": ARTICLE}
+    list(scraper.iter_html_pages_auto("https://example.com/other", {}))
+    assert site.browser_loads == ["https://example.com/app", "https://example.com/other"]
@@ -0,0 +1,26 @@
+import pytest
+import common.html_parser as html_parser
+from common.html_parser import available_backends, resolve_backend, parse_html, select_first_attribute
+from common.wigan_listings import LISTING_SCHEMA, parse_category_links
+from synthetic_listings import synthetic_results_page
+
+PAGE = synthetic_results_page(3) + '<li class="category-block"><a href="/clubs">Clubs</a></li>'
+
+
+def test_missing_backends_fall_back(monkeypatch):
+    monkeypatch.setattr(html_parser, "HAVE_SELECTOLAX", False)
+    assert resolve_backend("selectolax") == "lxml"
+    monkeypatch.setattr(html_parser, "HAVE_LXML", False)
+    assert resolve_backend("selectolax") == "html.parser"
+    assert resolve_backend("auto") == "html.parser"
+    with pytest.raises(ValueError):
+        resolve_backend("html5lib")
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_every_backend_extracts_the_same_listings(backend):
+    document = parse_html(PAGE, backend)
+    assert LISTING_SCHEMA.extract_rows(document) == LISTING_SCHEMA.extract_rows(parse_html(PAGE, "html.parser"))
+    assert parse_category_links(document) == [("Clubs", "/clubs")]
+    assert select_first_attribute(document, ".result_hit h3 a", "href") == "/listing/0"
+    assert select_first_attribute(document, ".no-such-element", "href") is None
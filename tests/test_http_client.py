@@ -0,0 +1,104 @@
+import threading
+import pytest
+import requests
+import common.http_client as http_client
+from common.http_client import HTTPCache, HTTPClient, freshness_lifetime, is_storable
+
+URL = "https://example.com/listings"
+
+
+def make_response(status=200, body=b"<html>listings</html>", **headers):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = requests.structures.CaseInsensitiveDict(headers)
+    response._content = body
+    response.url = URL
+    return response
+
+
+@pytest.fixture
+def network(monkeypatch):
+    """Replaces the network with a queue of responses and records the headers of each request."""
+    class Network:
+        responses = []
+        requests = []
+
+    def fake_paced_get(url, session=None, headers=None, **kwargs):
+        Network.requests.append(headers or {})
+        return Network.responses.pop(0)
+
+    monkeypatch.setattr(http_client, "paced_get", fake_paced_get)
+    return Network
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = HTTPClient(HTTPCache(str(tmp_path / "responses.sqlite3")))
+    yield client
+    client.close()
+
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"Cache-Control": "public, max-age=60"}) == 60
+    assert freshness_lifetime({"Date": "Mon, 01 Jan 2024 00:00:00 GMT",
+                               "Expires": "Mon, 01 Jan 2024 00:05:00 GMT"}) == 300
+    assert freshness_lifetime({"Date": "Thu, 11 Jan 2024 00:00:00 GMT",
+                               "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}) == pytest.approx(86400)
+    assert freshness_lifetime({}) == 0
+
+
+def test_only_reusable_responses_are_stored():
+    assert is_storable(make_response(ETag='"v1"'))
+    assert is_storable(make_response(**{"Cache-Control": "max-age=60"}))
+    assert not is_storable(make_response())
+    assert not is_storable(make_response(404, ETag='"v1"'))
+    assert not is_storable(make_response(ETag='"v1"', **{"Cache-Control": "no-store"}))
+
+
+def test_fresh_responses_are_served_from_the_cache(client, network):
+    network.responses = [make_response(**{"Cache-Control": "max-age=60"})]
+    assert client.get(URL).text == "<html>listings</html>"
+    cached = client.get(URL)
+    assert cached.from_cache and cached.text == "<html>listings</html>"
+    assert len(network.requests) == 1
+    assert client.cache.stats() == {"hits": 1, "revalidated": 0, "misses": 1, "entries": 1}
+
+
+def test_stale_responses_are_revalidated_with_their_validators(client, network):
+    network.responses = [make_response(ETag='"v1"'), make_response(304, b"")]
+    client.get(URL)
+    revalidated = client.get(URL)
+    assert network.requests[1] == {"If-None-Match": '"v1"'}
+    assert revalidated.status_code == 200 and revalidated.text == "<html>listings</html>"
+    assert client.cache.stats()["revalidated"] == 1
+
+
+def test_requests_with_their_own_validators_bypass_the_cache(client, network):
+    network.responses = [make_response(**{"Cache-Control": "max-age=60"}), make_response(304, b"")]
+    client.get(URL)
+    assert client.get(URL, headers={"If-None-Match": '"v0"'}).status_code == 304
+
+
+def test_vary_headers_must_match(client, network):
+    network.responses = [make_response(Vary="Accept-Language", **{"Cache-Control": "max-age=60"}),
+                         make_response(body=b"<html>anderes</html>")]
+    client.get(URL, headers={"Accept-Language": "en"})
+    assert client.get(URL, headers={"Accept-Language": "de"}).text == "<html>anderes</html>"
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    cache = HTTPCache(str(tmp_path / "responses.sqlite3"), max_bytes=150)
+    for path in ("a", "b"):
+        cache.put(f"{URL}/{path}", make_response(body=b"x" * 100, ETag='"v1"'), {})
+    assert cache.get(f"{URL}/a", {}) is None
+    assert cache.get(f"{URL}/b", {})["body"] == b"x" * 100
+
+
+def test_counters_do_not_lose_updates_across_threads(tmp_path):
+    cache = HTTPCache(str(tmp_path / "responses.sqlite3"))
+    threads = [threading.Thread(target=lambda: [cache.count("hits") for _ in range(1000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["hits"] == 8000
@@ -0,0 +1,68 @@
+import pytest
+import job_queue
+from job_queue import JobStore, QUEUED, RUNNING, DONE, CANCELLED, INTERRUPTED
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "EXPORTS_DIR", str(tmp_path / "exports"))
+    return JobStore(str(tmp_path / "jobs.sqlite3"), max_kept=2)
+
+
+def progress(done, input_tokens=0):
+    return {'done': done, 'produced': done, 'pages': 1, 'input_tokens': input_tokens,
+            'output_tokens': 0, 'total_cost': 0.0}
+
+
+def test_new_jobs_are_queued_with_their_request(store):
+    job = store.get(store.create("https://example.com", ["Name", "Price"], "gpt-4o-mini"))
+    assert job['status'] == QUEUED and job['fields'] == ["Name", "Price"] and job['fetch_info'] == {}
+    assert store.get(9999) is None
+
+
+def test_rows_come_back_in_chunk_order_whatever_order_they_arrive(store):
+    job_id = store.create("https://example.com", ["Name"], "gpt-4o-mini")
+    store.start(job_id)
+    store.add_rows(job_id, 1, [{'Name': "c"}], progress(1))
+    store.add_rows(job_id, 0, [{'Name': "a"}, {'Name': "b"}], progress(2, input_tokens=50))
+    assert store.rows(job_id) == [{'Name': "a"}, {'Name': "b"}, {'Name': "c"}]
+    assert [batch for batch in store.iter_row_batches(job_id, 2)] == [[{'Name': "a"}, {'Name': "b"}], [{'Name': "c"}]]
+    job = store.get(job_id)
+    assert job['status'] == RUNNING and job['rows'] == 3 and job['chunks_done'] == 2 and job['input_tokens'] == 50
+
+
+def test_cancel_is_recorded_for_the_worker_to_see(store):
+    job_id = store.create("https://example.com", ["Name"], "gpt-4o-mini")
+    assert not store.is_cancel_requested(job_id)
+    store.request_cancel(job_id)
+    assert store.is_cancel_requested(job_id) and store.get(job_id)['cancel_requested']
+    store.finish(job_id, CANCELLED, {'stopped': True})
+    job = store.get(job_id)
+    assert job['status'] == CANCELLED and job['fetch_info'] == {'stopped': True}
+
+
+def test_active_jobs_of_a_stopped_server_are_marked_interrupted(store):
+    queued = store.create("https://example.com/1", ["Name"], "gpt-4o-mini")
+    running = store.create("https://example.com/2", ["Name"], "gpt-4o-mini")
+    store.start(running)
+    store.add_rows(running, 0, [{'Name': "a"}], progress(1))
+    store.mark_interrupted()
+    assert store.get(queued)['status'] == INTERRUPTED and store.get(running)['status'] == INTERRUPTED
+    assert store.rows(running) == [{'Name': "a"}]
+
+
+def test_old_finished_jobs_are_pruned_with_their_rows_and_exports(store, tmp_path):
+    (tmp_path / "exports").mkdir()
+    finished = []
+    for index in range(3):
+        job_id = store.create(f"https://example.com/{index}", ["Name"], "gpt-4o-mini")
+        store.add_rows(job_id, 0, [{'Name': index}], progress(1))
+        store.finish(job_id, DONE)
+        (tmp_path / "exports" / f"job_{job_id}_1.csv").write_text("Name\n")
+        finished.append(job_id)
+    active = store.create("https://example.com/active", ["Name"], "gpt-4o-mini")
+
+    # Pruning runs when a job is created: the two newest finished jobs stay, active jobs are never pruned
+    assert store.get(finished[0]) is None and store.rows(finished[0]) == []
+    assert not (tmp_path / "exports" / f"job_{finished[0]}_1.csv").exists()
+    assert [job['id'] for job in store.list_jobs()] == [active, finished[2], finished[1]]
@@ -0,0 +1,84 @@
+import json
+from fnmatch import fnmatch
+from common.lean_fetch import (LeanFetchStats, collect_selenium_page_stats, enable_lean_fetch_playwright,
+                               enable_lean_fetch_selenium, format_page_report)
+
+
+class FakeCDPDriver:
+    def __init__(self, log=()):
+        self.commands = {}
+        self.log = list(log)
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands[command] = params
+
+    def get_log(self, kind):
+        return self.log
+
+    def execute_script(self, script):
+        return 40960
+
+
+def blocked_urls(block_css=True):
+    driver = FakeCDPDriver()
+    enable_lean_fetch_selenium(driver, block_css)
+    return driver.commands["Network.setBlockedURLs"]["urls"]
+
+
+def is_blocked(url, patterns):
+    return any(fnmatch(url, pattern) for pattern in patterns)
+
+
+def test_selenium_blocks_heavy_resources_and_analytics_but_not_the_page():
+    patterns = blocked_urls()
+    for url in ["https://example.com/logo.png?v=2", "https://example.com/fonts/a.woff2",
+                "https://example.com/site.css", "https://www.google-analytics.com/analytics.js"]:
+        assert is_blocked(url, patterns), url
+    for url in ["https://example.com/listings?page=2", "https://example.com/app.js", "https://example.com/api/data.json"]:
+        assert not is_blocked(url, patterns), url
+
+
+def test_css_can_be_kept():
+    assert not is_blocked("https://example.com/site.css", blocked_urls(block_css=False))
+
+
+def test_blocked_requests_are_counted_from_the_performance_log():
+    def event(method, **params):
+        return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+    driver = FakeCDPDriver([
+        event("Network.loadingFailed", type="Image", blockedReason="inspector"),
+        event("Network.loadingFailed", type="Font", blockedReason="inspector"),
+        event("Network.loadingFailed", type="XHR", errorText="net::ERR_FAILED"),  # failed, not blocked
+        event("Network.responseReceived", type="Document"),
+    ])
+    report = collect_selenium_page_stats(driver, LeanFetchStats(), "https://example.com")
+    assert report["blocked_by_type"] == {"image": 1, "font": 1}
+    assert report["estimated_bytes_saved"] == 55000 and report["transferred_bytes"] == 40960
+    assert format_page_report(report) == "Lean fetch: blocked 2 requests, ~54 KB saved, 40 KB transferred"
+
+
+def test_playwright_aborts_blocked_resource_types_and_hosts():
+    class Route:
+        def __init__(self, url, resource_type):
+            self.request = type("Request", (), {"url": url, "resource_type": resource_type})
+            self.outcome = None
+
+        def abort(self):
+            self.outcome = "aborted"
+
+        def continue_(self):
+            self.outcome = "continued"
+
+    class Page:
+        def route(self, pattern, handler):
+            self.handler = handler
+
+    page, stats = Page(), LeanFetchStats()
+    enable_lean_fetch_playwright(page, stats)
+    routes = [Route("https://example.com/a.png", "image"), Route("https://www.hotjar.com/t.js", "script"),
+              Route("https://example.com/listings", "document")]
+    for route in routes:
+        page.handler(route)
+    assert [route.outcome for route in routes] == ["aborted", "aborted", "continued"]
+    assert stats.blocked == {"image": 1, "script": 1}
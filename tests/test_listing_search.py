@@ -0,0 +1,89 @@
+import csv
+import os
+import pytest
+from common.listing_search import ListingIndex, listing_key, fts_query, write_category_sidecar
+
+YOUTH_CLUB = {'Title': "Youth Club", 'Description': "Weekly youth club with games and sport",
+              'Schedule': "Fridays", 'Location': "Wigan Youth Zone", 'Phone': "N/A"}
+SWIMMING = {'Title': "Swimming lessons", 'Description': "Lessons for beginners", 'Location': "Robin Park"}
+
+
+def write_csv(path, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.DictWriter(csv_file, ['Title', 'Description', 'Schedule', 'Location', 'Phone'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def folders(tmp_path):
+    return tmp_path / "Wigan_Exploration", tmp_path / "Wigan_Scraped_Data"
+
+
+@pytest.fixture
+def index(tmp_path, folders):
+    exploration, scraped = folders
+    write_csv(exploration / "Young People" / "Clubs" / "data.csv", [YOUTH_CLUB])
+    write_csv(exploration / "Leisure" / "data.csv", [YOUTH_CLUB, SWIMMING])
+    return ListingIndex(str(tmp_path / "index.sqlite3"), str(exploration), str(scraped))
+
+
+def test_listing_key_ignores_case_and_spacing():
+    assert listing_key(" Youth  Club", "Wigan") == listing_key("youth club", "WIGAN ") == "youth club|wigan"
+
+
+def test_fts_query_matches_every_word_as_a_prefix():
+    assert fts_query('youth "club') == '"youth"* "club"*'
+    assert fts_query("  ") == ""
+
+
+def test_a_listing_in_several_categories_is_one_result(index):
+    assert index.update() == (2, 0)
+    results = index.search("youth club")
+    assert len(results) == 1
+    assert results[0]['categories'] == "Leisure; Young People > Clubs"
+    assert results[0]['phone'] is None  # the N/A placeholder
+    assert "**youth**" in results[0]['match'].lower()
+
+
+def test_facets_count_distinct_listings(index):
+    index.update()
+    assert sorted(index.facets("club")) == [("Leisure", 1), ("Young People", 1)]
+    assert [result['title'] for result in index.search("lessons", ["Young People"])] == []
+    assert [result['title'] for result in index.search("lessons", ["Leisure"])] == ["Swimming lessons"]
+
+
+def test_update_only_reads_changed_files_and_drops_deleted_ones(index, folders):
+    exploration, _ = folders
+    index.update()
+    assert index.update() == (0, 0)
+    os.remove(exploration / "Leisure" / "data.csv")
+    assert index.update() == (0, 1)
+    assert index.search("swimming") == []
+    assert index.search("youth club")[0]['categories'] == "Young People > Clubs"
+
+
+def test_changed_listings_are_reindexed(index, folders):
+    exploration, _ = folders
+    index.update()
+    path = exploration / "Leisure" / "data.csv"
+    write_csv(path, [YOUTH_CLUB, {**SWIMMING, 'Description': "Aqua aerobics for adults"}])
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert index.update() == (1, 0)
+    assert index.search("lessons for beginners") == []
+    assert index.search("aerobics")[0]['title'] == "Swimming lessons"
+
+
+def test_saved_files_use_their_category_sidecar(index, folders):
+    _, scraped = folders
+    described = scraped / "dementia.csv"
+    write_csv(described, [{'Title': "Memory cafe", 'Location': "Leigh"}])
+    write_category_sidecar(str(described), "https://example.com/dementia", ["Adults", "Dementia"])
+    write_csv(scraped / "unknown.csv", [{'Title': "Knitting circle", 'Location': "Hindley"}])
+    index.update()
+    assert index.search("memory")[0]['categories'] == "Adults > Dementia"
+    assert index.facets("memory") == [("Adults", 1)]
+    # Without a sidecar the listing is searchable but has no category
+    assert index.search("knitting")[0]['categories'] == ""
+    assert index.facets("knitting") == []
@@ -0,0 +1,45 @@
+import llm_cache
+from llm_cache import LLMCache, make_cache_key, normalize_fields
+
+
+def test_normalize_fields_strips_and_dedupes_in_order():
+    assert normalize_fields([" Price", "Name ", "Price", ""]) == ["Price", "Name"]
+
+
+def test_cache_key_depends_on_field_order_model_and_prompt_version():
+    key = make_cache_key("chunk", ["Name", "Price"], "gpt-4o-mini")
+    assert key == make_cache_key("chunk", [" Name", "Price", "Name"], "gpt-4o-mini")
+    assert key != make_cache_key("chunk", ["Price", "Name"], "gpt-4o-mini")
+    assert key != make_cache_key("chunk", ["Name", "Price"], "gemini-1.5-flash")
+    assert key != make_cache_key("chunk", ["Name", "Price"], "gpt-4o-mini", prompt_version="2")
+
+
+def test_get_returns_what_was_put(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("key") is None
+    cache.put("key", [{"Name": "Café"}])
+    assert cache.get("key") == [{"Name": "Café"}]
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_expired_entries_are_dropped(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    now = 1000.0
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now)
+    cache.put("key", [])
+    now += 61
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_over_the_size_limit(tmp_path, monkeypatch):
+    row = [{"text": "x" * 100}]
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_bytes=250)
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(llm_cache.time, "time", lambda: next(clock))
+    cache.put("old", row)
+    cache.put("used", row)
+    cache.get("old")  # now more recently used than "used"
+    cache.put("new", row)
+    assert cache.get("used") is None
+    assert cache.get("old") == row and cache.get("new") == row
@@ -0,0 +1,62 @@
+import threading
+import time
+from contextlib import contextmanager
+from scraper import iter_pages_concurrently
+
+
+class FakePagePool:
+    """Serves pages from a dict after a per-URL delay and records how many load at once."""
+    lean = False
+
+    def __init__(self, pages, delays):
+        self.pages = pages
+        self.delays = delays
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def driver(self, pages=1):
+        pool = self
+
+        class Driver:
+            page_source = None
+
+            def get(self, url):
+                with pool.lock:
+                    pool.active += 1
+                    pool.peak = max(pool.peak, pool.active)
+                time.sleep(pool.delays.get(url, 0))
+                with pool.lock:
+                    pool.active -= 1
+                if pool.pages[url] is None:
+                    raise RuntimeError("net::ERR_CONNECTION_RESET")
+                self.page_source = pool.pages[url]
+
+            def execute_script(self, script):
+                return "complete"
+
+        yield Driver()
+
+
+URLS = ["https://example.com/?page=2", "https://example.com/?page=3", "https://example.com/?page=4"]
+
+
+def test_pages_load_in_parallel_and_come_back_in_order():
+    pool = FakePagePool({url: f"<html>{url}</html>" for url in URLS}, {URLS[0]: 0.2, URLS[1]: 0.1})
+    results = list(iter_pages_concurrently(pool, URLS, concurrency=3))
+    assert [url for url, _, _ in results] == URLS
+    assert [html for _, html, _ in results] == [f"<html>{url}</html>" for url in URLS]
+    assert pool.peak > 1
+
+
+def test_one_at_a_time_when_concurrency_is_one():
+    pool = FakePagePool({url: "<html></html>" for url in URLS}, {})
+    assert len(list(iter_pages_concurrently(pool, URLS, concurrency=1))) == 3
+    assert pool.peak == 1
+
+
+def test_a_failed_page_is_reported_not_raised():
+    pool = FakePagePool({URLS[0]: "<html></html>", URLS[1]: None, URLS[2]: "<html></html>"}, {})
+    errors = [error for _, _, error in iter_pages_concurrently(pool, URLS, concurrency=2)]
+    assert errors[0] is None and "ERR_CONNECTION_RESET" in errors[1]
@@ -0,0 +1,29 @@
+from tools import prune_html
+
+
+def test_non_content_markup_is_removed():
+    html = ("<html><body><nav><a>Home</a></nav><script>track()</script>"
+            "<div id='cookie-consent'>We use cookies</div><main><p>Opening times</p></main></body></html>")
+    pruned, _ = prune_html(html)
+    assert "Opening times" in pruned
+    assert "Home" not in pruned and "track" not in pruned and "cookies" not in pruned
+
+
+def test_boilerplate_words_only_match_whole_id_or_class_words():
+    html = ("<body><div class='shareholders'>Shareholder meeting</div>"
+            "<div class='social-links'>Follow us</div></body>")
+    pruned, _ = prune_html(html)
+    assert "Shareholder meeting" in pruned and "Follow us" not in pruned
+
+
+def test_boilerplate_classes_on_inline_elements_are_kept():
+    pruned, _ = prune_html("<body><p>Call us <span class='share'>today</span></p></body>")
+    assert "today" in pruned
+
+
+def test_text_inside_a_dropped_subtree_is_counted_once():
+    # The button text sits inside a <nav>; both match, but its 40 characters are counted once
+    html = "<body><nav><button>" + "x" * 40 + "</button></nav><p>Content</p></body>"
+    _, stats = prune_html(html)
+    assert stats["tokens_saved"] == 10
+    assert stats["bytes_saved"] == stats["bytes_before"] - stats["bytes_after"] > 0
@@ -0,0 +1,92 @@
+import pytest
+import common.rate_limit as rate_limit
+from common.rate_limit import (HostLimiter, AdaptiveRateLimiter, retry_after_seconds, INITIAL_RATE,
+                               INITIAL_CONCURRENCY, RATE_INCREASE, THROTTLE_DECREASE, MIN_RATE)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def test_retry_after_accepts_seconds_and_http_dates(clock):
+    assert retry_after_seconds({"Retry-After": "7"}) == 7
+    assert retry_after_seconds({"retry-after": "Thu, 01 Jan 1970 00:02:00 GMT"}) == pytest.approx(20)
+    assert retry_after_seconds({"Retry-After": "soon"}) is None
+    assert retry_after_seconds(None) is None
+
+
+def test_healthy_responses_increase_rate_and_window_additively(clock):
+    host = HostLimiter("example.com")
+    assert host.try_acquire() == 0
+    host.release(200, latency=0.1)
+    assert host.rate == INITIAL_RATE + RATE_INCREASE
+    assert host.concurrency == pytest.approx(INITIAL_CONCURRENCY + 1 / INITIAL_CONCURRENCY)
+
+
+def test_throttling_cuts_multiplicatively_and_honours_retry_after(clock):
+    host = HostLimiter("example.com")
+    host.try_acquire()
+    host.release(429, retry_after=30)
+    assert host.rate == INITIAL_RATE * THROTTLE_DECREASE
+    assert host.throttled == 1
+    assert host.try_acquire() == pytest.approx(30)
+
+
+def test_decreases_are_limited_to_one_per_cooldown_and_floored(clock):
+    host = HostLimiter("example.com")
+    for _ in range(3):
+        host.in_flight += 1
+        host.release(error=True)
+    assert host.rate == INITIAL_RATE * THROTTLE_DECREASE
+    for _ in range(20):
+        clock.now += 10
+        host.in_flight += 1
+        host.release(503)
+    assert host.rate == MIN_RATE and host.concurrency == 1
+
+
+def test_rising_latency_backs_off(clock):
+    host = HostLimiter("example.com")
+    for _ in range(5):
+        host.in_flight += 1
+        host.release(200, latency=0.3)
+    rate = host.rate
+    clock.now += 10
+    host.in_flight += 1
+    host.release(200, latency=5.0)
+    assert host.rate < rate
+
+
+def test_concurrency_window_limits_requests_in_flight(clock):
+    host = HostLimiter("example.com")
+    clock.now += 10  # a full bucket, so only the window holds requests back
+    assert host.try_acquire() == 0 and host.try_acquire() == 0
+    assert host.try_acquire() > 0
+    host.release(200)
+    clock.now += 10
+    assert host.try_acquire() == 0
+
+
+def test_hosts_are_paced_separately(clock):
+    limiter = AdaptiveRateLimiter()
+    first = limiter.acquire("https://a.example/one")
+    assert limiter.acquire("https://A.example/two") is first
+    assert limiter.acquire("https://b.example/") is not first
+    assert set(limiter.metrics()) == {"a.example", "b.example"}
@@ -0,0 +1,61 @@
+import threading
+import pytest
+import extraction
+import scraper
+
+PAGES = [f"<html><body><p>Listing on page {number}</p></body></html>" for number in (1, 2, 3)]
+
+
+class NoLimit:
+    def acquire(self, tokens, should_stop=None):
+        return True
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Replaces the browser and the model; page 2 is only served once page 1 has been extracted."""
+    class Pipeline:
+        pages_fetched = 0
+        first_extracted = threading.Event()
+        overlapped = False
+
+    def fake_pages(url, result):
+        for number, html in enumerate(PAGES, start=1):
+            if number == 2:
+                Pipeline.overlapped = Pipeline.first_extracted.wait(5)
+            Pipeline.pages_fetched = number
+            result['pages_scraped'] = number
+            yield html
+
+    def fake_extract(chunk, fields, model):
+        Pipeline.first_extracted.set()
+        return [{'Title': chunk.strip()}], 10, 5, 0.015
+
+    monkeypatch.setattr(scraper, "iter_html_pages_auto", fake_pages)
+    monkeypatch.setattr(scraper, "format_data_with_genai", fake_extract)
+    monkeypatch.setattr(scraper, "cached_format_data", lambda chunk, fields, model: None)
+    monkeypatch.setattr(extraction, "_shared_limiter", NoLimit())
+    return Pipeline
+
+
+def test_extraction_starts_before_the_last_page_is_fetched(pipeline):
+    rows, input_tokens, output_tokens, cost, info = scraper.scrape_rows("https://example.com", ["Title"], "gemini flash-1.5")
+    assert pipeline.overlapped
+    assert [row['Title'] for row in rows] == [f"Listing on page {number}" for number in (1, 2, 3)]
+    assert (input_tokens, output_tokens) == (30, 15) and cost == pytest.approx(0.045)
+    assert info['chunks'] == 3 and info['pages_scraped'] == 3
+
+
+def test_progress_is_reported_per_chunk(pipeline):
+    reported = []
+    scraper.scrape_rows("https://example.com", ["Title"], "gemini flash-1.5",
+                        on_chunk=lambda index, rows, progress: reported.append((index, progress['done'])))
+    assert sorted(index for index, _ in reported) == [0, 1, 2]
+    assert [done for _, done in reported] == [1, 2, 3]
+
+
+def test_stopping_abandons_the_remaining_pages(pipeline):
+    rows, *_, info = scraper.scrape_rows("https://example.com", ["Title"], "gemini flash-1.5",
+                                         should_stop=lambda: pipeline.first_extracted.is_set())
+    assert info['stopped'] and pipeline.pages_fetched < 3
+    assert len(rows) < 3
@@ -0,0 +1,76 @@
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from common.scroll_engine import scroll_until_settled, ACTIVITY_MONITOR_JS
+from scraper import scroll_page
+
+
+class FakeScrollDriver:
+    """A page that grows by one screen each time it is scrolled to the bottom, `loads` times."""
+
+    def __init__(self, height=2000, loads=0):
+        self.height = height
+        self.loads = loads
+        self.position = 0
+        self.quiet_waits = 0
+        self.monitor_injected = False
+
+    def execute_cdp_cmd(self, command, params):
+        assert params["source"] == ACTIVITY_MONITOR_JS
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, quiet_ms, timeout_ms):
+        self.quiet_waits += 1
+        if self.position >= self.height and self.loads:
+            self.loads -= 1
+            self.height += 1000
+        return True
+
+    def execute_script(self, script, *args):
+        if script == ACTIVITY_MONITOR_JS:
+            self.monitor_injected = True
+        elif script == "return document.body.scrollHeight":
+            return self.height
+        elif script == "return window.innerHeight":
+            return 800
+        elif args:
+            self.position = args[0]
+
+
+def test_scrolls_until_the_page_stops_growing():
+    driver = FakeScrollDriver(loads=3)
+    report = scroll_until_settled(driver)
+    assert report["loaded_more"] and not report["capped"]
+    assert driver.height == 5000 and report["rounds"] == 4
+    assert driver.monitor_injected and driver.quiet_waits == 5  # initial settle plus one per round
+
+
+def test_a_static_page_settles_after_one_round():
+    report = scroll_until_settled(FakeScrollDriver())
+    assert not report["loaded_more"] and report["rounds"] == 1
+    assert set(report["timings"]) == {"initial_settle", "scrolling", "waiting"}
+
+
+def test_never_ending_pages_are_capped():
+    report = scroll_until_settled(FakeScrollDriver(loads=100), max_rounds=5)
+    assert report["loaded_more"] and report["capped"] and report["rounds"] == 5
+
+
+def test_scroll_page_records_a_script_timeout_as_a_warning():
+    class HangingDriver(FakeScrollDriver):
+        def execute_async_script(self, *args):
+            raise TimeoutException("script timeout")
+
+    result = {}
+    assert scroll_page(HangingDriver(), result) is False
+    assert result['warnings'] == ["Scrolling stopped early: script timeout"]
+
+
+def test_scroll_page_does_not_hide_a_dead_browser():
+    class DeadDriver(FakeScrollDriver):
+        def execute_async_script(self, *args):
+            raise WebDriverException("chrome not reachable")
+
+    with pytest.raises(WebDriverException):
+        scroll_page(DeadDriver(), {})
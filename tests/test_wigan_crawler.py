@@ -0,0 +1,206 @@
+import asyncio
+import csv
+import importlib
+import pytest
+import requests
+from aiohttp import web
+import wigan_crawler
+from common.rate_limit import AdaptiveRateLimiter
+from wigan_crawler import WiganCrawler
+from crawl_state import FingerprintStore
+
+task4 = importlib.import_module("Task4-part2")
+
+
+def category_page(*links):
+    blocks = "".join(f'<li class="category-block"><a href="{href}">{name}</a></li>' for name, href in links)
+    return f"<html><body><ul>{blocks}</ul></body></html>"
+
+
+def results_page(titles, next_href=None):
+    hits = "".join(f'<div class="result_hit"><h3><a href="#">{title}</a></h3>'
+                   f'<div class="result-hit-body"><div class="mb-2">About {title}</div></div></div>'
+                   for title in titles)
+    pagination = ""
+    if next_href:
+        pagination = (f'<ol class="pagination"><li class="page-item">'
+                      f'<a class="page-link btn" title="Go to Next Page" href="{next_href}">Next</a></li></ol>')
+    return f"<html><body>{hits}{pagination}</body></html>"
+
+
+# A small directory: Sport lists Clubs a second time, under another name
+SITE = {
+    "/": category_page(("Clubs", "/clubs"), ("Sport", "/sport")),
+    "/sport": category_page(("Swimming", "/swimming"), ("Youth clubs", "/clubs")),
+    "/clubs": results_page(["Youth Club", "Chess Club"], "/clubs?page=2"),
+    "/clubs?page=2": results_page(["Scouts"]),
+    "/swimming": results_page(["Swimming lessons"]),
+}
+
+
+class Server:
+    """Serves SITE over HTTP on localhost with ETags and records the requests it receives."""
+
+    def __init__(self, pages=SITE):
+        self.pages = dict(pages)
+        self.requests = []
+        self.always_not_modified = set()
+        self.on_not_modified = None
+        self.port = 0  # Kept across crawls so the category URLs stay the same
+
+    def etag(self, path):
+        return f'"{len(self.pages[path])}"'
+
+    async def handle(self, request):
+        path, validator = request.path_qs, request.headers.get("If-None-Match")
+        self.requests.append((path, validator))
+        if path not in self.pages:
+            raise web.HTTPNotFound()
+        if path in self.always_not_modified or validator == self.etag(path):
+            if self.on_not_modified:
+                self.on_not_modified(path)
+            return web.Response(status=304)
+        return web.Response(text=self.pages[path], content_type="text/html", headers={"ETag": self.etag(path)})
+
+    def crawl(self, output_folder, **crawler_options):
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", self.handle)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", self.port)
+            await site.start()
+            self.port = runner.addresses[0][1]
+            try:
+                return await WiganCrawler(**crawler_options).crawl(f"http://127.0.0.1:{self.port}/", str(output_folder))
+            finally:
+                await runner.cleanup()
+        return asyncio.run(run())
+
+
+@pytest.fixture(autouse=True)
+def unpaced(monkeypatch):
+    """A limiter of its own so localhost is not paced like the real directory."""
+    monkeypatch.setattr("common.rate_limit.INITIAL_RATE", 1000.0)
+    monkeypatch.setattr("common.rate_limit.INITIAL_CONCURRENCY", 8)
+    limiter = AdaptiveRateLimiter()
+    monkeypatch.setattr(wigan_crawler, "get_rate_limiter", lambda: limiter)
+
+
+def titles_in(path):
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        return [row['Title'] for row in csv.DictReader(csv_file)]
+
+
+def test_crawl_writes_every_category_with_all_its_pages(tmp_path):
+    stats = Server().crawl(tmp_path / "out", workers=4)
+    assert titles_in(tmp_path / "out" / "Clubs" / "data.csv") == ["Youth Club", "Chess Club", "Scouts"]
+    assert titles_in(tmp_path / "out" / "Sport" / "Swimming" / "data.csv") == ["Swimming lessons"]
+    assert stats.category_pages == 4 and stats.result_pages == 1 and stats.listings == 4
+    assert stats.failures == 0
+
+
+def test_a_category_under_two_parents_is_fetched_once(tmp_path):
+    server = Server()
+    server.crawl(tmp_path / "out", workers=4)
+    assert [path for path, _ in server.requests].count("/clubs") == 1
+    assert titles_in(tmp_path / "out" / "Sport" / "Youth clubs" / "data.csv") == ["Youth Club", "Chess Club", "Scouts"]
+
+
+def test_a_failing_results_page_keeps_the_rows_before_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(wigan_crawler, "MAX_ATTEMPTS", 1)
+    server = Server({**SITE, "/clubs": results_page(["Youth Club"], "/clubs?page=9")})
+    stats = server.crawl(tmp_path / "out", workers=4)
+    assert titles_in(tmp_path / "out" / "Clubs" / "data.csv") == ["Youth Club"]
+    assert stats.failures == 1
+
+
+def test_an_incremental_crawl_skips_categories_answered_with_304(tmp_path):
+    server = Server()
+    server.crawl(tmp_path / "out", workers=4, fingerprints=FingerprintStore(str(tmp_path / "out")))
+    server.requests.clear()
+    stats = server.crawl(tmp_path / "out", workers=4, fingerprints=FingerprintStore(str(tmp_path / "out")))
+    assert ("/clubs", server.etag("/clubs")) in server.requests
+    assert "/clubs?page=2" not in [path for path, _ in server.requests]
+    assert stats.listings == 0
+
+
+def test_a_304_for_missing_output_refetches_the_page_in_full(tmp_path):
+    server = Server()
+    server.crawl(tmp_path / "out", workers=1, fingerprints=FingerprintStore(str(tmp_path / "out")))
+    # The CSV disappears while the conditional request is in flight
+    csv_path = tmp_path / "out" / "Clubs" / "data.csv"
+    server.on_not_modified = lambda path: path == "/clubs" and csv_path.unlink(missing_ok=True)
+    server.requests.clear()
+    fingerprints = FingerprintStore(str(tmp_path / "out"))
+    stats = server.crawl(tmp_path / "out", workers=1, fingerprints=fingerprints)
+    assert [request for request in server.requests if request[0] == "/clubs"] == [
+        ("/clubs", server.etag("/clubs")), ("/clubs", None)]
+    assert titles_in(csv_path) == ["Youth Club", "Chess Club", "Scouts"]
+    assert stats.failures == 0 and fingerprints.rescraped == 1
+
+
+def test_the_body_of_a_304_is_never_parsed(tmp_path, monkeypatch):
+    monkeypatch.setattr(wigan_crawler, "MAX_ATTEMPTS", 1)
+    server = Server()
+    server.always_not_modified.add("/swimming")
+    stats = server.crawl(tmp_path / "out", workers=4)
+    assert [path for path, _ in server.requests].count("/swimming") == 2
+    assert not (tmp_path / "out" / "Sport" / "Swimming" / "data.csv").exists()
+    assert stats.failures == 1
+    assert titles_in(tmp_path / "out" / "Clubs" / "data.csv") == ["Youth Club", "Chess Club", "Scouts"]
+
+
+# -------------------- Category exploration in Task4-part2 --------------------
+
+
+def make_response(status, text="", **headers):
+    response = requests.Response()
+    response.status_code = status
+    response._content = text.encode('utf-8')
+    response.headers = requests.structures.CaseInsensitiveDict(headers)
+    return response
+
+
+@pytest.fixture
+def leaf(tmp_path, monkeypatch):
+    """A leaf category scraped by an earlier crawl, and stand-ins for the network and the browser."""
+    folder = tmp_path / "Swimming"
+    folder.mkdir()
+    (folder / "data.csv").write_text("Title\nSwimming lessons\n")
+    fingerprints = FingerprintStore(str(tmp_path))
+    fingerprints.record("https://example.com/swimming", "old", {"ETag": '"v1"'})
+
+    class Leaf:
+        responses = []
+        requests = []
+        scraped = []
+
+    def fake_http_get(url, headers=None, **kwargs):
+        Leaf.requests.append(headers or {})
+        if headers:
+            (folder / "data.csv").unlink()  # The CSV disappears while the conditional request is in flight
+        return Leaf.responses.pop(0)
+
+    def fake_scrape(url, output_folder, crawl_browser=None, journal=None):
+        Leaf.scraped.append(url)
+        return True
+
+    monkeypatch.setattr(task4, "http_get", fake_http_get)
+    monkeypatch.setattr(task4, "scrape_all_pages_in_category", fake_scrape)
+    Leaf.folder, Leaf.fingerprints = folder, fingerprints
+    return Leaf
+
+
+def test_explore_refetches_a_category_whose_output_went_missing(leaf):
+    leaf.responses = [make_response(304), make_response(200, results_page(["Swimming lessons"]), ETag='"v2"')]
+    task4.explore_and_scrape_categories("https://example.com/swimming", str(leaf.folder), fingerprints=leaf.fingerprints)
+    assert leaf.requests == [{"If-None-Match": '"v1"'}, {}]
+    assert leaf.scraped == ["https://example.com/swimming"]
+    assert leaf.fingerprints.entries["https://example.com/swimming"]["etag"] == '"v2"'
+
+
+def test_explore_never_parses_a_304(leaf):
+    leaf.responses = [make_response(304), make_response(304)]
+    task4.explore_and_scrape_categories("https://example.com/swimming", str(leaf.folder), fingerprints=leaf.fingerprints)
+    assert leaf.scraped == [] and "https://example.com/swimming" not in leaf.fingerprints.entries
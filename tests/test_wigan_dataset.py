@@ -0,0 +1,52 @@
+import csv
+import pytest
+
+pytest.importorskip("pyarrow")
+from wigan_dataset import compact_exploration, WiganDataset, parse_categories
+from common.wigan_listings import CSV_HEADER
+
+
+def write_category(folder, titles):
+    folder.mkdir(parents=True)
+    with open(folder / "data.csv", 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.DictWriter(csv_file, CSV_HEADER)
+        writer.writeheader()
+        writer.writerows({'Title': title, 'Description': f"About {title}"} for title in titles)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    source = tmp_path / "Wigan_Exploration"
+    write_category(source / "Young People" / "Clubs", ["Youth Club", "Chess Club"])
+    write_category(source / "Leisure", ["Swimming"])
+    assert compact_exploration(str(source), str(tmp_path / "Wigan_Dataset")) == 3
+    return WiganDataset(str(tmp_path / "Wigan_Dataset"))
+
+
+def test_compaction_keeps_every_listing_with_its_category_levels(dataset):
+    table = dataset.query(["Title", "category_1", "category_2", "category_path"])
+    rows = sorted(zip(*(table[column].to_pylist() for column in table.column_names)))
+    assert rows == [("Chess Club", "Young People", "Clubs", "Young People > Clubs"),
+                    ("Swimming", "Leisure", None, "Leisure"),
+                    ("Youth Club", "Young People", "Clubs", "Young People > Clubs")]
+    assert sorted(dataset.category_columns) == ["category_1", "category_2"]
+
+
+def test_queries_filter_by_category_and_text(dataset):
+    assert sorted(dataset.query(["Title"], {'category_1': "Young People"})["Title"].to_pylist()) == \
+        ["Chess Club", "Youth Club"]
+    assert dataset.search("youth", ["Title"])["Title"].to_pylist() == ["Youth Club"]
+    assert dataset.count_by("category_1") == [("Young People", 2), ("Leisure", 1)]
+
+
+def test_recompaction_replaces_the_dataset(tmp_path, dataset):
+    source = tmp_path / "Wigan_Exploration"
+    write_category(source / "Health", ["Memory cafe"])
+    assert compact_exploration(str(source), str(tmp_path / "Wigan_Dataset")) == 4
+    assert sorted(WiganDataset(str(tmp_path / "Wigan_Dataset")).count_by("category_1")) == \
+        [("Health", 1), ("Leisure", 1), ("Young People", 2)]
+
+
+def test_parse_categories():
+    assert parse_categories(["category_1=Young People", "category_1=Leisure", "category_2=Clubs"]) == \
+        {'category_1': ["Young People", "Leisure"], 'category_2': ["Clubs"]}
@@ -0,0 +1,90 @@
+import re
+import importlib
+from bs4 import BeautifulSoup
+from common.wigan_listings import LISTING_SCHEMA, DIRECTORY_SCHEMA, MISSING
+from synthetic_listings import synthetic_results_page
+
+task4 = importlib.import_module("Task4-part2")
+
+
+class FakeElement:
+    """A Playwright element handle backed by BeautifulSoup, counting protocol round trips on its page."""
+
+    def __init__(self, tag, page):
+        self.tag = tag
+        self.page = page
+
+    def query_selector_all(self, selector):
+        self.page.round_trips += 1
+        return [FakeElement(tag, self.page) for tag in self.tag.select(selector)]
+
+    def query_selector(self, selector):
+        self.page.round_trips += 1
+        tag = self.tag.select_one(selector)
+        return FakeElement(tag, self.page) if tag is not None else None
+
+    def get_attribute(self, name):
+        self.page.round_trips += 1
+        return self.tag.get(name)
+
+    def inner_text(self):
+        self.page.round_trips += 1
+        return re.sub(r'\s+', ' ', self.tag.get_text())
+
+
+class FakePage(FakeElement):
+    def __init__(self, html, rows=None):
+        self.round_trips = 0
+        self.evaluated = []
+        self.rows = rows
+        super().__init__(BeautifulSoup(html, 'html.parser'), self)
+
+    def wait_for_selector(self, selector, timeout):
+        pass
+
+    def evaluate(self, script, argument):
+        self.round_trips += 1
+        self.evaluated.append((script, argument))
+        return self.rows
+
+
+def test_batched_extraction_is_one_round_trip():
+    page = FakePage(synthetic_results_page(5), rows=[["row"]] * 5)
+    assert task4.extract_data_from_page(page, 1) == [["row"]] * 5
+    assert page.round_trips == 1
+    script, argument = page.evaluated[0]
+    assert argument['item'] == '.result_hit' and argument['missing'] == MISSING
+    assert [field['name'] for field in argument['fields']] == LISTING_SCHEMA.columns
+
+
+def test_only_the_transforms_a_schema_uses_are_sent_to_the_browser():
+    page = FakePage("")
+    LISTING_SCHEMA.extract_rows_playwright(page)
+    DIRECTORY_SCHEMA.extract_rows_playwright(page)
+    (listing_script, _), (directory_script, _) = page.evaluated
+    assert "const transforms = {};" in listing_script
+    assert '"strip_mailto": value =>' in directory_script
+
+
+def test_per_element_extraction_reads_the_same_rows_over_many_round_trips():
+    html = synthetic_results_page(3)
+    page = FakePage(html)
+    rows = task4.extract_data_from_page(page, 1, batched=False)
+    assert rows == LISTING_SCHEMA.extract_rows(BeautifulSoup(html, 'html.parser'))
+    assert page.round_trips > 3 * len(LISTING_SCHEMA.columns)
+
+
+def test_listing_schema_reads_every_column():
+    rows = LISTING_SCHEMA.extract_rows_from_html(synthetic_results_page(2))
+    assert rows[1] == ["Listing 1", "Mondays 10am - 12pm", "Description of listing 1.",
+                       "1 Market Street, Wigan WN1 1AA", "01942 000001", "info1@example.org", "https://example.org/1"]
+
+
+def test_missing_fields_are_marked_and_transforms_applied():
+    html = ('<div id="hit-1"><h3><a> Memory cafe\n</a></h3><div class="contact-links"><ul>'
+            '<li><span class="comma_split_line d-none d-sm-block text-body">01942 1</span></li>'
+            '<li><a href="mailto:cafe@example.org">Email</a></li></ul></div></div>')
+    record = DIRECTORY_SCHEMA.extract_records(BeautifulSoup(html, 'html.parser'))[0]
+    assert record['Title'] == "Memory cafe"
+    assert record['Email'] == "cafe@example.org"
+    assert record['Phone'] == "01942 1" and record['Website'] == MISSING and record['Address'] == MISSING